@@ -1,17 +1,909 @@
-# pip3 install lifelines
+# pip3 install pyarrow
 
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager, nullcontext
 from io import BytesIO
+import os
+import time
 import base64
+import gzip
 import datetime
+import numpy as np
 import pandas as pd
-import seaborn as sns
-import matplotlib.pyplot as plt
-import plotly.graph_objects as go
-import plotly.io as pio
-from lifelines import KaplanMeierFitter
+from density_sketches import BinnedHistogram, binned_kde, merge_histograms
+from retention_engine import ActivityBitsets, kaplan_meier_curves, merge_activity_bitsets, user_retention_table
+from pipeline_profiler import StageProfiler, profile_call
+from report_cache import ReportCache, params_fingerprint, row_hashes, rows_digest
+from user_feature_store import USER_FEATURE_AGGREGATES, UserFeatureStore, user_feature_aggregates
+
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+COLUMNAR_FORMATS = {".parquet": "parquet", ".pq": "parquet", ".arrow": "arrow", ".feather": "arrow"}
+HOUR_RANGE = (0, 23)
+DURATION_RANGE = (1, 120)
+RESAMPLE_FREQUENCIES = [("D", "daily"), ("W", "weekly"), ("M", "monthly"), ("Q", "quarterly")]
+WEBGL_MIN_POINTS = 5_000
+IMAGE_MIME_TYPES = {"png": "image/png", "svg": "image/svg+xml"}
+LAZY_LOADER_JS = """
+(function () {
+  async function decode(block) {
+    const bytes = Uint8Array.from(atob(block.textContent.trim()), (c) => c.charCodeAt(0));
+    const stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream("gzip"));
+    return await new Response(stream).text();
+  }
+  let plotlyReady = null;
+  function ensurePlotly() {
+    if (window.Plotly) return Promise.resolve();
+    if (!plotlyReady) {
+      const source = document.getElementById("plotlyjs-deferred");
+      plotlyReady = source.dataset.src
+        ? new Promise((resolve, reject) => {
+            const script = document.createElement("script");
+            script.src = source.dataset.src;
+            script.onload = resolve;
+            script.onerror = reject;
+            document.head.appendChild(script);
+          })
+        : decode(source).then((code) => {
+            const script = document.createElement("script");
+            script.text = code;
+            document.head.appendChild(script);
+          });
+    }
+    return plotlyReady;
+  }
+  async function render(holder) {
+    if (holder.dataset.state) return;
+    holder.dataset.state = "loading";
+    const html = await decode(document.getElementById("figure-data-" + holder.dataset.figure));
+    if (holder.dataset.plotly) await ensurePlotly();
+    holder.innerHTML = html;
+    holder.querySelectorAll("script").forEach((inert) => {
+      const script = document.createElement("script");
+      script.text = inert.textContent;
+      inert.replaceWith(script);
+    });
+    holder.dataset.state = "loaded";
+  }
+  document.addEventListener("DOMContentLoaded", () => {
+    const holders = document.querySelectorAll(".lazy-figure");
+    const observer = new IntersectionObserver((entries) => {
+      entries.forEach((entry) => {
+        if (entry.isIntersecting) {
+          observer.unobserve(entry.target);
+          render(entry.target);
+        }
+      });
+    }, { rootMargin: "200px" });
+    holders.forEach((holder) => observer.observe(holder));
+    document.querySelectorAll(".toc a").forEach((link) => {
+      link.addEventListener("click", () => {
+        const page = document.querySelector(link.getAttribute("href"));
+        const holder = page && page.querySelector(".lazy-figure");
+        if (holder) render(holder);
+      });
+    });
+  });
+})();
+"""
+
+
+def read_session_data(path, columns=None):
+    input_format = COLUMNAR_FORMATS.get(os.path.splitext(str(path))[1].lower(), "csv")
+    if input_format == "csv":
+        return pd.read_csv(path, usecols=columns)
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+
+    if input_format == "parquet":
+        table = pq.read_table(path, columns=columns)
+    else:
+        table = feather.read_table(path, columns=columns, memory_map=True)
+    return table.to_pandas(date_as_object=False)
+
+
+def iter_session_chunks(path, columns=None, chunk_rows=1_000_000):
+    # Yields DataFrames of at most chunk_rows rows: Parquet and Arrow are read batch by batch,
+    # CSV through the chunked reader, so only one chunk is resident at a time.
+    input_format = COLUMNAR_FORMATS.get(os.path.splitext(str(path))[1].lower(), "csv")
+    if input_format == "csv":
+        yield from pd.read_csv(path, usecols=columns, chunksize=chunk_rows)
+        return
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+
+    if input_format == "parquet":
+        batches = pq.ParquetFile(path).iter_batches(batch_size=chunk_rows, columns=columns)
+    else:
+        reader = ipc.open_file(pa.memory_map(str(path)))
+        batches = (
+            reader.get_batch(i).select(columns) if columns else reader.get_batch(i)
+            for i in range(reader.num_record_batches)
+        )
+    for batch in batches:
+        for offset in range(0, batch.num_rows, chunk_rows):
+            yield pa.Table.from_batches([batch.slice(offset, chunk_rows)]).to_pandas(
+                date_as_object=False
+            )
+
+
+def new_axes(figsize):
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=figsize)
+    return fig, fig.subplots()
+
+
+def figure_to_bytes(fig, image_format="png", dpi=100):
+    buf = BytesIO()
+    if image_format == "svg":
+        fig.savefig(buf, format="svg", bbox_inches="tight", metadata={"Date": None})
+    else:
+        fig.savefig(
+            buf,
+            format="png",
+            dpi=dpi,
+            bbox_inches="tight",
+            metadata={"Software": None},
+            pil_kwargs={"optimize": True},
+        )
+    return buf.getvalue()
+
+
+def asset_fragment(asset, src=None):
+    if asset["format"] == "plotly":
+        return asset["data"]
+    if src is None:
+        encoded = base64.b64encode(asset["data"]).decode("UTF-8")
+        src = f"data:{IMAGE_MIME_TYPES[asset['format']]};base64,{encoded}"
+    return f"<img src='{src}'/>"
+
+
+def compress_to_base64(text):
+    return base64.b64encode(gzip.compress(text.encode("UTF-8"), mtime=0)).decode("UTF-8")
+
+
+def lazy_fragment(name, fragment, is_plotly=False):
+    # Placeholder plus an inert gzip+base64 block; LAZY_LOADER_JS inflates it on first view
+    plotly_attr = " data-plotly='1'" if is_plotly else ""
+    return (
+        f"<div class='lazy-figure' data-figure='{name}'{plotly_attr}></div>"
+        f"<script type='application/octet-stream' id='figure-data-{name}'>{compress_to_base64(fragment)}</script>"
+    )
+
+
+def lazy_loader_script(plotlyjs="cdn", with_plotly=True):
+    # The loader plus plotly.js as a deferred source: a CDN URL or an inert compressed block,
+    # fetched or evaluated only when the first Plotly figure comes into view.
+    if not with_plotly:
+        return f"<script>{LAZY_LOADER_JS}</script>"
+    from plotly.offline import get_plotlyjs, get_plotlyjs_version
+
+    config = "<script>window.PlotlyConfig = {MathJaxConfig: 'local'};</script>"
+    if plotlyjs == "inline":
+        deferred = f"<script type='application/octet-stream' id='plotlyjs-deferred'>{compress_to_base64(get_plotlyjs())}</script>"
+    else:
+        deferred = f"<script type='application/octet-stream' id='plotlyjs-deferred' data-src='https://cdn.plot.ly/plotly-{get_plotlyjs_version()}.min.js'></script>"
+    return f"{config}{deferred}<script>{LAZY_LOADER_JS}</script>"
+
+
+def plotlyjs_script(plotlyjs="cdn"):
+    # Loaded once in <head>; Plotly fragments are rendered without their own copy of the library
+    from plotly.offline import get_plotlyjs, get_plotlyjs_version
+
+    config = "<script>window.PlotlyConfig = {MathJaxConfig: 'local'};</script>"
+    if plotlyjs == "inline":
+        return f"{config}<script type='text/javascript'>{get_plotlyjs()}</script>"
+    return f"{config}<script src='https://cdn.plot.ly/plotly-{get_plotlyjs_version()}.min.js' charset='utf-8'></script>"
+
+
+def annotate_bars(ax, int_=True):
+    for p in ax.patches:
+        height = p.get_height()
+        if int_:
+            if height > 0:
+                ax.annotate(
+                    f"{int(height)}",
+                    (p.get_x() + p.get_width() / 2, height),
+                    ha="center",
+                    va="center",
+                    fontsize=8,
+                    color="black",
+                    xytext=(0, 5),
+                    textcoords="offset points",
+                )
+        else:
+            if p.get_height() > 0.0:
+                ax.annotate(
+                    f"{round(number=p.get_height(), ndigits=2)}",
+                    (p.get_x() + p.get_width() / 2, p.get_height()),
+                    ha="center",
+                    va="center",
+                    fontsize=8,
+                    color="black",
+                    xytext=(0, 5),
+                    textcoords="offset points",
+                )
+
+
+def rotate_xticklabels(ax, rotation, ha="center"):
+    for label in ax.get_xticklabels():
+        label.set_rotation(rotation)
+        label.set_horizontalalignment(ha)
+
+
+def plot_histogram_sketch(ax, histogram, bins, color):
+    # Bars and a count-scaled KDE line drawn from the sketch's bin counts, never raw rows
+    import seaborn as sns
+
+    values, counts = histogram.bin_values, histogram.counts
+    occupied = counts > 0
+    sns.histplot(x=values[occupied], weights=counts[occupied], bins=bins, color=color, alpha=0.5, ax=ax)
+    grid, density = binned_kde(values, counts, cut=0)
+    span = values[occupied].max() - values[occupied].min()
+    bar_width = span / bins if span else histogram.bin_width
+    ax.plot(grid, density * histogram.total * bar_width, color=color)
+
+
+def render_users_per_cohort(cohort_sizes, figsize):
+    import seaborn as sns
+
+    fig, ax = new_axes(figsize)
+    sns.barplot(
+        data=cohort_sizes,
+        x="group_code",
+        hue="group_code",
+        legend=False,
+        y="count",
+        palette="pastel",
+        ax=ax,
+    )
+    annotate_bars(ax)
+    ax.set_xlabel("Cohort")
+    ax.set_ylabel("Count")
+    fig.tight_layout()
+    return fig
+
+
+def render_device_usage(device_counts, figsize):
+    import seaborn as sns
+
+    fig, ax = new_axes(figsize)
+    sns.barplot(
+        data=device_counts,
+        x="user_platform",
+        y="count",
+        hue="event_platform",
+        palette="pastel",
+        ax=ax,
+    )
+    annotate_bars(ax)
+    ax.set_xlabel("Device Type at Signup")
+    ax.set_ylabel("Count")
+    fig.tight_layout()
+    return fig
+
+
+def render_hourly_activity(hour_histogram, figsize):
+    fig, ax = new_axes(figsize)
+    plot_histogram_sketch(ax, hour_histogram, bins=24, color="skyblue")
+    annotate_bars(ax)
+    ax.set_xlabel("Hour of Day")
+    ax.set_ylabel("Session Count")
+    fig.tight_layout()
+    return fig
+
+
+def render_weekday_activity(weekday_sessions, figsize):
+    import seaborn as sns
+
+    fig, ax = new_axes(figsize)
+    sns.barplot(
+        x=weekday_sessions.index,
+        y=weekday_sessions.values,
+        hue=weekday_sessions.index,
+        legend=False,
+        order=WEEKDAYS,
+        palette="pastel",
+        ax=ax,
+    )
+    annotate_bars(ax)
+    ax.set_xlabel("Weekday")
+    ax.set_ylabel("Session Count")
+    fig.tight_layout()
+    return fig
+
+
+def render_login_by_weekday(weekday_login, figsize):
+    import seaborn as sns
+
+    fig, ax = new_axes(figsize)
+    sns.barplot(
+        x=weekday_login.index, y=weekday_login.values, palette="pastel", hue=weekday_login.index, legend=False, ax=ax,
+    )
+    annotate_bars(ax)
+    ax.set_xlabel("Weekday")
+    ax.set_ylabel("Total Logins")
+    fig.tight_layout()
+    return fig
+
+
+def render_feature_engagement(feature_engagement, figsize):
+    import seaborn as sns
+
+    feature_engagement, feature_order = feature_engagement
+    fig, ax = new_axes(figsize)
+    sns.barplot(
+        data=feature_engagement,
+        x="feature",
+        y="usage_count",
+        hue="group_code",
+        palette="pastel",
+        order=feature_order,
+        ax=ax,
+    )
+    annotate_bars(ax)
+    rotate_xticklabels(ax, 90)
+    ax.set_xlabel("Features")
+    ax.set_ylabel("Total Usage Count")
+    ax.legend(title="Cohort")
+    fig.tight_layout()
+    return fig
+
+
+def render_repeat_feature_usage(avg_feature_usage, figsize):
+    import seaborn as sns
+
+    fig, ax = new_axes(figsize)
+    sns.barplot(
+        x=avg_feature_usage.index, y=avg_feature_usage.values, palette="pastel", hue=avg_feature_usage.index, legend=False, ax=ax,
+    )
+    annotate_bars(ax, int_=False)
+    rotate_xticklabels(ax, 45, ha="right")
+    ax.set_ylabel("Average Usage Count")
+    ax.set_xlabel("Features")
+    fig.tight_layout()
+    return fig
+
+
+def render_feature_usage_distribution(feature_usage, figsize):
+    import seaborn as sns
+
+    fig, ax = new_axes(figsize)
+    sns.barplot(
+        x=feature_usage["index"], y=feature_usage["count"], palette="pastel", hue=feature_usage["index"], legend=False, ax=ax,
+    )
+    annotate_bars(ax)
+    rotate_xticklabels(ax, 45, ha="right")
+    ax.set_ylabel("Total Count")
+    ax.set_xlabel("Features")
+    fig.tight_layout()
+    return fig
+
+
+def render_session_frequency(frequency_histogram, figsize):
+    fig, ax = new_axes(figsize)
+    plot_histogram_sketch(ax, frequency_histogram, bins=50, color="purple")
+    annotate_bars(ax)
+    ax.set_xlabel("Number of Sessions")
+    ax.set_ylabel("Number of Users")
+    ax.set_yscale("log")
+    fig.tight_layout()
+    return fig
+
+
+def render_first_vs_later_session_duration(duration_histograms, figsize):
+    from matplotlib.colors import to_rgba
+
+    fig, ax = new_axes(figsize)
+    for histogram, label, color in [
+        (duration_histograms["first"], "First Session", "C0"),
+        (duration_histograms["later"], "Later Sessions", "orange"),
+    ]:
+        grid, density = binned_kde(histogram.bin_values, histogram.counts)
+        artist = ax.fill_between(
+            grid,
+            density,
+            facecolor=to_rgba(color, 0.25),
+            edgecolor=color,
+            label=label,
+        )
+        artist.sticky_edges.y[:] = (0, np.inf)
+    ax.set_title("First vs. Later Session Duration")
+    ax.set_xlabel("Session Duration (minutes)")
+    ax.set_ylabel("Density")
+    ax.legend()
+    fig.tight_layout()
+    return fig
+
+
+def lttb_indices(x, y, n_out):
+    # Largest-Triangle-Three-Buckets: keeps the first and last point and, from each of n_out - 2
+    # equal buckets, the point forming the largest triangle with the previous pick and the
+    # mean of the next bucket, which preserves peaks and troughs of the line.
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    bounds = (np.arange(n_out - 1) * ((n - 2) / (n_out - 2))).astype(np.int64) + 1
+    bounds[-1] = n - 1
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    for bucket in range(n_out - 2):
+        start, end = bounds[bucket], bounds[bucket + 1]
+        next_end = bounds[bucket + 2] if bucket + 2 < len(bounds) else n
+        next_x, next_y = x[end:next_end].mean(), y[end:next_end].mean()
+        previous = selected[bucket]
+        area = np.abs(
+            (x[previous] - next_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (next_y - y[previous])
+        )
+        selected[bucket + 1] = start + int(np.argmax(area))
+    return selected
+
+
+def downsample_daily_durations(daily, point_budget):
+    # Daily (sum, count) per cohort is regrouped to the finest of day/week/month/quarter whose
+    # point count fits the budget, so every mean stays exact; if even quarters do not fit,
+    # each cohort line is thinned with LTTB to its share of the budget.
+    dates = daily.index.get_level_values("session_start_date_only")
+    cohorts = daily.index.get_level_values("group_code")
+    n_cohorts = max(cohorts.nunique(), 1)
+    for freq, resolution in RESAMPLE_FREQUENCIES:
+        periods = dates if freq == "D" else dates.to_period(freq).start_time
+        if periods.nunique() * n_cohorts <= point_budget:
+            break
+    resampled = daily.groupby([periods, cohorts], observed=True)[["sum", "count"]].sum()
+    grouped = (
+        (resampled["sum"] / resampled["count"])
+        .round(2)
+        .rename("duration_mins")
+        .rename_axis(["session_start_date_only", "group_code"])
+        .reset_index()
+    )
+    if len(grouped) > point_budget:
+        per_cohort = max(point_budget // n_cohorts, 3)
+        kept = [
+            line.index[
+                lttb_indices(
+                    line["session_start_date_only"].to_numpy().view(np.int64),
+                    line["duration_mins"].to_numpy(),
+                    per_cohort,
+                )
+            ]
+            for _, line in grouped.groupby("group_code", observed=True)
+        ]
+        grouped = grouped.loc[np.concatenate(kept)].reset_index(drop=True)
+    return grouped, resolution
+
+
+def render_session_duration_over_time(duration_series, figsize):
+    import plotly.graph_objects as go
+
+    grouped, resolution = duration_series
+    large = len(grouped) >= WEBGL_MIN_POINTS
+    trace = go.Scattergl if large else go.Scatter
+    fig = go.Figure()
+    for cohort in grouped["group_code"].unique():
+        cohort_data = grouped[grouped["group_code"] == cohort]
+        fig.add_trace(
+            trace(
+                x=cohort_data["session_start_date_only"],
+                y=cohort_data["duration_mins"],
+                mode="lines" if large else "lines+markers",
+                name=f"Cohort {cohort}",
+            )
+        )
+    fig.update_layout(
+        title="Average Session Duration Over Time"
+        + ("" if resolution == "daily" else f" ({resolution})"),
+        xaxis_title="Date",
+        yaxis_title="Avg Duration (minutes)",
+        legend_title="Cohort ID",
+        template="plotly_white",
+    )
+    return fig
+
+
+def render_kmf_over_thresholds(survival_curves, figsize):
+    import plotly.graph_objects as go
+
+    fig = go.Figure()
+    for threshold, curve in survival_curves.groupby("threshold", observed=True):
+        fig.add_trace(
+            go.Scatter(
+                x=curve["timeline"],
+                y=curve["survival"],
+                mode="lines",
+                name=f"Churn-Threshold: {threshold} days",
+            )
+        )
+    fig.update_layout(
+        title="User Retention Curve Over Varying Churn Thresholds",
+        xaxis_title="Days Since Signup",
+        yaxis_title="Survival Probability",
+        legend_title="Churn Thresholds",
+        template="plotly_white",
+    )
+    return fig
+
+
+def render_retention_matrix(retention, figsize):
+    import plotly.graph_objects as go
+
+    period = retention.columns.name
+    fig = go.Figure(
+        go.Heatmap(
+            z=retention.to_numpy() * 100,
+            x=retention.columns,
+            y=retention.index,
+            colorscale="Blues",
+            zmin=0,
+            zmax=100,
+            colorbar={"title": "Active %"},
+            hovertemplate=f"%{{y}}<br>{period} %{{x}} since signup<br>%{{z:.1f}}% active<extra></extra>",
+        )
+    )
+    fig.update_layout(
+        title=f"Share of Each Cohort Active per {period.capitalize()} Since Signup",
+        xaxis_title=f"{period.capitalize()}s Since Signup",
+        yaxis_title="Cohort",
+        yaxis_autorange="reversed",
+        template="plotly_white",
+    )
+    return fig
+
+
+def render_figure(name, payload, figsize, image_format="png", dpi=100, profile=False, renderer=None):
+    # Returns a picklable asset: encoded image bytes for matplotlib figures, a script-free div
+    # for Plotly figures. Embedding, sidecar files and plotly.js are decided when writing.
+    # With profile=True the asset carries stage records measured in the rendering process.
+    # Passing the renderer lets pool workers draw figures registered after import.
+    profiler = StageProfiler() if profile else None
+    stage = profiler.stage if profile else lambda _: nullcontext()
+    renderer = FIGURE_SPECS[name].renderer if renderer is None else renderer
+    with stage(f"render.{name}.build"):
+        fig = renderer(payload, figsize)
+    with stage(f"render.{name}.encode"):
+        if hasattr(fig, "savefig"):
+            asset = {"format": image_format, "data": figure_to_bytes(fig, image_format, dpi)}
+        else:
+            import plotly.io as pio
+
+            asset = {"format": "plotly", "data": pio.to_html(fig, include_plotlyjs=False, full_html=False)}
+    if profile:
+        asset["profile"] = profiler.records
+    return asset
+
+
+def merge_indexed_sums(left, right):
+    merged = pd.concat([left, right])
+    return merged.groupby(level=list(range(merged.index.nlevels)), observed=True).sum()
+
+
+def merge_device_counts(left, right):
+    return (
+        pd.concat([left, right])
+        .groupby(["group_code", "user_platform", "event_platform"], observed=True, as_index=False)["count"]
+        .sum()
+    )
+
+
+def merge_cohort_users(left, right):
+    return pd.concat([left, right], ignore_index=True).drop_duplicates()
+
+
+def merge_user_lifetimes(left, right):
+    return pd.concat([left, right]).groupby(level=0, observed=True).agg(
+        group_code=("group_code", "first"),
+        registration_date=("registration_date", "min"),
+        last_session_day=("last_session_day", "max"),
+    )
+
+
+def merge_first_sessions(left, right):
+    return (
+        pd.concat([left, right], ignore_index=True)
+        .sort_values("session_start_time", kind="stable")
+        .drop_duplicates(subset="user_key")
+    )
+
+
+AGGREGATE_MERGERS = {
+    "activity_cube": merge_indexed_sums,
+    "device_counts": merge_device_counts,
+    "cohort_users": merge_cohort_users,
+    "user_session_counts": merge_indexed_sums,
+    "daily_cohort_duration": merge_indexed_sums,
+    "first_sessions": merge_first_sessions,
+    "duration_histogram": merge_histograms,
+    "user_lifetimes": merge_user_lifetimes,
+    "activity_bitsets": merge_activity_bitsets,
+}
+
+
+FEATURE_COLUMNS = [
+    "plans_count",
+    "accounts_count",
+    "banking_usage",
+    "budgets_created",
+    "budgeting_usage",
+    "library_views",
+    "library_banking_views",
+    "library_budgeting_views",
+    "library_investing_views",
+    "credit_usage",
+    "dashboard_visits",
+    "goals_created",
+    "goal_module_usage",
+    "internship_submissions",
+    "investing_usage",
+    "logins",
+    "onboarding_info_completed",
+    "onboarding_avatar_done",
+    "onboarding_hobbies_set",
+    "onboarding_questions_answered",
+    "qa_interactions",
+    "saving_entries",
+    "settings_visits",
+    "signups",
+    "summerjob_usage",
+    "tax_module_usage",
+    "tuition_fees_recorded",
+]
+# Session columns each base aggregate reads; preprocessing always needs PREPROCESS_COLUMNS.
+# session_rank is derived in preprocess, and only for figures whose columns include it.
+AGGREGATE_COLUMNS = {
+    "activity_cube": ["group_code", "session_start_time"],
+    "device_counts": ["group_code", "user_platform", "event_platform"],
+    "cohort_users": ["group_code", "user_key"],
+    "user_session_counts": ["user_key", "session_key"],
+    "daily_cohort_duration": ["group_code", "session_start_time", "duration_mins"],
+    "first_sessions": ["user_key", "session_start_time", "duration_mins", "session_rank"],
+    "duration_histogram": ["duration_mins"],
+    "user_lifetimes": ["user_key", "group_code", "registration_date", "session_day"],
+    "activity_bitsets": ["user_key", "group_code", "registration_date", "session_day"],
+}
+PREPROCESS_COLUMNS = ["user_key", "group_code", "session_start_time"]
+
+
+class FigureSpec():
+    # One report figure: its page text, the renderer that draws it from a payload, the mergeable
+    # aggregates the payload is built from (None if it reads session rows) and the session
+    # columns it reads beyond those aggregates. payload, if given, is called with the Analysis
+    # in place of Analysis._payload_<name>, so figures can be plugged in without subclassing.
+    def __init__(
+        self,
+        name,
+        title,
+        section_id,
+        renderer,
+        aggregates,
+        description,
+        insight,
+        icon=None,
+        columns=(),
+        payload=None,
+    ):
+        self.name = name
+        self.title = title
+        self.section_id = section_id
+        self.renderer = renderer
+        self.aggregates = None if aggregates is None else list(aggregates)
+        self.columns = list(columns)
+        self.description = description
+        self.insight = insight
+        self.icon = icon
+        self.payload = payload
+
+
+FIGURE_SPECS = {}
+
+
+def register_figure(spec):
+    unknown = sorted(set(spec.aggregates or []) - set(AGGREGATE_COLUMNS))
+    if unknown:
+        raise ValueError(f"figure {spec.name!r} uses unknown aggregates {unknown}")
+    FIGURE_SPECS[spec.name] = spec
+    return spec
+
+
+def figure_columns(names, all_columns):
+    # Session columns needed to preprocess and draw the named figures, in all_columns order
+    needed = set(PREPROCESS_COLUMNS)
+    for name in names:
+        spec = FIGURE_SPECS[name]
+        needed.update(spec.columns)
+        for agg in spec.aggregates or []:
+            needed.update(AGGREGATE_COLUMNS[agg])
+    return [col for col in all_columns if col in needed]
+
+
+def feature_store_figures():
+    # Figures drawn entirely from per-user aggregates, which a user feature store can serve
+    return [
+        name
+        for name, spec in FIGURE_SPECS.items()
+        if spec.aggregates and set(spec.aggregates) <= set(USER_FEATURE_AGGREGATES)
+    ]
+
+
+register_figure(
+    FigureSpec(
+        "users_per_cohort",
+        title="Users per Cohort",
+        section_id="users-cohort",
+        renderer=render_users_per_cohort,
+        aggregates=["cohort_users"],
+        description="This visualization displays the number of unique users in each cohort, where it uses a bar chart to show cohort sizes, sorted in descending order, giving a clear sense of relative cohort volumes. Each user is counted once per cohort, ensuring accuracy in representation and avoiding duplication. This is particularly valuable in understanding the distribution of user acquisition over time or across campaigns.",
+        insight="Larger cohorts may point to successful acquisition campaigns, seasonal spikes, or effective onboarding strategies. Identifying top-performing cohorts allows product and growth teams to investigate what drove their success-be it marketing efforts, referral programs, feature rollouts, or user incentives. Conversely, smaller cohorts may highlight missed opportunities or signal areas for improvement in outreach or conversion. By analyzing user volume per cohort, teams can prioritize retention strategies for high-value groups and replicate successful acquisition patterns in future growth initiatives.",
+        icon="👥",
+    )
+)
+register_figure(
+    FigureSpec(
+        "device_usage",
+        title="Device Usage",
+        section_id="device-usage",
+        renderer=render_device_usage,
+        aggregates=["device_counts"],
+        description="This chart compares the device type used during signup with the devices users actually use during their session activities. The bar plot groups users by their signup device and breaks down session activity across different platforms (e.g., desktop, mobile, tablet) for each cohort. By visualizing device transition patterns-such as users signing up on one platform but engaging primarily on another-this analysis offers a layered view of how and where users choose to interact post-onboarding.",
+        insight="Understanding device migration and multi-platform behavior is critical for optimizing user experience. For example, if a large share of users signs up on desktop but later shifts to mobile for engagement, it suggests the need for mobile-first design considerations, especially for retention-critical features. This insight also helps teams identify inconsistencies between acquisition and engagement platforms, guiding where to invest in UI/UX improvements, performance optimization, or cross-platform messaging. It's especially valuable for tailoring onboarding flows and anticipating support or functionality needs specific to each device type.",
+        icon="📱",
+    )
+)
+register_figure(
+    FigureSpec(
+        "hourly_activity",
+        title="Hourly Activity",
+        section_id="hourly-activity",
+        renderer=render_hourly_activity,
+        aggregates=["activity_cube"],
+        description="This histogram illustrates user session volume across each hour of the day (0-23), revealing patterns in diurnal engagement behavior. The plot includes a kernel density estimate (KDE) to highlight underlying trends in hourly activity beyond raw session counts. This visualization is particularly useful for identifying time-based usage spikes and quiet periods, helping teams understand when users are most likely to interact with the product.",
+        insight="By recognizing peak activity hours, you can better time product updates, support availability, push notifications, or marketing messages for maximum impact. If user engagement is heavily skewed toward specific times of day, it may also influence infrastructure scaling decisions or indicate opportunities to personalize time-sensitive features. For global platforms, time zone clustering may be inferred and teams can further explore regional segmentation to fine-tune the timing of in-app events or campaigns.",
+        icon="⏰",
+    )
+)
+register_figure(
+    FigureSpec(
+        "weekday_activity",
+        title="Weekday Activity",
+        section_id="weekday-activity",
+        renderer=render_weekday_activity,
+        aggregates=["activity_cube"],
+        description="This count plot summarizes session activity across the days of the week, offering a view into weekly behavioral rhythms. The days are ordered from Monday through Sunday, making trends in weekday versus weekend engagement easy to interpret at a glance. Understanding these patterns is valuable for mapping user intent and planning time-sensitive interactions.",
+        insight="Weekday activity spikes may reflect work or productivity related usage, while weekend patterns can suggest casual or leisure-time engagement. This insight helps tailor product experiences to match user expectations-for instance, prioritizing content or features with different use cases during the weekend vs. workdays. It can also support scheduling feature rollouts, downtime planning, or content marketing for maximum reach. Identifying dips may highlight disengagement windows or inspire experiments to increase stickiness on low-activity days.",
+        icon="📅",
+    )
+)
+register_figure(
+    FigureSpec(
+        "login_by_weekday",
+        title="Login by Weekday",
+        section_id="login-weekday",
+        renderer=render_login_by_weekday,
+        aggregates=["activity_cube"],
+        columns=["logins"],
+        description="This bar chart presents the total number of login events per weekday by aggregating login counts across all user sessions. It follows a chronological weekday order (Monday through Sunday), allowing for intuitive identification of access patterns throughout the week. Unlike raw session activity, this chart specifically focuses on login actions-offering a closer look at authentication frequency rather than general engagement.",
+        insight="Understanding when users log in most often is crucial for identifying behavioral habits and platform touchpoints. A high volume of logins early in the week may indicate productivity-oriented use cases, while weekend spikes may point toward recreational or casual usage. This insight can inform everything from customer support hours and authentication system load management to the strategic timing of security features (e.g., 2FA prompts) or login-driven campaigns (e.g., streaks, reward activations). Identifying login drop-offs may also help surface friction in reactivation or accessibility.",
+        icon="🔐",
+    )
+)
+register_figure(
+    FigureSpec(
+        "feature_engagement",
+        title="Feature Engagement",
+        section_id="feature-engagement",
+        renderer=render_feature_engagement,
+        aggregates=["activity_cube"],
+        columns=FEATURE_COLUMNS,
+        description="This visualization breaks down feature usage counts across different user cohorts, showcasing which features are most heavily interacted with-and by whom. The chart uses a bar plot grouped by feature, with each bar segmented by cohort, enabling comparisons of feature adoption across time-based or campaign-driven user groups. Before plotting, the data filters out unused or zero-usage features, ensuring that the analysis focuses only on relevant interactions.",
+        insight="Mapping feature usage by cohort reveals how different user segments interact with your product and whether recent cohorts are engaging differently compared to earlier ones. This is key for tracking feature adoption over time, validating product launches and tailoring onboarding to highlight the most relevant tools for each group. Disparities in feature usage between cohorts may indicate changes in user needs, gaps in discoverability, or the success of recent UX or product updates. This analysis can directly support roadmap prioritization by showing which features deliver value to key growth-driving segments.",
+        icon="📊",
+    )
+)
+register_figure(
+    FigureSpec(
+        "repeat_feature_usage",
+        title="Repeat Feature Usage",
+        section_id="repeat-usage",
+        renderer=render_repeat_feature_usage,
+        aggregates=["activity_cube"],
+        columns=FEATURE_COLUMNS,
+        description="This chart highlights the average usage frequency of individual features across all user sessions, excluding features with negligible interaction (less than 0.01 average usage). By focusing on features that demonstrate recurring use, it surfaces which tools or capabilities consistently attract user attention and engagement. The bars represent normalized usage across the entire dataset, offering a standardized view of which features are habitually used across your user base.",
+        insight="This analysis is instrumental in identifying 'sticky' features-those that users return to repeatedly, indicating high utility, satisfaction, or value. These features often form the core of the product experience and can serve as anchors for onboarding, upsell paths, or habit-building strategies. Understanding which features are habitually used allows teams to allocate development and UX resources more effectively, double down on what's working and potentially deprecate or rework less relevant capabilities.",
+        icon="🔁",
+    )
+)
+register_figure(
+    FigureSpec(
+        "feature_usage_distribution",
+        title="Feature Usage Distribution",
+        section_id="usage-distribution",
+        renderer=render_feature_usage_distribution,
+        aggregates=["activity_cube"],
+        columns=FEATURE_COLUMNS,
+        description="This visualization presents the total usage count for each tracked feature, sorted in descending order. It offers a raw, unnormalized view of absolute engagement-highlighting the most frequently accessed functionalities across the entire user base. By filtering out features with zero interactions, the chart ensures a clean and focused representation of actual user behavior.",
+        insight="This distribution uncovers which features are driving the bulk of user engagement. High-frequency features are likely central to user workflows, whereas low-frequency ones may suffer from discoverability issues, usability friction, or lack of perceived value. The analysis can guide product strategy by validating the prominence of flagship features and surfacing potential gaps in feature adoption. It's particularly valuable when assessing return on investment for recent launches or deciding which features should be promoted or simplified.",
+        icon="📈",
+    )
+)
+register_figure(
+    FigureSpec(
+        "session_frequency",
+        title="Session Frequency",
+        section_id="session-frequency",
+        renderer=render_session_frequency,
+        aggregates=["user_session_counts"],
+        description="This histogram visualizes the distribution of how many sessions each user has initiated, based on a count of unique session IDs per user. The plot uses a log-scaled y-axis to accommodate the wide variance between casual and highly active users and includes a KDE (density curve) to illustrate underlying trends. This gives a quantitative overview of engagement intensity across your entire user base.",
+        insight="Understanding session frequency is key to identifying distinct user segments-from one-time visitors to highly engaged power users. A long-tail distribution (many low-frequency users, few high-frequency ones) is typical in most digital products, but the shape and slope of this tail can signal product health. This insight enables tailored lifecycle messaging, supports feature targeting strategies and informs monetization opportunities (e.g., identifying high-frequency users for upsell or loyalty programs).",
+        icon="🧍‍♂️",
+    )
+)
+register_figure(
+    FigureSpec(
+        "first_vs_later_session_duration",
+        title="First vs. Later Sessions",
+        section_id="first-vs-later",
+        renderer=render_first_vs_later_session_duration,
+        aggregates=["first_sessions", "duration_histogram"],
+        description="This dual KDE (Kernel Density Estimate) plot compares session duration between users' first sessions and all subsequent sessions. By analyzing the distribution of time spent, this chart reveals how user engagement evolves after the initial interaction. First sessions are separated using session rank, making it easy to evaluate onboarding quality versus ongoing engagement.",
+        insight="If first sessions are short and later sessions are longer, it may indicate that users need time to discover value-or that your onboarding is insufficient. Conversely, if early sessions are long but drop off later, it may suggest initial curiosity followed by disengagement. These patterns help diagnose onboarding effectiveness, inform activation metrics and reveal whether users are building long-term habits or experiencing early drop-off after exploration.",
+        icon="🎯",
+    )
+)
+register_figure(
+    FigureSpec(
+        "session_duration_over_time",
+        title="Session Duration Over Time",
+        section_id="duration-over-time",
+        renderer=render_session_duration_over_time,
+        aggregates=["daily_cohort_duration"],
+        description="This time-series line chart tracks the average session duration per cohort across calendar dates. Each line represents a distinct user cohort, enabling longitudinal comparison of how engagement depth (measured in minutes) changes over time. The function aggregates session duration daily and segments it by cohort, giving a detailed look at how different user groups interact over the lifecycle.",
+        insight="Fluctuations in session duration can signal changes in product experience, content quality, or feature relevance. A steady increase over time may reflect improved user understanding or stickier functionality, while drops might point to usability issues, disengagement, or product fatigue. Cohort-based trends allow you to assess the long-term impact of product changes and differentiate between temporary dips and structural engagement shifts-helping you fine-tune retention strategies and feature optimization.",
+        icon="📉",
+    )
+)
+register_figure(
+    FigureSpec(
+        "kmf_over_thresholds",
+        title="Retention Curve",
+        section_id="retention",
+        renderer=render_kmf_over_thresholds,
+        aggregates=["user_lifetimes"],
+        description="This interactive chart presents Kaplan-Meier survival curves, visualizing user retention across different churn threshold definitions (e.g., 7, 14, 30 days without return). Each curve represents the probability of a user remaining active as a function of time since signup, calculated using survival analysis. Each user contributes one observation-their lifetime from signup to last session-and counts as churned when they have been inactive for at least the threshold by the end of the observation window; users with no activity after signup are excluded. This allows for a more flexible, scenario-based exploration of how retention behaves under various business rules or lifecycle definitions.",
+        insight="Kaplan-Meier curves provide a statistically grounded method for evaluating retention over time. Unlike basic retention metrics, these curves account for censored data-users who haven't yet churned-which makes them more robust, especially for products with long user lifecycles. Comparing curves across thresholds reveals how sensitive retention performance is to changes in your churn definition. A steep early drop-off might signal onboarding issues, while a gradual decline suggests sustained engagement. Identifying crossover points or stability plateaus helps inform when to invest in reactivation strategies, loyalty programs, or habit-forming features. This visualization is particularly powerful for benchmarking the effectiveness of lifecycle interventions and understanding how engagement decays across different user cohorts.",
+        icon="📉",
+    )
+)
+register_figure(
+    FigureSpec(
+        "retention_matrix",
+        title="Cohort Retention Matrix",
+        section_id="retention-matrix",
+        renderer=render_retention_matrix,
+        aggregates=["activity_bitsets"],
+        description="This heatmap shows classic cohort retention: each row is a cohort (by default the group code, or the registration month) and each column a week since signup, and every cell is the share of the cohort's users with at least one session in that week. Only users whose week k had begun by the end of the data count toward column k, so recent signups do not drag later columns down. Each user's activity is kept as a packed bitset, one bit per week, and the cells come from popcounts over those bits per cohort.",
+        insight="Read across a row to see how quickly a cohort decays and where it flattens into a stable core; read down a column to compare cohorts at the same age. A cohort whose row is darker than the others at the same age retained better, which points at what differed for it-onboarding changes, acquisition channel or seasonality. A steep fall in the first columns signals activation problems, while a slow fade later on is a long-term engagement question. Unlike the Kaplan-Meier curves, a user who comes back after a gap counts as active again in that period.",
+        icon="🧮",
+    )
+)
+
+
+PROFILE_APPENDIX_PAGE = FigureSpec(
+    "run_profile",
+    title="Appendix: Run Profile",
+    section_id="run-profile",
+    renderer=None,
+    aggregates=[],
+    description="Wall-clock time, CPU time and memory for every stage of the run that produced this report: preprocessing, each aggregation and payload, building and encoding each figure, and assembling the HTML. Figure build/encode rows come from the process that rendered the figure.",
+    insight="Wall time well above CPU time points to I/O or waiting on worker processes; CPU time above wall time means work ran in parallel. Peak growth shows which stage raised the process memory high-water mark, which is where to look when larger inputs run out of memory.",
+    icon="⏱️",
+)
 
 class Analysis():
-    def __init__(self, df, churn_thresholds=[15, 30, 45, 60, 90]):
+    def __init__(self, df, churn_thresholds=[15, 30, 45, 60, 90], chunk_rows=None, figures=None):
         self.req_cols = [
             "user_key",
             "group_code",
@@ -50,64 +942,182 @@ class Analysis():
             "tax_module_usage",
             "tuition_fees_recorded",
         ]
-        self.feature_columns = [
-            "plans_count",
-            "accounts_count",
-            "banking_usage",
-            "budgets_created",
-            "budgeting_usage",
-            "library_views",
-            "library_banking_views",
-            "library_budgeting_views",
-            "library_investing_views",
-            "credit_usage",
-            "dashboard_visits",
-            "goals_created",
-            "goal_module_usage",
-            "internship_submissions",
-            "investing_usage",
-            "logins",
-            "onboarding_info_completed",
-            "onboarding_avatar_done",
-            "onboarding_hobbies_set",
-            "onboarding_questions_answered",
-            "qa_interactions",
-            "saving_entries",
-            "settings_visits",
-            "signups",
-            "summerjob_usage",
-            "tax_module_usage",
-            "tuition_fees_recorded",
-        ]
-        self.df = (
-            df[self.req_cols].dropna(axis=0, subset=["group_code"], how="all").copy()
+        # With figures given, only the columns those figures need are read and preprocessed
+        self.figures = None if figures is None else list(figures)
+        unknown = sorted(set(self.figures or []) - set(FIGURE_SPECS))
+        if unknown:
+            raise ValueError(f"unknown figures {unknown}; choose from {list(FIGURE_SPECS)}")
+        self.columns = (
+            self.req_cols if self.figures is None else figure_columns(self.figures, self.req_cols)
         )
+        self.feature_columns = [col for col in FEATURE_COLUMNS if col in self.columns]
+        self.source_path = None
+        self.chunk_rows = chunk_rows
+        if isinstance(df, (str, os.PathLike)) and chunk_rows:
+            self.source_path = df
+            self.df = None
+        elif df is None:
+            # No session rows; aggregates are supplied directly (see from_feature_store)
+            self.df = None
+        else:
+            if isinstance(df, (str, os.PathLike)):
+                df = read_session_data(df, columns=self.columns)
+            self.df = df.loc[df["group_code"].notna(), self.columns]
         self.figsize = (14, 8)
+        self.max_plot_points = 20_000
+        self.image_format = "png"
+        self.image_dpi = 100
+        self.embed_images = True
+        self.lazy_figures = False
+        self.plotlyjs = "cdn"
+        self.max_report_bytes = None
+        self.asset_sizes = {}
+        self.sidecar_bytes = 0
         self.churn_thresholds = churn_thresholds
+        self.retention_period = "week"
+        self.retention_cohort = "group_code"
+        self.verbose = True
+        self.memory_usage = {}
+        self.timings = {}
+        self.aggregates = {}
+        self.profile = False
+        self.profile_appendix = False
+        self.profile_figure = None
+        self.profiler = None
+        self.sql_profiler = None
+        self.user_features = None
+        self.report_path = None
+
+    @classmethod
+    def from_raw_logs(cls, data_dir, churn_thresholds=[15, 30, 45, 60, 90], figures=None, **sql_options):
+        # Runs transform_user_sessions.sql on DuckDB over local raw tables and analyses the
+        # result in memory; the SQL stage records join the run profile when profile=True.
+        from local_sql_engine import run_session_sql
+
+        profiler = StageProfiler()
+        sessions = run_session_sql(data_dir, profiler=profiler, **sql_options)
+        # The query's session_key comes from user_keys, one per user, so every session of a
+        # user shares it; interaction_id is the per-session identifier Analysis counts on
+        sessions["session_key"] = sessions["interaction_id"]
+        analysis = cls(sessions, churn_thresholds=churn_thresholds, figures=figures)
+        analysis.sql_profiler = profiler
+        return analysis
+
+    @classmethod
+    def from_feature_store(cls, path, churn_thresholds=[15, 30, 45, 60, 90], figures=None):
+        # Reports from a persisted user feature table (see update_feature_store) instead of
+        # session rows. Only figures drawn entirely from per-user aggregates are available;
+        # by default all of them.
+        supported = feature_store_figures()
+        unsupported = sorted(set(figures or []) - set(supported))
+        if unsupported:
+            raise ValueError(f"figures {unsupported} need session rows; a feature store serves {supported}")
+        features, _ = UserFeatureStore(path).load()
+        if features is None:
+            raise FileNotFoundError(f"no user feature store at {path}")
+        analysis = cls(None, churn_thresholds=churn_thresholds, figures=figures or supported)
+        analysis.user_features = features
+        return analysis
+
+    def update_feature_store(self, path):
+        # Upserts this session table into the user feature store at path, keyed on user_key.
+        # Replays are detected on the session_key values as loaded: normalize_schema swaps them
+        # for per-table ids, which would collide between batches.
+        if self.df is None:
+            raise ValueError("update_feature_store needs the session table in memory")
+        if isinstance(self.df["group_code"].dtype, pd.CategoricalDtype):
+            raise ValueError("update_feature_store needs the session rows as loaded, before preprocess")
+        session_keys = self.df["session_key"].astype(str).to_numpy()
+        self.normalize_schema()
+        return UserFeatureStore(path).upsert(self.df, self.feature_columns, session_keys=session_keys)
+
+    @contextmanager
+    def timed_step(self, name):
+        started = time.perf_counter()
+        probe = None if self.profiler is None else self.profiler.start()
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - started
+            if probe is not None:
+                self.profiler.stop(name, probe)
+
+    def normalize_schema(self):
+        # The deep memory measurement walks every string, so it only runs when it is reported
+        measure = self.verbose or self.profile or self.profiler is not None
+        if measure:
+            with self.timed_step("preprocess.normalize_schema.measure_memory"):
+                before = self.df.memory_usage(deep=True).sum()
+        with self.timed_step("preprocess.normalize_schema.encode_categoricals"):
+            group_code = self.df["group_code"].astype("category")
+            labels = group_code.cat.categories.astype(str).str.replace(".0", "", regex=False)
+            categories, remap = np.unique(np.asarray(labels, dtype=str), return_inverse=True)
+            self.df["group_code"] = pd.Categorical.from_codes(
+                remap[group_code.cat.codes.to_numpy()], categories=categories
+            )
+            for col in ["user_platform", "event_platform", "user_key"]:
+                if col in self.df:
+                    self.df[col] = self.df[col].astype("category")
+            if "session_key" in self.df:
+                session_ids, _ = pd.factorize(self.df["session_key"])
+                self.df["session_key"] = session_ids.astype(
+                    np.int32 if len(session_ids) < np.iinfo(np.int32).max else np.int64
+                )
+        with self.timed_step("preprocess.normalize_schema.parse_timestamps"):
+            for col in ["registration_date", "session_day", "session_start_time"]:
+                if col in self.df:
+                    self.df[col] = pd.to_datetime(self.df[col])
+        with self.timed_step("preprocess.normalize_schema.downcast_counters"):
+            for col in self.feature_columns + ["duration_mins"]:
+                if col in self.df:
+                    self.df[col] = pd.to_numeric(
+                        self.df[col],
+                        downcast="unsigned" if (self.df[col] >= 0).all() else "integer",
+                    )
+        if not measure:
+            return
+        with self.timed_step("preprocess.normalize_schema.measure_memory"):
+            after = self.df.memory_usage(deep=True).sum()
+        self.memory_usage = {"before_bytes": int(before), "after_bytes": int(after)}
+        if self.verbose:
+            print(
+                f"[INFO] {time.ctime()} | Analysis.df memory: {before / 1024**2:,.1f} MB -> {after / 1024**2:,.1f} MB"
+            )
 
     def preprocess(self):
-        self.df["group_code"] = (
-            self.df["group_code"].astype(str).str.replace(".0", "", regex=False)
-        )
-        self.df["session_start_time"] = pd.to_datetime(
-            self.df["session_start_time"]
-        )
-        self.df["session_hour"] = pd.to_datetime(
-            self.df["session_start_time"]
-        ).dt.hour
-        self.df["session_weekday"] = pd.to_datetime(
-            self.df["session_start_time"]
-        ).dt.day_name()
-        self.df["session_start_date_only"] = self.df["session_start_time"].dt.date
-        self.df["session_day"] = pd.to_datetime(self.df["session_day"])
-        self.df = self.df.sort_values(by=["session_day"], ascending=True, inplace=False)
-        self.df["registration_date"] = pd.to_datetime(self.df["registration_date"])
-        self.df["days_since_signup"] = (
-            self.df["session_day"] - self.df["registration_date"]
-        )
-        self.df["session_rank"] = self.df.groupby("user_key")[
-            "session_start_time"
-        ].rank(method="first")
+        self.aggregates = {}
+        self.normalize_schema()
+        with self.timed_step("preprocess.derive_time_fields"):
+            start = self.df["session_start_time"]
+            self.df["session_hour"] = start.dt.hour.astype(np.uint8)
+            self.df["session_weekday"] = pd.Categorical.from_codes(
+                start.dt.dayofweek, categories=WEEKDAYS, ordered=True
+            )
+            self.df["session_start_date_only"] = start.dt.normalize()
+            if {"session_day", "registration_date"} <= set(self.df.columns):
+                self.df["days_since_signup"] = (
+                    self.df["session_day"] - self.df["registration_date"]
+                )
+        # The per-user sort behind session_rank only runs when a selected figure reads it
+        if self.figures is None or figure_columns(self.figures, ["session_rank"]):
+            self.rank_sessions()
+        if not self.verbose:
+            return
+        for name, seconds in self.timings.items():
+            if name.startswith("preprocess."):
+                print(f"[INFO] {time.ctime()} | {name}: {seconds:.3f}s")
+
+    def rank_sessions(self):
+        # session_rank: 1 for each user's first session by start time, 2 for the next, ...
+        with self.timed_step("preprocess.session_rank"):
+            user_codes = self.df["user_key"].cat.codes.to_numpy()
+            order = np.lexsort((self.df["session_start_time"].to_numpy().view(np.int64), user_codes))
+            self.df = self.df.iloc[order]
+            user_codes = user_codes[order]
+            positions = np.arange(len(user_codes))
+            first_of_user = np.r_[True, user_codes[1:] != user_codes[:-1]]
+            run_start = np.maximum.accumulate(np.where(first_of_user, positions, 0))
+            self.df["session_rank"] = (positions - run_start + 1).astype(np.uint32)
 
     def create_plot_page(
         self,
@@ -123,426 +1133,519 @@ class Analysis():
         section_id_attr = f"id='{section_id}'" if section_id else ""
         return f"""<div class="page" {section_id_attr}><h2>{icon_html}{title}</h2>{plot_html}<p class="description">{description}</p><p class="insight"><strong>How to interpret:</strong> {insight}</p><div class="footer">Page {page_num}</div></div>"""
 
-    def mpl_to_base64(self):
-        buf = BytesIO()
-        plt.savefig(buf, format="png", bbox_inches="tight")
-        plt.close()
-        buf.seek(0)
-        return base64.b64encode(buf.read()).decode("UTF-8")
-
-    def annotate_bars(self, ax, int_=True):
-        for p in ax.patches:
-            height = p.get_height()
-            if int_:
-                if height > 0:
-                    ax.annotate(
-                        f"{int(height)}",
-                        (p.get_x() + p.get_width() / 2, height),
-                        ha="center",
-                        va="center",
-                        fontsize=8,
-                        color="black",
-                        xytext=(0, 5),
-                        textcoords="offset points",
-                    )
-            else:
-                if p.get_height() > 0.0:
-                    ax.annotate(
-                        f"{round(number=p.get_height(), ndigits=2)}",
-                        (p.get_x() + p.get_width() / 2, p.get_height()),
-                        ha="center",
-                        va="center",
-                        fontsize=8,
-                        color="black",
-                        xytext=(0, 5),
-                        textcoords="offset points",
-                    )
+    def aggregate(self, name):
+        if name not in self.aggregates:
+            with self.timed_step(f"aggregate.{name}"):
+                self.aggregates[name] = getattr(self, f"_aggregate_{name}")()
+        return self.aggregates[name]
 
-    def plot_users_per_cohort(self):
-        plt.figure(figsize=self.figsize)
-        ax = sns.barplot(
-            data=self.df.drop_duplicates(subset=["group_code", "user_key"])
-            .groupby("group_code")
+    def _aggregate_activity_cube(self):
+        grouped = self.df.groupby(
+            ["group_code", "session_weekday", "session_hour"], observed=True
+        )
+        cube = grouped[self.feature_columns].sum()
+        cube.insert(0, "sessions", grouped.size())
+        return cube
+
+    def _aggregate_cohort_feature_totals(self):
+        return (
+            self.aggregate("activity_cube")
+            .groupby("group_code", observed=True)[self.feature_columns]
+            .sum()
+        )
+
+    def _aggregate_device_counts(self):
+        return (
+            self.df.groupby(["group_code", "user_platform", "event_platform"], observed=True)
             .size()
             .reset_index(name="count")
-            .sort_values(by="count", ascending=False),
-            x="group_code",
-            hue="group_code",
-            legend=False,
-            y="count",
-            palette="pastel",
-        )
-        self.annotate_bars(ax)
-        plt.xlabel("Cohort")
-        plt.ylabel("Count")
-        plt.tight_layout()
-        return f"<img src='data:image/png;base64,{self.mpl_to_base64()}'/>"
+        )
 
-    def plot_device_usage(self):
-        plt.figure(figsize=self.figsize)
-        ax = sns.barplot(
-            data=self.df.groupby(["group_code", "user_platform", "event_platform"])
+    def _aggregate_cohort_users(self):
+        return self.df[["group_code", "user_key"]].drop_duplicates()
+
+    def _aggregate_user_session_counts(self):
+        return self.df.groupby("user_key", observed=True)["session_key"].nunique()
+
+    def _aggregate_daily_cohort_duration(self):
+        return self.df.groupby(
+            ["session_start_date_only", "group_code"], observed=True
+        )["duration_mins"].agg(["sum", "count"])
+
+    def _aggregate_first_sessions(self):
+        if "session_rank" not in self.df:
+            # Reached from a figure list other than the one preprocess ranked for
+            self.rank_sessions()
+        return self.df.loc[
+            self.df["session_rank"] == 1,
+            ["user_key", "session_start_time", "duration_mins"],
+        ]
+
+    def _aggregate_user_lifetimes(self):
+        return self.df.groupby("user_key", observed=True).agg(
+            group_code=("group_code", "first"),
+            registration_date=("registration_date", "min"),
+            last_session_day=("session_day", "max"),
+        )
+
+    def _aggregate_activity_bitsets(self):
+        return ActivityBitsets.from_sessions(
+            self.df["user_key"],
+            self.df["group_code"],
+            self.df["registration_date"],
+            self.df["session_day"],
+            period=self.retention_period,
+        )
+
+    def _aggregate_duration_histogram(self):
+        return BinnedHistogram(*DURATION_RANGE).update(self.df["duration_mins"].to_numpy())
+
+    def _payload_users_per_cohort(self):
+        return (
+            self.aggregate("cohort_users")
+            .groupby("group_code", observed=True)
             .size()
-            .reset_index(name="count"),
-            x="user_platform",
-            y="count",
-            hue="event_platform",
-            palette="pastel",
-        )
-        self.annotate_bars(ax)
-        plt.xlabel("Device Type at Signup")
-        plt.ylabel("Count")
-        plt.tight_layout()
-        return f"<img src='data:image/png;base64,{self.mpl_to_base64()}'/>"
+            .reset_index(name="count")
+            .sort_values(by="count", ascending=False, kind="stable")
+        )
 
-    def plot_hourly_activity(self):
-        plt.figure(figsize=self.figsize)
-        ax = sns.histplot(self.df["session_hour"], bins=24, kde=True, color="skyblue")
-        self.annotate_bars(ax)
-        plt.xlabel("Hour of Day")
-        plt.ylabel("Session Count")
-        plt.tight_layout()
-        return f"<img src='data:image/png;base64,{self.mpl_to_base64()}'/>"
+    def _payload_device_usage(self):
+        return self.aggregate("device_counts")
 
-    def plot_weekday_activity(self):
-        plt.figure(figsize=self.figsize)
-        ax = sns.countplot(
-            data=self.df,
-            x="session_weekday",
-            hue="session_weekday",
-            legend=False,
-            order=[
-                "Monday",
-                "Tuesday",
-                "Wednesday",
-                "Thursday",
-                "Friday",
-                "Saturday",
-                "Sunday",
-            ],
-            palette="pastel",
-        )
-        self.annotate_bars(ax)
-        plt.xlabel("Weekday")
-        plt.ylabel("Session Count")
-        plt.tight_layout()
-        return f"<img src='data:image/png;base64,{self.mpl_to_base64()}'/>"
+    def _payload_hourly_activity(self):
+        hourly_sessions = self.aggregate("activity_cube").groupby("session_hour")["sessions"].sum()
+        return BinnedHistogram(*HOUR_RANGE).update(
+            hourly_sessions.index.to_numpy(), weights=hourly_sessions.to_numpy()
+        )
 
-    def plot_login_by_weekday(self):
-        plt.figure(figsize=self.figsize)
-        weekday_login = (
-            self.df.groupby("session_weekday")["logins"]
+    def _payload_weekday_activity(self):
+        return (
+            self.aggregate("activity_cube")
+            .groupby("session_weekday", observed=True)["sessions"]
             .sum()
-            .reindex(
-                [
-                    "Monday",
-                    "Tuesday",
-                    "Wednesday",
-                    "Thursday",
-                    "Friday",
-                    "Saturday",
-                    "Sunday",
-                ]
-            )
+            .reindex(WEEKDAYS, fill_value=0)
         )
-        ax = sns.barplot(
-            x=weekday_login.index, y=weekday_login.values, palette="pastel", hue=weekday_login.index, legend=False,
+
+    def _payload_login_by_weekday(self):
+        return (
+            self.aggregate("activity_cube")
+            .groupby("session_weekday", observed=True)["logins"]
+            .sum()
+            .reindex(WEEKDAYS)
         )
-        self.annotate_bars(ax)
-        plt.xlabel("Weekday")
-        plt.ylabel("Total Logins")
-        plt.tight_layout()
-        return f"<img src='data:image/png;base64,{self.mpl_to_base64()}'/>"
 
-    def plot_feature_engagement(self):
-        plt.figure(figsize=self.figsize)
+    def _payload_feature_engagement(self):
+        cohort_totals = self.aggregate("cohort_feature_totals")
+        cohort_totals = cohort_totals.loc[:, cohort_totals.sum() > 0]
+        cohort_totals.columns = cohort_totals.columns.str.replace("_count", "", regex=False)
+        feature_order = (
+            cohort_totals.sum().sort_index().sort_values(ascending=False, kind="stable").index.tolist()
+        )
         feature_engagement = (
-            self.df.melt(
-                id_vars=["group_code"],
-                value_vars=self.feature_columns,
-                var_name="feature",
-                value_name="usage_count",
-            )
-            .groupby(by=["group_code", "feature"])["usage_count"]
-            .sum()
+            cohort_totals.rename_axis(columns="feature")
+            .stack()
+            .rename("usage_count")
             .reset_index()
         )
-        feature_engagement["feature"] = feature_engagement["feature"].str.replace(
-            "_count", "", regex=False
-        )
-        total_usage = feature_engagement.groupby("feature")["usage_count"].sum()
-        non_zero_features = total_usage[total_usage > 0].index.tolist()
-        feature_engagement = feature_engagement[
-            feature_engagement["feature"].isin(non_zero_features)
-        ]
-        feature_order = (
-            feature_engagement.groupby("feature")["usage_count"]
-            .sum()
-            .sort_values(ascending=False)
-            .index.tolist()
-        )
-        ax = sns.barplot(
-            data=feature_engagement,
-            x="feature",
-            y="usage_count",
-            hue="group_code",
-            palette="pastel",
-            order=feature_order,
-        )
-        self.annotate_bars(ax)
-        plt.xticks(rotation=90)
-        plt.xlabel("Features")
-        plt.ylabel("Total Usage Count")
-        plt.legend(title="Cohort")
-        plt.tight_layout()
-        return f"<img src='data:image/png;base64,{self.mpl_to_base64()}'/>"
+        return feature_engagement, feature_order
 
-    def plot_repeat_feature_usage(self):
-        avg_feature_usage = self.df[self.feature_columns].mean()
+    def _payload_repeat_feature_usage(self):
+        activity_cube = self.aggregate("activity_cube")
+        avg_feature_usage = (
+            activity_cube[self.feature_columns].sum() / activity_cube["sessions"].sum()
+        )
         avg_feature_usage = avg_feature_usage[avg_feature_usage > 0.01]
-        avg_feature_usage = avg_feature_usage.sort_values(ascending=False)
+        avg_feature_usage = avg_feature_usage.sort_values(ascending=False, kind="stable")
         avg_feature_usage.index = [
             col.replace("_count", "") for col in avg_feature_usage.index
         ]
-        plt.figure(figsize=self.figsize)
-        ax = sns.barplot(
-            x=avg_feature_usage.index, y=avg_feature_usage.values, palette="pastel", hue=avg_feature_usage.index, legend=False,
-        )
-        self.annotate_bars(ax, int_=False)
-        plt.xticks(rotation=45, ha="right")
-        plt.ylabel("Average Usage Count")
-        plt.xlabel("Features")
-        plt.tight_layout()
-        return f"<img src='data:image/png;base64,{self.mpl_to_base64()}'/>"
+        return avg_feature_usage
 
-    def plot_feature_usage_distribution(self):
+    def _payload_feature_usage_distribution(self):
         feature_usage = (
-            self.df[self.feature_columns]
+            self.aggregate("activity_cube")[self.feature_columns]
             .sum()
-            .sort_values(ascending=False)
+            .sort_values(ascending=False, kind="stable")
             .reset_index(name="count")
         )
         feature_usage["index"] = feature_usage["index"].str.replace(
             "_count", "", regex=False
         )
-        feature_usage = feature_usage[feature_usage["count"] > 0]
-        plt.figure(figsize=self.figsize)
-        ax = sns.barplot(
-            x=feature_usage["index"], y=feature_usage["count"], palette="pastel", hue=feature_usage["index"], legend=False,
-        )
-        self.annotate_bars(ax)
-        plt.xticks(rotation=45, ha="right")
-        plt.ylabel("Total Count")
-        plt.xlabel("Features")
-        plt.tight_layout()
-        return f"<img src='data:image/png;base64,{self.mpl_to_base64()}'/>"
+        return feature_usage[feature_usage["count"] > 0]
 
-    def plot_session_frequency(self):
-        plt.figure(figsize=self.figsize)
-        ax = sns.histplot(
-            self.df.groupby("user_key")["session_key"]
-            .nunique()
-            .reset_index()["session_key"],
-            bins=50,
-            kde=True,
-            color="purple",
-        )
-        self.annotate_bars(ax)
-        plt.xlabel("Number of Sessions")
-        plt.ylabel("Number of Users")
-        plt.yscale("log")
-        plt.tight_layout()
-        return f"<img src='data:image/png;base64,{self.mpl_to_base64()}'/>"
+    def _payload_session_frequency(self):
+        session_frequency = self.aggregate("user_session_counts").value_counts()
+        return BinnedHistogram(1, int(session_frequency.index.max())).update(
+            session_frequency.index.to_numpy(), weights=session_frequency.to_numpy()
+        )
 
-    def plot_first_vs_later_session_duration(self):
-        plt.figure(figsize=self.figsize)
-        sns.kdeplot(
-            self.df[self.df["session_rank"] == 1]["duration_mins"],
-            label="First Session",
-            fill=True,
-        )
-        sns.kdeplot(
-            self.df[self.df["session_rank"] > 1]["duration_mins"],
-            label="Later Sessions",
-            fill=True,
-            color="orange",
-        )
-        plt.title("First vs. Later Session Duration")
-        plt.xlabel("Session Duration (minutes)")
-        plt.ylabel("Density")
-        plt.legend()
-        plt.tight_layout()
-        return f"<img src='data:image/png;base64,{self.mpl_to_base64()}'/>"
+    def _payload_first_vs_later_session_duration(self):
+        all_durations = self.aggregate("duration_histogram")
+        first_durations = BinnedHistogram(*DURATION_RANGE).update(
+            self.aggregate("first_sessions")["duration_mins"].to_numpy()
+        )
+        later_durations = BinnedHistogram(*DURATION_RANGE)
+        later_durations.counts = all_durations.counts - first_durations.counts
+        return {"first": first_durations, "later": later_durations}
 
-    def plot_session_duration_over_time(self):
-        grouped = (
-            self.df.groupby(["session_start_date_only", "group_code"])["duration_mins"]
-            .mean()
-            .reset_index()
+    def _payload_session_duration_over_time(self):
+        return downsample_daily_durations(
+            self.aggregate("daily_cohort_duration"), self.max_plot_points
         )
-        fig = go.Figure()
-        for cohort in grouped["group_code"].unique():
-            cohort_data = grouped[grouped["group_code"] == cohort]
-            fig.add_trace(
-                go.Scatter(
-                    x=cohort_data["session_start_date_only"],
-                    y=cohort_data["duration_mins"],
-                    mode="lines+markers",
-                    name=f"Cohort {cohort}",
-                )
-            )
-        fig.update_layout(
-            title="Average Session Duration Over Time",
-            xaxis_title="Date",
-            yaxis_title="Avg Duration (minutes)",
-            legend_title="Cohort ID",
-            template="plotly_white",
+
+    def retention_curves(self, thresholds=None, by=None):
+        retention = user_retention_table(self.aggregate("user_lifetimes"))
+        return kaplan_meier_curves(
+            retention["duration"],
+            retention["inactive_days"],
+            self.churn_thresholds if thresholds is None else thresholds,
+            strata=None if by is None else retention[by],
         )
-        return pio.to_html(fig, include_plotlyjs="cdn", full_html=False)
 
-    def plot_kmf_over_thresholds(self):
-        fig = go.Figure()
-        for threshold in self.churn_thresholds:
-            self.df["churned"] = self.df["days_since_signup"] < pd.Timedelta(
-                days=threshold
-            )
-            kmf_df = self.df[self.df["days_since_signup"] > pd.Timedelta(0)][
-                ["days_since_signup", "churned"]
-            ]
-            kmf = KaplanMeierFitter()
-            kmf.fit(
-                durations=kmf_df["days_since_signup"].dt.days,
-                event_observed=~kmf_df["churned"],
+    def _payload_kmf_over_thresholds(self):
+        return self.retention_curves()[["threshold", "timeline", "survival"]]
+
+    def _payload_retention_matrix(self):
+        bitsets = self.aggregate("activity_bitsets")
+        if bitsets.period != self.retention_period:
+            raise ValueError(
+                f"activity bitsets were built per {bitsets.period}, not per {self.retention_period}; rerun the aggregation"
             )
-            fig.add_trace(
-                go.Scatter(
-                    x=kmf.survival_function_.index,
-                    y=kmf.survival_function_["KM_estimate"],
-                    mode="lines",
-                    name=f"Churn-Threshold: {threshold} days",
-                )
+        retention = bitsets.retention_matrix(cohort=self.retention_cohort)
+        cohort_sizes = pd.Series(bitsets.cohort_labels(self.retention_cohort)).value_counts()
+        retention.index = [f"{cohort} (n={cohort_sizes[cohort]:,})" for cohort in retention.index]
+        return retention
+
+    def figure_payload(self, name):
+        spec = FIGURE_SPECS[name]
+        with self.timed_step(f"payload.{name}"):
+            if spec.payload is not None:
+                return spec.payload(self)
+            return getattr(self, f"_payload_{name}")()
+
+    def render_figures(self, names, parallel=False, max_workers=None):
+        profile = self.profiler is not None
+        rendered = {}
+        if self.profile_figure in names:
+            rendered[self.profile_figure] = self.render_profiled_figure(self.profile_figure)
+        pending = [name for name in names if name not in rendered]
+        payloads = {name: self.figure_payload(name) for name in pending}
+        if not parallel:
+            for name in pending:
+                with self.timed_step(f"render.{name}"):
+                    rendered[name] = render_figure(
+                        name, payloads[name], self.figsize, self.image_format, self.image_dpi, profile
+                    )
+        else:
+            with self.timed_step("render.parallel"):
+                with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                    futures = {
+                        name: executor.submit(
+                            render_figure,
+                            name,
+                            payloads[name],
+                            self.figsize,
+                            self.image_format,
+                            self.image_dpi,
+                            profile,
+                            FIGURE_SPECS[name].renderer,
+                        )
+                        for name in pending
+                    }
+                    rendered.update({name: futures[name].result() for name in pending})
+        for asset in rendered.values():
+            records = asset.pop("profile", [])
+            if profile:
+                self.profiler.records.extend(records)
+        return {name: rendered[name] for name in names}
+
+    def render_profiled_figure(self, name):
+        # Payload and rendering of one figure under cProfile, in this process even when the
+        # rest of the report renders in a pool; raw stats go next to the report.
+        stem = os.path.splitext(self.report_path or "Report")[0]
+        stats_path = f"{stem}_{name}.prof"
+        with self.timed_step(f"render.{name}"):
+            asset, summary = profile_call(
+                lambda: render_figure(
+                    name,
+                    self.figure_payload(name),
+                    self.figsize,
+                    self.image_format,
+                    self.image_dpi,
+                    self.profiler is not None,
+                ),
+                stats_path,
             )
-        fig.update_layout(
-            title="User Retention Curve Over Varying Churn Thresholds",
-            xaxis_title="Days Since Signup",
-            yaxis_title="Survival Probability",
-            legend_title="Churn Thresholds",
-            template="plotly_white",
+        print(f"[INFO] {time.ctime()} | cProfile for {name} written to {stats_path}")
+        print(summary)
+        return asset
+
+    def figure_html(self, name):
+        asset = render_figure(
+            name, self.figure_payload(name), self.figsize, self.image_format, self.image_dpi
         )
-        return pio.to_html(fig, include_plotlyjs="cdn", full_html=False)
+        script = plotlyjs_script(self.plotlyjs) if asset["format"] == "plotly" else ""
+        return script + asset_fragment(asset)
+
+    def plot_users_per_cohort(self):
+        return self.figure_html("users_per_cohort")
+
+    def plot_device_usage(self):
+        return self.figure_html("device_usage")
+
+    def plot_hourly_activity(self):
+        return self.figure_html("hourly_activity")
+
+    def plot_weekday_activity(self):
+        return self.figure_html("weekday_activity")
+
+    def plot_login_by_weekday(self):
+        return self.figure_html("login_by_weekday")
+
+    def plot_feature_engagement(self):
+        return self.figure_html("feature_engagement")
+
+    def plot_repeat_feature_usage(self):
+        return self.figure_html("repeat_feature_usage")
+
+    def plot_feature_usage_distribution(self):
+        return self.figure_html("feature_usage_distribution")
+
+    def plot_session_frequency(self):
+        return self.figure_html("session_frequency")
+
+    def plot_first_vs_later_session_duration(self):
+        return self.figure_html("first_vs_later_session_duration")
+
+    def plot_session_duration_over_time(self):
+        return self.figure_html("session_duration_over_time")
 
-    def run(self):
-        self.preprocess()
+    def plot_kmf_over_thresholds(self):
+        return self.figure_html("kmf_over_thresholds")
+
+    def plot_retention_matrix(self):
+        return self.figure_html("retention_matrix")
+
+    def build_report_html(self, rendered, page_specs=None, head_html=""):
+        page_specs = list(FIGURE_SPECS.values()) if page_specs is None else page_specs
         page_num = 3
-        toc_entries = [
-            ("Users per Cohort", "users-cohort"),
-            ("Device Usage", "device-usage"),
-            ("Hourly Activity", "hourly-activity"),
-            ("Weekday Activity", "weekday-activity"),
-            ("Login by Weekday", "login-weekday"),
-            ("Feature Engagement", "feature-engagement"),
-            ("Repeat Feature Usage", "repeat-usage"),
-            ("Feature Usage Distribution", "usage-distribution"),
-            ("Session Frequency", "session-frequency"),
-            ("First vs. Later Sessions", "first-vs-later"),
-            ("Session Duration Over Time", "duration-over-time"),
-            ("Retention Curve", "retention"),
-        ]
         pages = [
             f"""<div class="page"><h1>🧠 Data Insight Studio</h1><p>Welcome to interactive user intelligence report designed to provide a comprehensive overview of key user behaviors, feature usage, retention trends and more-using visualizations and smart insights to help you understand your data in a deeper way.</p><p>Built for industry-level use cases, this report aims to help product teams, analysts and stakeholders make data-informed decisions quickly and confidently.</p><div class="footer">Page 1</div></div>""",
-            f"""<div class="page" id="table-of-contents"><h2>📘 Table of Contents</h2><ul class="toc">{"".join(f"<li><a href='#{id_}'>{title}</a></li>" for title, id_ in toc_entries)}</ul><div class="footer">Page 2</div></div>""",
+            f"""<div class="page" id="table-of-contents"><h2>📘 Table of Contents</h2><ul class="toc">{"".join(f"<li><a href='#{spec.section_id}'>{spec.title}</a></li>" for spec in page_specs)}</ul><div class="footer">Page 2</div></div>""",
         ]
-        reader_content = [
-            (
-                toc_entries[0],
-                self.plot_users_per_cohort(),
-                "This visualization displays the number of unique users in each cohort, where it uses a bar chart to show cohort sizes, sorted in descending order, giving a clear sense of relative cohort volumes. Each user is counted once per cohort, ensuring accuracy in representation and avoiding duplication. This is particularly valuable in understanding the distribution of user acquisition over time or across campaigns.",
-                "Larger cohorts may point to successful acquisition campaigns, seasonal spikes, or effective onboarding strategies. Identifying top-performing cohorts allows product and growth teams to investigate what drove their success-be it marketing efforts, referral programs, feature rollouts, or user incentives. Conversely, smaller cohorts may highlight missed opportunities or signal areas for improvement in outreach or conversion. By analyzing user volume per cohort, teams can prioritize retention strategies for high-value groups and replicate successful acquisition patterns in future growth initiatives.",
-                "👥",
-            ),
-            (
-                toc_entries[1],
-                self.plot_device_usage(),
-                "This chart compares the device type used during signup with the devices users actually use during their session activities. The bar plot groups users by their signup device and breaks down session activity across different platforms (e.g., desktop, mobile, tablet) for each cohort. By visualizing device transition patterns-such as users signing up on one platform but engaging primarily on another-this analysis offers a layered view of how and where users choose to interact post-onboarding.",
-                "Understanding device migration and multi-platform behavior is critical for optimizing user experience. For example, if a large share of users signs up on desktop but later shifts to mobile for engagement, it suggests the need for mobile-first design considerations, especially for retention-critical features. This insight also helps teams identify inconsistencies between acquisition and engagement platforms, guiding where to invest in UI/UX improvements, performance optimization, or cross-platform messaging. It's especially valuable for tailoring onboarding flows and anticipating support or functionality needs specific to each device type.",
-                "📱",
-            ),
-            (
-                toc_entries[2],
-                self.plot_hourly_activity(),
-                "This histogram illustrates user session volume across each hour of the day (0-23), revealing patterns in diurnal engagement behavior. The plot includes a kernel density estimate (KDE) to highlight underlying trends in hourly activity beyond raw session counts. This visualization is particularly useful for identifying time-based usage spikes and quiet periods, helping teams understand when users are most likely to interact with the product.",
-                "By recognizing peak activity hours, you can better time product updates, support availability, push notifications, or marketing messages for maximum impact. If user engagement is heavily skewed toward specific times of day, it may also influence infrastructure scaling decisions or indicate opportunities to personalize time-sensitive features. For global platforms, time zone clustering may be inferred and teams can further explore regional segmentation to fine-tune the timing of in-app events or campaigns.",
-                "⏰",
-            ),
-            (
-                toc_entries[3],
-                self.plot_weekday_activity(),
-                "This count plot summarizes session activity across the days of the week, offering a view into weekly behavioral rhythms. The days are ordered from Monday through Sunday, making trends in weekday versus weekend engagement easy to interpret at a glance. Understanding these patterns is valuable for mapping user intent and planning time-sensitive interactions.",
-                "Weekday activity spikes may reflect work or productivity related usage, while weekend patterns can suggest casual or leisure-time engagement. This insight helps tailor product experiences to match user expectations-for instance, prioritizing content or features with different use cases during the weekend vs. workdays. It can also support scheduling feature rollouts, downtime planning, or content marketing for maximum reach. Identifying dips may highlight disengagement windows or inspire experiments to increase stickiness on low-activity days.",
-                "📅",
-            ),
-            (
-                toc_entries[4],
-                self.plot_login_by_weekday(),
-                "This bar chart presents the total number of login events per weekday by aggregating login counts across all user sessions. It follows a chronological weekday order (Monday through Sunday), allowing for intuitive identification of access patterns throughout the week. Unlike raw session activity, this chart specifically focuses on login actions-offering a closer look at authentication frequency rather than general engagement.",
-                "Understanding when users log in most often is crucial for identifying behavioral habits and platform touchpoints. A high volume of logins early in the week may indicate productivity-oriented use cases, while weekend spikes may point toward recreational or casual usage. This insight can inform everything from customer support hours and authentication system load management to the strategic timing of security features (e.g., 2FA prompts) or login-driven campaigns (e.g., streaks, reward activations). Identifying login drop-offs may also help surface friction in reactivation or accessibility.",
-                "🔐",
-            ),
-            (
-                toc_entries[5],
-                self.plot_feature_engagement(),
-                "This visualization breaks down feature usage counts across different user cohorts, showcasing which features are most heavily interacted with-and by whom. The chart uses a bar plot grouped by feature, with each bar segmented by cohort, enabling comparisons of feature adoption across time-based or campaign-driven user groups. Before plotting, the data filters out unused or zero-usage features, ensuring that the analysis focuses only on relevant interactions.",
-                "Mapping feature usage by cohort reveals how different user segments interact with your product and whether recent cohorts are engaging differently compared to earlier ones. This is key for tracking feature adoption over time, validating product launches and tailoring onboarding to highlight the most relevant tools for each group. Disparities in feature usage between cohorts may indicate changes in user needs, gaps in discoverability, or the success of recent UX or product updates. This analysis can directly support roadmap prioritization by showing which features deliver value to key growth-driving segments.",
-                "📊",
-            ),
-            (
-                toc_entries[6],
-                self.plot_repeat_feature_usage(),
-                "This chart highlights the average usage frequency of individual features across all user sessions, excluding features with negligible interaction (less than 0.01 average usage). By focusing on features that demonstrate recurring use, it surfaces which tools or capabilities consistently attract user attention and engagement. The bars represent normalized usage across the entire dataset, offering a standardized view of which features are habitually used across your user base.",
-                "This analysis is instrumental in identifying 'sticky' features-those that users return to repeatedly, indicating high utility, satisfaction, or value. These features often form the core of the product experience and can serve as anchors for onboarding, upsell paths, or habit-building strategies. Understanding which features are habitually used allows teams to allocate development and UX resources more effectively, double down on what's working and potentially deprecate or rework less relevant capabilities.",
-                "🔁",
-            ),
-            (
-                toc_entries[7],
-                self.plot_feature_usage_distribution(),
-                "This visualization presents the total usage count for each tracked feature, sorted in descending order. It offers a raw, unnormalized view of absolute engagement-highlighting the most frequently accessed functionalities across the entire user base. By filtering out features with zero interactions, the chart ensures a clean and focused representation of actual user behavior.",
-                "This distribution uncovers which features are driving the bulk of user engagement. High-frequency features are likely central to user workflows, whereas low-frequency ones may suffer from discoverability issues, usability friction, or lack of perceived value. The analysis can guide product strategy by validating the prominence of flagship features and surfacing potential gaps in feature adoption. It's particularly valuable when assessing return on investment for recent launches or deciding which features should be promoted or simplified.",
-                "📈",
-            ),
-            (
-                toc_entries[8],
-                self.plot_session_frequency(),
-                "This histogram visualizes the distribution of how many sessions each user has initiated, based on a count of unique session IDs per user. The plot uses a log-scaled y-axis to accommodate the wide variance between casual and highly active users and includes a KDE (density curve) to illustrate underlying trends. This gives a quantitative overview of engagement intensity across your entire user base.",
-                "Understanding session frequency is key to identifying distinct user segments-from one-time visitors to highly engaged power users. A long-tail distribution (many low-frequency users, few high-frequency ones) is typical in most digital products, but the shape and slope of this tail can signal product health. This insight enables tailored lifecycle messaging, supports feature targeting strategies and informs monetization opportunities (e.g., identifying high-frequency users for upsell or loyalty programs).",
-                "🧍‍♂️",
-            ),
-            (
-                toc_entries[9],
-                self.plot_first_vs_later_session_duration(),
-                "This dual KDE (Kernel Density Estimate) plot compares session duration between users' first sessions and all subsequent sessions. By analyzing the distribution of time spent, this chart reveals how user engagement evolves after the initial interaction. First sessions are separated using session rank, making it easy to evaluate onboarding quality versus ongoing engagement.",
-                "If first sessions are short and later sessions are longer, it may indicate that users need time to discover value-or that your onboarding is insufficient. Conversely, if early sessions are long but drop off later, it may suggest initial curiosity followed by disengagement. These patterns help diagnose onboarding effectiveness, inform activation metrics and reveal whether users are building long-term habits or experiencing early drop-off after exploration.",
-                "🎯",
-            ),
-            (
-                toc_entries[10],
-                self.plot_session_duration_over_time(),
-                "This time-series line chart tracks the average session duration per cohort across calendar dates. Each line represents a distinct user cohort, enabling longitudinal comparison of how engagement depth (measured in minutes) changes over time. The function aggregates session duration daily and segments it by cohort, giving a detailed look at how different user groups interact over the lifecycle.",
-                "Fluctuations in session duration can signal changes in product experience, content quality, or feature relevance. A steady increase over time may reflect improved user understanding or stickier functionality, while drops might point to usability issues, disengagement, or product fatigue. Cohort-based trends allow you to assess the long-term impact of product changes and differentiate between temporary dips and structural engagement shifts-helping you fine-tune retention strategies and feature optimization.",
-                "📉",
-            ),
-            (
-                toc_entries[11],
-                self.plot_kmf_over_thresholds(),
-                "This interactive chart presents Kaplan-Meier survival curves, visualizing user retention across different churn threshold definitions (e.g., 7, 14, 30 days without return). Each curve represents the probability of a user remaining active as a function of time since signup, calculated using survival analysis. The analysis excludes users with zero days of activity and dynamically adjusts the 'churned' label based on configurable thresholds. This allows for a more flexible, scenario-based exploration of how retention behaves under various business rules or lifecycle definitions.",
-                "Kaplan-Meier curves provide a statistically grounded method for evaluating retention over time. Unlike basic retention metrics, these curves account for censored data-users who haven't yet churned-which makes them more robust, especially for products with long user lifecycles. Comparing curves across thresholds reveals how sensitive retention performance is to changes in your churn definition. A steep early drop-off might signal onboarding issues, while a gradual decline suggests sustained engagement. Identifying crossover points or stability plateaus helps inform when to invest in reactivation strategies, loyalty programs, or habit-forming features. This visualization is particularly powerful for benchmarking the effectiveness of lifecycle interventions and understanding how engagement decays across different user cohorts.",
-                "📉",
-            ),
-        ]
-        for (title, id_), plot_func, desc, insight, icon in reader_content:
-            pages.append(self.create_plot_page(page_num, title, plot_func, desc, insight, icon=icon, section_id=id_))
+        for spec in page_specs:
+            pages.append(self.create_plot_page(page_num, spec.title, rendered[spec.name], spec.description, spec.insight, icon=spec.icon, section_id=spec.section_id))
             page_num += 1
-        full_html = f"""<html><head><meta charset="utf-8"><title>🧠 Data Insight Studio</title><link href="https://fonts.googleapis.com/css2?family=Inter:wght@400;600&display=swap" rel="stylesheet"><style>body {{font-family: 'Inter', sans-serif;margin: 0;padding: 0;background-color: #f9fafb;color: #2c3e50;}}.page {{max-width: 960px;margin: 80px auto;background: white;padding: 60px 40px;border-radius: 10px;box-shadow: 0 0 12px rgba(0,0,0,0.05);page-break-after: always;}}h1 {{font-size: 2.4rem;color: #1a202c;text-align: center;margin-bottom: 40px;}}h2 {{font-size: 1.8rem;color: #1a202c;margin-bottom: 20px;display: flex;align-items: center;}}.icon {{margin-right: 10px;}}.description {{font-size: 1rem;color: #444;margin-top: 20px;}}.insight {{font-size: 0.95rem;font-style: italic;color: #555;margin-top: 10px;}}.footer {{text-align: right;margin-top: 60px;font-size: 0.9rem;color: #aaa;}}img {{width: 100%;max-width: 800px;display: block;margin: 20px auto;border-radius: 8px;box-shadow: 0 2px 4px rgba(0,0,0,0.05);}}.toc {{list-style-type: none;padding-left: 0;font-size: 1rem;}}.toc li {{margin-bottom: 12px;}}.toc a {{text-decoration: none;color: #1f7aec;}}.toc a:hover {{text-decoration: underline;}}@media print {{body {{margin: 0;}}.page {{max-width: 100%;margin: 0;padding: 20px;}}.footer {{position: fixed;bottom: 0;width: 100%;text-align: center;}}.toc {{page-break-before: always;}}}}</style></head><body>{"".join(pages)}</body></html>"""
+        full_html = f"""<html><head><meta charset="utf-8"><title>🧠 Data Insight Studio</title><link href="https://fonts.googleapis.com/css2?family=Inter:wght@400;600&display=swap" rel="stylesheet"><style>body {{font-family: 'Inter', sans-serif;margin: 0;padding: 0;background-color: #f9fafb;color: #2c3e50;}}.page {{max-width: 960px;margin: 80px auto;background: white;padding: 60px 40px;border-radius: 10px;box-shadow: 0 0 12px rgba(0,0,0,0.05);page-break-after: always;}}h1 {{font-size: 2.4rem;color: #1a202c;text-align: center;margin-bottom: 40px;}}h2 {{font-size: 1.8rem;color: #1a202c;margin-bottom: 20px;display: flex;align-items: center;}}.icon {{margin-right: 10px;}}.description {{font-size: 1rem;color: #444;margin-top: 20px;}}.insight {{font-size: 0.95rem;font-style: italic;color: #555;margin-top: 10px;}}.footer {{text-align: right;margin-top: 60px;font-size: 0.9rem;color: #aaa;}}img {{width: 100%;max-width: 800px;display: block;margin: 20px auto;border-radius: 8px;box-shadow: 0 2px 4px rgba(0,0,0,0.05);}}.toc {{list-style-type: none;padding-left: 0;font-size: 1rem;}}.toc li {{margin-bottom: 12px;}}.toc a {{text-decoration: none;color: #1f7aec;}}.toc a:hover {{text-decoration: underline;}}.lazy-figure {{min-height: 480px;}}table.profile {{width: 100%;border-collapse: collapse;font-size: 0.85rem;}}table.profile th, table.profile td {{padding: 4px 8px;border-bottom: 1px solid #eee;text-align: right;}}table.profile th:first-child, table.profile td:first-child {{text-align: left;}}@media print {{body {{margin: 0;}}.page {{max-width: 100%;margin: 0;padding: 20px;}}.footer {{position: fixed;bottom: 0;width: 100%;text-align: center;}}.toc {{page-break-before: always;}}}}</style>{head_html}</head><body>{"".join(pages)}</body></html>"""
+        return full_html
 
-        with open(f"Report_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.html","wb") as f:
+    def write_report(self, full_html, report_path=None):
+        report_path = report_path or f"Report_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.html"
+        with open(report_path,"wb") as f:
             f.write(full_html.encode("UTF-8"))
+
+    def report_fragments(self, rendered, report_path):
+        # Images are inlined as base64 or, with embed_images=False, written next to the report
+        # under <report>_assets/ (about a third smaller than base64). With lazy_figures=True each
+        # fragment is stored compressed and only inflated when its page is viewed. Returns the
+        # page fragments, the <head> scripts and the bytes each figure adds to the report.
+        asset_dir = f"{os.path.splitext(report_path)[0]}_assets"
+        fragments = {}
+        self.asset_sizes = {}
+        self.sidecar_bytes = 0
+        for name, asset in rendered.items():
+            src = None
+            if not self.embed_images and asset["format"] != "plotly":
+                os.makedirs(asset_dir, exist_ok=True)
+                file_name = f"{name}.{asset['format']}"
+                with open(os.path.join(asset_dir, file_name), "wb") as f:
+                    f.write(asset["data"])
+                src = f"{os.path.basename(asset_dir)}/{file_name}"
+                self.sidecar_bytes += len(asset["data"])
+            fragments[name] = asset_fragment(asset, src)
+            if self.lazy_figures:
+                fragments[name] = lazy_fragment(name, fragments[name], asset["format"] == "plotly")
+            self.asset_sizes[name] = len(fragments[name].encode("UTF-8")) + (
+                len(asset["data"]) if src else 0
+            )
+        has_plotly = any(asset["format"] == "plotly" for asset in rendered.values())
+        if self.lazy_figures:
+            head_html = lazy_loader_script(self.plotlyjs, has_plotly)
+        else:
+            head_html = plotlyjs_script(self.plotlyjs) if has_plotly else ""
+        self.asset_sizes["head_scripts"] = len(head_html.encode("UTF-8"))
+        return fragments, head_html
+
+    def report_asset_sizes(self, report_bytes):
+        for name, size in sorted(self.asset_sizes.items(), key=lambda item: -item[1]):
+            print(f"[INFO] {time.ctime()} | asset {name}: {size / 1024:,.1f} KB")
+        total = report_bytes + self.sidecar_bytes
+        print(
+            f"[INFO] {time.ctime()} | report: {report_bytes / 1024**2:,.2f} MB HTML + {self.sidecar_bytes / 1024**2:,.2f} MB sidecar files"
+        )
+        if self.max_report_bytes is not None and total > self.max_report_bytes:
+            print(
+                f"[WARN] {time.ctime()} | report is {total / 1024**2:,.2f} MB, over the {self.max_report_bytes / 1024**2:,.2f} MB budget"
+            )
+        return total
+
+    def render_figures_cached(self, names, cache, parallel=False, max_workers=None):
+        key = params_fingerprint(
+            churn_thresholds=self.churn_thresholds,
+            retention_period=self.retention_period,
+            retention_cohort=self.retention_cohort,
+            columns=self.columns,
+            figsize=self.figsize,
+            max_plot_points=self.max_plot_points,
+            image_format=self.image_format,
+            image_dpi=self.image_dpi,
+            figures=names,
+        )
+        with self.timed_step("cache.fingerprint"):
+            hashes = row_hashes(self.df)
+            digest = rows_digest(hashes)
+        entry = cache.load(key)
+        if entry is not None and entry["rows"] == len(hashes) and entry["digest"] == digest:
+            print(f"[INFO] {time.ctime()} | Report cache hit: {len(hashes):,} unchanged rows")
+            return entry["fragments"]
+        mergeable = sorted(
+            {agg for name in names for agg in (FIGURE_SPECS[name].aggregates or [])}
+        )
+        needs_rows = any(FIGURE_SPECS[name].aggregates is None for name in names)
+        appended = (
+            entry is not None
+            and entry["rows"] < len(hashes)
+            and entry["digest"] == rows_digest(hashes[: entry["rows"]])
+            and set(mergeable) <= set(entry["aggregates"])
+        )
+        if appended:
+            print(
+                f"[INFO] {time.ctime()} | Report cache append: merging {len(hashes) - entry['rows']:,} new rows into {entry['rows']:,} cached rows"
+            )
+            tail = Analysis(
+                self.df.iloc[entry["rows"]:], churn_thresholds=self.churn_thresholds, figures=self.figures
+            )
+            tail.timings = self.timings
+            tail.profiler = self.profiler
+            tail.retention_period = self.retention_period
+            tail.preprocess()
+            merged = {
+                agg: AGGREGATE_MERGERS[agg](entry["aggregates"][agg], tail.aggregate(agg))
+                for agg in mergeable
+            }
+            if needs_rows:
+                self.preprocess()
+            self.aggregates.update(merged)
+        else:
+            self.preprocess()
+        rendered = self.render_figures(names, parallel=parallel, max_workers=max_workers)
+        cache.store(
+            key,
+            {
+                "rows": len(hashes),
+                "digest": digest,
+                "aggregates": {agg: self.aggregate(agg) for agg in mergeable},
+                "fragments": rendered,
+            },
+        )
+        return rendered
+
+    def aggregate_chunks(self, names):
+        # Out-of-core mode: each chunk is preprocessed on its own and reduced to the mergeable
+        # base aggregates, which are folded into running states. Peak memory is bounded by the
+        # chunk plus the states (per-cohort sums and per-user tables), not by the input size.
+        if any(FIGURE_SPECS[name].aggregates is None for name in names):
+            raise ValueError("out-of-core mode only supports figures built from mergeable aggregates")
+        mergeable = sorted({agg for name in names for agg in FIGURE_SPECS[name].aggregates})
+        self.aggregates = {}
+        states = {}
+        rows = chunks = 0
+        for chunk in iter_session_chunks(self.source_path, self.columns, self.chunk_rows):
+            part = Analysis(chunk, churn_thresholds=self.churn_thresholds, figures=self.figures)
+            if part.df.empty:
+                continue
+            part.verbose = False
+            part.timings = self.timings
+            part.profiler = self.profiler
+            part.retention_period = self.retention_period
+            part.preprocess()
+            with self.timed_step("out_of_core.merge"):
+                for agg in mergeable:
+                    partial = part.aggregate(agg)
+                    states[agg] = (
+                        partial if agg not in states else AGGREGATE_MERGERS[agg](states[agg], partial)
+                    )
+            rows += len(part.df)
+            chunks += 1
+        if not chunks:
+            raise ValueError(f"no session rows with a group_code in {self.source_path}")
+        self.aggregates.update(states)
+        print(
+            f"[INFO] {time.ctime()} | Out-of-core scan: {rows:,} rows in {chunks:,} chunks of up to {self.chunk_rows:,}"
+        )
+
+    def run(
+        self,
+        parallel=False,
+        max_workers=None,
+        cache_dir=None,
+        max_cache_bytes=512 * 1024**2,
+        figures=None,
+        report_path=None,
+    ):
+        self.timings = {}
+        self.profiler = StageProfiler() if self.profile else None
+        if self.profiler is not None and self.sql_profiler is not None:
+            self.profiler.records.extend(self.sql_profiler.records)
+        run_probe = None if self.profiler is None else self.profiler.start()
+        self.report_path = report_path or f"Report_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.html"
+        figures = self.figures if figures is None else figures
+        unknown = sorted(set(figures or []) - set(FIGURE_SPECS))
+        if unknown:
+            raise ValueError(f"unknown figures {unknown}; choose from {list(FIGURE_SPECS)}")
+        page_specs = [spec for spec in FIGURE_SPECS.values() if figures is None or spec.name in figures]
+        names = [spec.name for spec in page_specs]
+        missing = sorted(set(figure_columns(names, self.req_cols)) - set(self.columns))
+        if missing:
+            raise ValueError(f"figures {names} need columns {missing}; pass them to Analysis(figures=...)")
+        if self.user_features is not None:
+            if cache_dir is not None:
+                raise ValueError("cache_dir requires the session table in memory, not a feature store")
+            unsupported = sorted(set(names) - set(feature_store_figures()))
+            if unsupported:
+                raise ValueError(f"figures {unsupported} need session rows, not a feature store")
+            with self.timed_step("feature_store.aggregates"):
+                self.aggregates = user_feature_aggregates(self.user_features)
+            rendered = self.render_figures(names, parallel=parallel, max_workers=max_workers)
+        elif self.source_path is not None:
+            if cache_dir is not None:
+                raise ValueError("cache_dir requires the session table in memory; drop chunk_rows")
+            self.aggregate_chunks(names)
+            rendered = self.render_figures(names, parallel=parallel, max_workers=max_workers)
+        elif cache_dir is None:
+            self.preprocess()
+            rendered = self.render_figures(names, parallel=parallel, max_workers=max_workers)
+        else:
+            rendered = self.render_figures_cached(
+                names,
+                ReportCache(cache_dir, max_bytes=max_cache_bytes),
+                parallel=parallel,
+                max_workers=max_workers,
+            )
+        with self.timed_step("report.assets"):
+            fragments, head_html = self.report_fragments(rendered, self.report_path)
+        if self.profiler is not None and self.profile_appendix:
+            fragments["run_profile"] = self.profiler.appendix_html()
+            page_specs = page_specs + [PROFILE_APPENDIX_PAGE]
+        with self.timed_step("report.build_html"):
+            full_html = self.build_report_html(fragments, page_specs, head_html=head_html)
+        with self.timed_step("report.write"):
+            self.write_report(full_html, self.report_path)
+        self.report_asset_sizes(len(full_html.encode("UTF-8")))
+        if self.profiler is not None:
+            self.profiler.stop("run", run_probe)
+            json_path, csv_path = self.profiler.write(
+                f"{os.path.splitext(self.report_path)[0]}_profile"
+            )
+            print(f"[INFO] {time.ctime()} | Run profile written to {json_path} and {csv_path}")
         return None
@@ -0,0 +1,350 @@
+# pip3 install pandas numpy faker pyarrow
+
+import os
+import sys
+import json
+import math
+import time
+import platform
+import argparse
+import tracemalloc
+import multiprocessing
+import numpy as np
+import pandas as pd
+from typing import List, Dict, Callable, Optional, Sequence
+from generate_synthetic_user_data import build_fake_dataset, build_fake_dataset_vectorized, generate_fake_dataset, iter_fake_dataset_chunks
+from pipeline_profiler import StageProfiler
+
+FIXTURE_ROWS:Dict[str, int] = {"10K": 10_000, "100K": 100_000, "1M": 1_000_000, "10M": 10_000_000}
+FIXTURE_FORMATS:Dict[str, str] = {"csv": ".csv", "parquet": ".parquet"}
+
+# Time a dataset builder and report its throughput
+def time_builder(builder:Callable[..., pd.DataFrame], **kwargs)->Dict:
+    started:float = time.perf_counter()
+    df:pd.DataFrame = builder(**kwargs)
+    elapsed:float = time.perf_counter() - started
+    return {"rows": len(df), "seconds": elapsed, "rows_per_sec": len(df) / elapsed if elapsed > 0 else float("inf")}
+
+# Compare rows/sec of the Faker generator against the vectorized NumPy engine
+def benchmark_generation_engines(user_counts:Sequence[int]=(500, 2_000), max_cohort_groups:int=20, maximum_session_per_user:int=30, seed:int=123)->pd.DataFrame:
+    results:List[Dict] = []
+    for total_users in user_counts:
+        params:Dict = {"total_users": total_users, "max_cohort_groups": max_cohort_groups, "maximum_session_per_user": maximum_session_per_user}
+        for engine, builder, extra in [("faker", build_fake_dataset, {}), ("numpy", build_fake_dataset_vectorized, {"seed": seed})]:
+            result:Dict = {"engine": engine, "total_users": total_users, **time_builder(builder, **params, **extra)}
+            print(f'[INFO] {time.ctime()} | {engine:>5} | users={total_users:,} rows={result["rows"]:,} | {result["rows_per_sec"]:,.0f} rows/sec')
+            results.append(result)
+    summary:pd.DataFrame = pd.DataFrame(results)
+    speedup:pd.Series = summary.pivot(index="total_users", columns="engine", values="rows_per_sec").eval("numpy / faker")
+    for total_users, factor in speedup.items():
+        print(f'[INFO] {time.ctime()} | users={total_users:,} | numpy engine speedup: {factor:,.1f}x')
+    return summary
+
+# Wall time and traced peak memory of one call; tracing runs separately so it does not skew the timing
+def measure_call(func:Callable, repeat:int=3)->Dict:
+    seconds:List[float] = []
+    for _ in range(repeat):
+        started:float = time.perf_counter()
+        func()
+        seconds.append(time.perf_counter() - started)
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": min(seconds), "peak_mb": peak / 1024**2}
+
+# Pre-aggregation reference: the 27-column melt that plot_feature_engagement used to run on session rows
+def melt_feature_engagement(df:pd.DataFrame, feature_columns:List[str])->pd.DataFrame:
+    return (
+        df.melt(id_vars=["group_code"], value_vars=feature_columns, var_name="feature", value_name="usage_count")
+        .groupby(by=["group_code", "feature"], observed=True)["usage_count"]
+        .sum()
+        .reset_index()
+    )
+
+# Regression benchmark for the Feature Engagement figure on 1M+ synthetic sessions.
+# Budgets (per million session rows) pin the wide groupby path; exceeding either one is a regression.
+def benchmark_feature_engagement(total_users:int=70_000, max_cohort_groups:int=20, maximum_session_per_user:int=30, seed:int=123, max_seconds_per_million:float=1.0, max_peak_mb_per_million:float=96.0)->Dict:
+    from analyze_user_behavior_and_generate_report import Analysis
+    analysis = Analysis(build_fake_dataset_vectorized(total_users=total_users, max_cohort_groups=max_cohort_groups, maximum_session_per_user=maximum_session_per_user, seed=seed))
+    analysis.preprocess()
+
+    def wide_groupby()->None:
+        analysis.aggregates.clear()
+        analysis.aggregate("cohort_feature_totals")
+
+    def full_figure()->None:
+        analysis.aggregates.clear()
+        analysis.plot_feature_engagement()
+
+    results:Dict = {
+        "rows": len(analysis.df),
+        "melt_reference": measure_call(lambda: melt_feature_engagement(analysis.df, analysis.feature_columns), repeat=1),
+        "wide_groupby": measure_call(wide_groupby),
+        "figure": measure_call(full_figure, repeat=1),
+    }
+    for stage in ["melt_reference", "wide_groupby", "figure"]:
+        print(f'[INFO] {time.ctime()} | feature_engagement.{stage} | rows={results["rows"]:,} | {results[stage]["seconds"]:.3f}s | peak {results[stage]["peak_mb"]:,.1f} MB')
+    millions:float = max(results["rows"] / 1e6, 1e-6)
+    max_seconds:float = max_seconds_per_million * millions
+    max_peak_mb:float = max_peak_mb_per_million * millions
+    results["regression"] = results["wide_groupby"]["seconds"] > max_seconds or results["wide_groupby"]["peak_mb"] > max_peak_mb
+    if results["regression"]:
+        print(f'[WARN] {time.ctime()} | feature_engagement exceeded budget ({max_seconds:.2f}s, {max_peak_mb:,.1f} MB)')
+    return results
+
+# Users needed for roughly `rows` sessions: each user draws 1..max sessions uniformly
+def users_for_rows(rows:int, maximum_session_per_user:int=30)->int:
+    return max(1, math.ceil(rows / ((maximum_session_per_user + 1) / 2)))
+
+# Child side of isolated_stage: time the call and ship the stage record back
+def _run_stage_child(func:Callable[[], None], stage:str, conn)->None:
+    profiler = StageProfiler()
+    try:
+        with profiler.stage(stage):
+            func()
+        conn.send(profiler.records[0])
+    except BaseException as error:
+        conn.send({"stage": stage, "error": repr(error)})
+    finally:
+        conn.close()
+
+# Run one stage in a forked child so its peak RSS growth is not masked by earlier stages;
+# falls back to the current process where fork is unavailable
+def isolated_stage(func:Callable[[], None], stage:str)->Dict:
+    if "fork" not in multiprocessing.get_all_start_methods():
+        profiler = StageProfiler()
+        with profiler.stage(stage):
+            func()
+        return profiler.records[0]
+    context = multiprocessing.get_context("fork")
+    parent_conn, child_conn = context.Pipe(duplex=False)
+    process = context.Process(target=_run_stage_child, args=(func, stage, child_conn))
+    process.start()
+    child_conn.close()
+    record:Dict = parent_conn.recv()
+    process.join()
+    if "error" in record:
+        raise RuntimeError(f'{stage} failed: {record["error"]}')
+    return record
+
+# Time and memory-profile every pipeline stage on fixed-seed fixtures of each size
+def benchmark_pipeline(sizes:Sequence[str]=("10K", "100K", "1M"), fixture_dir:str="benchmark_fixtures", formats:Sequence[str]=("csv", "parquet"), max_cohort_groups:int=20, maximum_session_per_user:int=30, batch_users:int=100_000, seed:int=123)->List[Dict]:
+    from analyze_user_behavior_and_generate_report import Analysis, FIGURE_SPECS, read_session_data
+    os.makedirs(fixture_dir, exist_ok=True)
+    results:List[Dict] = []
+    for size in sizes:
+        total_users:int = users_for_rows(FIXTURE_ROWS[size], maximum_session_per_user)
+        params:Dict = {"total_users": total_users, "max_cohort_groups": max_cohort_groups, "maximum_session_per_user": maximum_session_per_user, "seed": seed}
+        paths:Dict[str, str] = {fmt: os.path.abspath(os.path.join(fixture_dir, f"sessions_{size}_seed{seed}{FIXTURE_FORMATS[fmt]}")) for fmt in formats}
+
+        def record(stage:str, func:Callable[[], None])->None:
+            result:Dict = {"size": size, "total_users": total_users, **isolated_stage(func, stage)}
+            print(f'[INFO] {time.ctime()} | {size:>4} | {stage:<45} | {result["wall_seconds"]:8.3f}s | peak +{result["peak_rss_growth_mb"] or 0:,.1f} MB')
+            results.append(result)
+
+        record("generate", lambda: sum(len(chunk) for chunk in iter_fake_dataset_chunks(batch_users=batch_users, **params)))
+        for fmt in formats:
+            record(f"generate_write.{fmt}", lambda fmt=fmt: generate_fake_dataset(output_path=paths[fmt], vectorized=True, batch_users=batch_users, **params))
+        probe = Analysis(paths[formats[-1]])
+        for fmt in formats:
+            record(f"read.{fmt}", lambda fmt=fmt: read_session_data(paths[fmt], columns=probe.req_cols))
+        record("preprocess", lambda: Analysis(probe.df).preprocess())
+        probe.verbose = False
+        probe.preprocess()
+        for name in FIGURE_SPECS:
+            def plot(name:str=name)->None:
+                probe.aggregates.clear()
+                getattr(probe, f"plot_{name}")()
+            record(f"plot.{name}", plot)
+
+        def full_run()->None:
+            cwd:str = os.getcwd()
+            os.chdir(fixture_dir)
+            try:
+                Analysis(paths[formats[-1]]).run()
+            finally:
+                os.chdir(cwd)
+        record("run", full_run)
+        for result in results:
+            if result["size"] == size:
+                result["rows"] = len(probe.df)
+    return results
+
+# Session pivots compare equal once sorted; interactions with no task view (all-zero rows) are
+# only produced by the LIKE query and zero-fill identically after the session join
+def task_pivots_match(pivots:Dict[str, pd.DataFrame])->bool:
+    normalized:List[pd.DataFrame] = []
+    for pivot in pivots.values():
+        counts:pd.DataFrame = pivot.set_index("interaction_id").fillna(0).astype("int64")
+        normalized.append(counts[counts.any(axis=1)].sort_index())
+    return all(frame[normalized[0].columns].equals(normalized[0]) for frame in normalized[1:])
+
+# Time the pivoted_logs step three ways (27 LIKE counts, task lookup join, NumPy bincount) and the
+# full transformation with each SQL variant on fixed-seed raw event logs of each session size
+def benchmark_task_pivot(sizes:Sequence[str]=("10K", "100K"), fixture_dir:str="benchmark_fixtures", max_cohort_groups:int=20, maximum_session_per_user:int=30, batch_users:int=100_000, seed:int=123, check:bool=True)->List[Dict]:
+    import pyarrow.dataset as ds
+    from generate_synthetic_event_logs import generate_event_logs
+    from local_sql_engine import LOOKUP_SQL_PATH, pivot_interaction_logs, raw_table_path, run_session_sql
+    os.makedirs(fixture_dir, exist_ok=True)
+    results:List[Dict] = []
+    for size in sizes:
+        total_users:int = users_for_rows(FIXTURE_ROWS[size], maximum_session_per_user)
+        raw_dir:str = os.path.abspath(os.path.join(fixture_dir, f"event_logs_{size}_seed{seed}"))
+        pivots:Dict[str, Callable[[], pd.DataFrame]] = {
+            "sql_like": lambda: run_session_sql(raw_dir, cte="pivoted_logs"),
+            "sql_lookup": lambda: run_session_sql(raw_dir, sql_path=LOOKUP_SQL_PATH, cte="pivoted_logs"),
+            "numpy_bincount": lambda: pivot_interaction_logs(raw_dir),
+        }
+        stages:List = [("generate_logs", lambda: generate_event_logs(total_users=total_users, max_cohort_groups=max_cohort_groups, maximum_session_per_user=maximum_session_per_user, output_dir=raw_dir, seed=seed, batch_users=batch_users))]
+        stages += [(f"pivot.{name}", pivot) for name, pivot in pivots.items()]
+        stages += [("transform.sql_like", lambda: run_session_sql(raw_dir)), ("transform.sql_lookup", lambda: run_session_sql(raw_dir, sql_path=LOOKUP_SQL_PATH))]
+        size_results:List[Dict] = []
+        for stage, func in stages:
+            result:Dict = {"size": size, "total_users": total_users, **isolated_stage(func, stage)}
+            print(f'[INFO] {time.ctime()} | {size:>4} | {stage:<45} | {result["wall_seconds"]:8.3f}s | peak +{result["peak_rss_growth_mb"] or 0:,.1f} MB')
+            size_results.append(result)
+        # rows is the interaction_logs size, the input every pivot scans
+        log_rows:int = ds.dataset(raw_table_path(raw_dir, "interaction_logs")[0], format="parquet").count_rows()
+        for result in size_results:
+            result["rows"] = log_rows
+        if check and not task_pivots_match({name: pivot() for name, pivot in pivots.items()}):
+            raise AssertionError(f"task pivots disagree on the {size} fixture")
+        results += size_results
+    return results
+
+# Synthetic signup dates and active days for one block of users: signups spread over the window,
+# activity skewed towards the first periods after signup like a decaying retention curve
+def synthetic_user_activity(rng:np.random.Generator, first_user:int, block_users:int, window_days:int, active_days_per_user:float, max_cohort_groups:int)->Dict[str, np.ndarray]:
+    signup_day:np.ndarray = rng.integers(0, window_days, block_users)
+    active_days:np.ndarray = rng.poisson(active_days_per_user, block_users)
+    rows:np.ndarray = np.repeat(np.arange(block_users), active_days)
+    days_since_signup:np.ndarray = (rng.random(len(rows)) ** 2 * (window_days - signup_day[rows])).astype(np.int64)
+    start:np.datetime64 = np.datetime64("2020-01-01", "ns")
+    groups:pd.Categorical = pd.Categorical.from_codes(rng.integers(0, max_cohort_groups, block_users), categories=[f"group_{i + 1}" for i in range(max_cohort_groups)])
+    return {
+        "user_key": first_user + rows,
+        "group_code": groups.take(rows),
+        "registration_date": start + signup_day[rows].astype("timedelta64[D]"),
+        "session_day": start + (signup_day[rows] + days_since_signup).astype("timedelta64[D]"),
+    }
+
+# Cohort x period retention for a large population, built the way the out-of-core report does:
+# each chunk of session rows becomes an ActivityBitsets that merge_activity_bitsets folds into the
+# running table. Every chunk holds half of one block of users' rows and half of the next, so most
+# users return in a later chunk and are OR-ed into their existing rows.
+def benchmark_retention_matrix(total_users:int=10_000_000, years:int=5, period:str="day", block_users:int=100_000, active_days_per_user:float=24.0, max_cohort_groups:int=20, seed:int=123)->List[Dict]:
+    from retention_engine import ActivityBitsets, DEFAULT_MAX_PERIODS, merge_activity_bitsets
+    window_days:int = int(round(years * 365.25))
+    max_periods:int = max(DEFAULT_MAX_PERIODS[period], {"day": window_days, "week": window_days // 7 + 1, "month": years * 12 + 1}[period])
+    observation_end:np.datetime64 = np.datetime64("2020-01-01", "ns") + np.timedelta64(window_days - 1, "D")
+
+    def concat_rows(parts:List[Dict])->Dict:
+        return {col: pd.api.types.union_categoricals([part[col] for part in parts]) if col == "group_code" else np.concatenate([part[col] for part in parts]) for col in parts[0]}
+
+    def stream()->None:
+        rng:np.random.Generator = np.random.default_rng(seed)
+        table:Optional[ActivityBitsets] = None
+        carried:List[Dict] = []
+        for first_user in range(0, total_users, block_users):
+            block:Dict = synthetic_user_activity(rng, first_user, min(block_users, total_users - first_user), window_days, active_days_per_user, max_cohort_groups)
+            later:np.ndarray = rng.random(len(block["user_key"])) < 0.5
+            chunk:Dict = concat_rows(carried + [{col: values[~later] for col, values in block.items()}])
+            carried = [{col: values[later] for col, values in block.items()}]
+            bitsets = ActivityBitsets.from_sessions(period=period, max_periods=max_periods, **chunk)
+            table = bitsets if table is None else merge_activity_bitsets(table, bitsets)
+        table = merge_activity_bitsets(table, ActivityBitsets.from_sessions(period=period, max_periods=max_periods, **concat_rows(carried)))
+        table.retention_matrix(observation_end=observation_end)
+
+    stage:str = f"retention_matrix.{period}"
+    # rows counts users here: the bitset table and the popcounts scale with users, not sessions
+    result:Dict = {"size": f"{total_users:,} users x {years}y", "total_users": total_users, "rows": total_users, **isolated_stage(stream, stage)}
+    result["bitset_bytes"] = total_users * ((max_periods + 7) // 8)
+    print(f'[INFO] {time.ctime()} | {result["size"]} | {stage} | {result["wall_seconds"]:8.3f}s | peak +{result["peak_rss_growth_mb"] or 0:,.1f} MB | bitset table {result["bitset_bytes"] / 1024**2:,.0f} MB')
+    return [result]
+
+# Per-stage log-log slope of wall time against rows from the smallest to the largest size (1.0 = linear)
+def scaling_exponents(results:List[Dict])->Dict[str, float]:
+    frame:pd.DataFrame = pd.DataFrame(results)
+    exponents:Dict[str, float] = {}
+    for stage, runs in frame.groupby("stage"):
+        runs = runs.sort_values("rows")
+        if len(runs) < 2:
+            continue
+        first, last = runs.iloc[0], runs.iloc[-1]
+        if first["wall_seconds"] > 0 and last["rows"] > first["rows"]:
+            exponents[stage] = math.log(last["wall_seconds"] / first["wall_seconds"]) / math.log(last["rows"] / first["rows"])
+    return exponents
+
+# Write results with enough metadata to tell runs on different machines apart
+def write_benchmark_results(results:List[Dict], output_path:str)->None:
+    payload:Dict = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "results": results,
+        "scaling_exponents": scaling_exponents(results),
+    }
+    with open(output_path, "w") as f:
+        json.dump(payload, f, indent=2)
+    print(f"[INFO] {time.ctime()} | Benchmark results written to {output_path}")
+
+# Flag stages slower or hungrier than the stored baseline, and stages that scale worse
+def compare_to_baseline(results:List[Dict], baseline_path:str, tolerance:float=0.25, min_seconds:float=0.05, min_memory_mb:float=32.0, exponent_tolerance:float=0.15)->List[str]:
+    with open(baseline_path) as f:
+        baseline:Dict = json.load(f)
+    previous:Dict = {(result["size"], result["stage"]): result for result in baseline["results"]}
+    regressions:List[str] = []
+    for result in results:
+        before:Optional[Dict] = previous.get((result["size"], result["stage"]))
+        if before is None:
+            continue
+        label:str = f'{result["size"]} {result["stage"]}'
+        if result["wall_seconds"] > before["wall_seconds"] * (1 + tolerance) and result["wall_seconds"] - before["wall_seconds"] > min_seconds:
+            regressions.append(f'{label}: {before["wall_seconds"]:.3f}s -> {result["wall_seconds"]:.3f}s')
+        growth, before_growth = result.get("peak_rss_growth_mb"), before.get("peak_rss_growth_mb")
+        if growth is not None and before_growth is not None and growth > before_growth * (1 + tolerance) and growth - before_growth > min_memory_mb:
+            regressions.append(f'{label}: peak +{before_growth:,.1f} MB -> +{growth:,.1f} MB')
+    longest:Dict[str, float] = pd.DataFrame(results).groupby("stage")["wall_seconds"].max().to_dict()
+    for stage, exponent in scaling_exponents(results).items():
+        before_exponent:Optional[float] = baseline.get("scaling_exponents", {}).get(stage)
+        # Fixed costs dominate short stages and make their slope noise, so only gate measurable ones
+        if before_exponent is not None and longest[stage] >= 10 * min_seconds and exponent > before_exponent + exponent_tolerance:
+            regressions.append(f"{stage}: scaling exponent {before_exponent:.2f} -> {exponent:.2f}")
+    for regression in regressions:
+        print(f"[WARN] {time.ctime()} | regression | {regression}")
+    if not regressions:
+        print(f"[INFO] {time.ctime()} | No regressions against {baseline_path}")
+    return regressions
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Benchmark the synthetic user journey pipeline")
+    parser.add_argument("--sizes", nargs="+", default=["10K", "100K", "1M"], choices=list(FIXTURE_ROWS))
+    parser.add_argument("--fixture-dir", default="benchmark_fixtures")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", default=None, help="results file to compare against; exits 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--engines", action="store_true", help="also compare the Faker and NumPy generators")
+    parser.add_argument("--retention-users", type=int, default=None, help="also time the cohort retention matrix for this many synthetic users over five years")
+    parser.add_argument("--retention-period", choices=["day", "week", "month"], default="day")
+    parser.add_argument("--task-pivot", nargs="*", default=None, choices=list(FIXTURE_ROWS), metavar="SIZE", help="also benchmark the pivoted_logs variants on raw event logs of these session sizes (default 10K 100K)")
+    args = parser.parse_args()
+
+    if args.engines:
+        benchmark_generation_engines(
+              user_counts=(500, 2_000),
+              max_cohort_groups=20,
+              maximum_session_per_user=30,
+          )
+        benchmark_feature_engagement(total_users=70_000)
+    results = benchmark_pipeline(sizes=args.sizes, fixture_dir=args.fixture_dir)
+    if args.task_pivot is not None:
+        results += benchmark_task_pivot(sizes=args.task_pivot or ("10K", "100K"), fixture_dir=args.fixture_dir)
+    if args.retention_users:
+        results += benchmark_retention_matrix(total_users=args.retention_users, period=args.retention_period)
+    write_benchmark_results(results, args.output)
+    if args.baseline and compare_to_baseline(results, args.baseline, tolerance=args.tolerance):
+        sys.exit(1)
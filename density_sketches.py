@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+
+
+class BinnedHistogram():
+    # Fixed-width bins over the closed range [lower, upper]. Counts are updated in place and
+    # merge by addition, so chunks, shards and cached partials combine without raw values.
+    # Values outside the range are tallied in underflow/overflow instead of being clipped.
+    def __init__(self, lower, upper, bin_width=1):
+        self.lower = lower
+        self.upper = upper
+        self.bin_width = bin_width
+        self.counts = np.zeros(int((upper - lower) // bin_width) + 1, dtype=np.int64)
+        self.underflow = 0
+        self.overflow = 0
+
+    @property
+    def bin_values(self):
+        return self.lower + np.arange(len(self.counts)) * self.bin_width
+
+    @property
+    def total(self):
+        return int(self.counts.sum())
+
+    def update(self, values, weights=None):
+        values = np.asarray(values)
+        weights = np.ones(len(values), dtype=np.int64) if weights is None else np.asarray(weights)
+        below = values < self.lower
+        above = values > self.upper
+        self.underflow += int(weights[below].sum())
+        self.overflow += int(weights[above].sum())
+        inside = ~(below | above)
+        index = ((values[inside] - self.lower) // self.bin_width).astype(np.int64)
+        self.counts += np.bincount(
+            index, weights=weights[inside], minlength=len(self.counts)
+        ).astype(np.int64)
+        return self
+
+    def merge(self, other):
+        if (self.lower, self.upper, self.bin_width) != (other.lower, other.upper, other.bin_width):
+            raise ValueError("cannot merge histograms with different bins")
+        merged = BinnedHistogram(self.lower, self.upper, self.bin_width)
+        merged.counts = self.counts + other.counts
+        merged.underflow = self.underflow + other.underflow
+        merged.overflow = self.overflow + other.overflow
+        return merged
+
+    def to_series(self):
+        return pd.Series(self.counts, index=self.bin_values)
+
+
+def merge_histograms(left, right):
+    return left.merge(right)
+
+
+def binned_kde(bin_values, counts, bw_adjust=1.0, cut=3, gridsize=200):
+    # Gaussian KDE of the sample the counts describe, evaluated on a regular grid by one FFT
+    # convolution of the bin masses with the kernel. The bandwidth is Scott's rule on the
+    # expanded sample (count-weighted std, n = total count), as for a KDE on raw rows.
+    bin_values = np.asarray(bin_values, dtype=float)
+    counts = np.asarray(counts, dtype=float)
+    occupied = np.flatnonzero(counts > 0)
+    if len(occupied) == 0:
+        return np.empty(0), np.empty(0)
+    bin_values = bin_values[occupied[0]:occupied[-1] + 1]
+    counts = counts[occupied[0]:occupied[-1] + 1]
+    total = counts.sum()
+    mean = (bin_values * counts).sum() / total
+    variance = (counts * np.square(bin_values - mean)).sum() / max(total - 1, 1)
+    bandwidth = np.sqrt(variance) * total ** -0.2 * bw_adjust
+    if bandwidth == 0:
+        return np.empty(0), np.empty(0)
+    step = bin_values[1] - bin_values[0] if len(bin_values) > 1 else bandwidth
+    span_in_steps = (bin_values[-1] - bin_values[0] + 2 * cut * bandwidth) / step
+    oversample = max(1, int(np.ceil(gridsize / span_in_steps)))
+    delta = step / oversample
+    pad = int(np.ceil(cut * bandwidth / delta))
+    n_grid = (len(bin_values) - 1) * oversample + 1 + 2 * pad
+    grid = bin_values[0] + (np.arange(n_grid) - pad) * delta
+    mass = np.zeros(n_grid)
+    mass[pad + np.arange(len(bin_values)) * oversample] = counts
+    offsets = np.arange(-(n_grid - 1), n_grid) * delta
+    kernel = np.exp(-0.5 * np.square(offsets / bandwidth)) / (bandwidth * np.sqrt(2 * np.pi))
+    size = 1 << int(np.ceil(np.log2(n_grid + len(kernel) - 1)))
+    convolved = np.fft.irfft(np.fft.rfft(mass, size) * np.fft.rfft(kernel, size), size)
+    density = convolved[n_grid - 1:2 * n_grid - 1] / total
+    return grid, np.maximum(density, 0.0)
@@ -0,0 +1,177 @@
+# pip3 install pandas numpy pyarrow
+
+import os
+import time
+from itertools import chain
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from generate_synthetic_user_data import BEHAVIOR_COLUMNS, PLATFORMS, iter_fake_dataset_chunks, shard_user_counts, to_columnar_table, vectorized_datetime_between, vectorized_uuid4
+
+SIMULATION_HOST:str = "https://simulation.Banksyde.io/"
+# Task path under the simulation host behind each behavior counter, as pivoted by transform_user_sessions.sql
+TASK_PATHS:Dict[str, str] = {
+    "plans_count": "after-school-plans", "accounts_count": "bank-accounts", "banking_usage": "banking-module",
+    "budgets_created": "budget", "budgeting_usage": "budgeting-module", "library_views": "content-library",
+    "library_banking_views": "content-library/banking", "library_budgeting_views": "content-library/budgeting",
+    "library_investing_views": "content-library/investing", "credit_usage": "credit-module",
+    "dashboard_visits": "dashboard", "goals_created": "goals", "goal_module_usage": "goals-module",
+    "internship_submissions": "internship-application", "investing_usage": "investing-module", "logins": "login",
+    "onboarding_info_completed": "onboarding-basic-info", "onboarding_avatar_done": "onboarding-create-avatar",
+    "onboarding_hobbies_set": "onboarding-hobbies", "onboarding_questions_answered": "onboarding-questions",
+    "qa_interactions": "q-and-a", "saving_entries": "saving-habits", "settings_visits": "settings", "signups": "signup",
+    "summerjob_usage": "summer-job-module", "tax_module_usage": "taxes-module", "tuition_fees_recorded": "tuition-and-fees",
+}
+# Page views the SQL filters out: the simulation landing page and off-host referrers
+NOISE_URLS:List[str] = [SIMULATION_HOST, "https://www.google.com/search", "https://mail.example.com/inbox"]
+LOG_URLS:List[str] = [SIMULATION_HOST + TASK_PATHS[col] for col in BEHAVIOR_COLUMNS] + NOISE_URLS
+BROWSERS:List[str] = ["Chrome", "Safari", "Firefox", "Edge"]
+OPERATING_SYSTEMS:List[str] = ["Windows", "Mac OS X", "iOS", "Android", "Linux"]
+# Every (device, browser, os) combination pre-rendered as a JSON properties string, so a
+# properties column is dictionary indices instead of per-row string formatting
+PROPERTY_JSON:List[str] = [
+    f'{{"$device_type": "{device}", "$browser": "{browser}", "$os": "{os_name}"}}'
+    for device in PLATFORMS for browser in BROWSERS for os_name in OPERATING_SYSTEMS
+]
+EVENT_LOG_TABLES:List[str] = ["users", "user_keys", "group_members", "interactions", "interaction_logs", "session_data"]
+
+# Arrow schemas of the upstream tables; labels, URLs and JSON properties are dictionary-encoded
+def event_log_schemas()->Dict[str, "pa.Schema"]:
+    import pyarrow as pa
+    label:pa.DataType = pa.dictionary(index_type=pa.int32(), value_type=pa.string())
+    return {
+        "users": pa.schema([("id", pa.string()), ("created_at", pa.timestamp("us")), ("properties", label)]),
+        "user_keys": pa.schema([("session_key", pa.string()), ("user_key", pa.string())]),
+        "group_members": pa.schema([("user_key", pa.string()), ("group_code", label)]),
+        "interactions": pa.schema([("user_key", pa.string()), ("$session_id", pa.string()), ("timestamp", pa.timestamp("us")), ("properties", label)]),
+        "interaction_logs": pa.schema([("interaction_id", label), ("timestamp", pa.timestamp("us")), ("current_url", label)]),
+        "session_data": pa.schema([("interaction_id", pa.string()), ("$start_timestamp", pa.timestamp("us")), ("$end_timestamp", pa.timestamp("us")), ("$session_duration", pa.int32())]),
+    }
+
+# Dictionary-encoded JSON properties for the given devices with random browser and OS
+def properties_array(rng:np.random.Generator, devices:np.ndarray)->"pa.DictionaryArray":
+    import pyarrow as pa
+    device_codes:np.ndarray = pd.Categorical(devices, categories=PLATFORMS).codes.astype(np.int32)
+    browser_codes:np.ndarray = rng.integers(low=0, high=len(BROWSERS), size=len(devices), dtype=np.int32)
+    os_codes:np.ndarray = rng.integers(low=0, high=len(OPERATING_SYSTEMS), size=len(devices), dtype=np.int32)
+    indices:np.ndarray = (device_codes * len(BROWSERS) + browser_codes) * len(OPERATING_SYSTEMS) + os_codes
+    return pa.DictionaryArray.from_arrays(indices, pa.array(PROPERTY_JSON))
+
+# interaction_logs rows for a slice of sessions: one page view per counted task visit plus Poisson
+# noise views the SQL must filter, each stamped at a uniform time inside its session
+def explode_interaction_logs(rng:np.random.Generator, session_ids:np.ndarray, starts:np.ndarray, durations:np.ndarray, task_counts:np.ndarray)->"pa.Table":
+    import pyarrow as pa
+    noise:np.ndarray = rng.poisson(lam=[1.0, 0.5, 0.25], size=(len(session_ids), len(NOISE_URLS)))
+    counts:np.ndarray = np.hstack([task_counts, noise]).astype(np.int64)
+    session_index:np.ndarray = np.repeat(np.arange(len(session_ids), dtype=np.int32), counts.sum(axis=1))
+    url_index:np.ndarray = np.repeat(np.tile(np.arange(len(LOG_URLS), dtype=np.int32), len(session_ids)), counts.ravel())
+    offsets_us:np.ndarray = (rng.random(size=len(session_index)) * durations[session_index] * 60_000_000).astype(np.int64)
+    return pa.table({
+        "interaction_id": pa.DictionaryArray.from_arrays(session_index, pa.array(session_ids)),
+        "timestamp": pa.array(starts[session_index] + offsets_us.astype("timedelta64[us]")),
+        "current_url": pa.DictionaryArray.from_arrays(url_index, pa.array(LOG_URLS)),
+    }, schema=event_log_schemas()["interaction_logs"])
+
+# Upstream tables for one flattened session batch. Interactions carry the batch's session keys as
+# $session_id, so the SQL output's interaction_id is the batch's session_key. Zero-length bounce
+# sessions (no page views) are added at `bounce_rate` for the $session_duration > 0 filter to drop.
+def build_event_log_batch(rng:np.random.Generator, sessions:pd.DataFrame, bounce_rate:float=0.05, log_rows_per_group:int=4_000_000)->Iterator[Tuple[str, "pa.Table"]]:
+    import pyarrow as pa
+    schemas:Dict[str, pa.Schema] = event_log_schemas()
+    users:pd.DataFrame = sessions.drop_duplicates(subset="user_key")
+    user_keys:np.ndarray = users["user_key"].to_numpy()
+    yield "users", pa.table({"id": user_keys, "created_at": users["registration_date"].to_numpy(dtype="datetime64[us]"), "properties": properties_array(rng=rng, devices=users["user_platform"].to_numpy())}, schema=schemas["users"])
+    yield "user_keys", pa.table({"session_key": vectorized_uuid4(rng=rng, size=len(users)), "user_key": user_keys}, schema=schemas["user_keys"])
+    yield "group_members", pa.table({"user_key": user_keys, "group_code": pa.array(users["group_code"].to_numpy()).dictionary_encode()}, schema=schemas["group_members"])
+
+    num_bounces:int = int(rng.binomial(n=len(sessions), p=bounce_rate))
+    bounce_owner:np.ndarray = rng.integers(low=0, high=len(users), size=num_bounces)
+    bounce_start:np.ndarray = vectorized_datetime_between(rng=rng, start=users["registration_date"].to_numpy(dtype="datetime64[us]")[bounce_owner], end=sessions["session_start_time"].to_numpy(dtype="datetime64[us]").max())
+    session_ids:np.ndarray = np.concatenate([sessions["session_key"].to_numpy(dtype=object), vectorized_uuid4(rng=rng, size=num_bounces)])
+    starts:np.ndarray = np.concatenate([sessions["session_start_time"].to_numpy(dtype="datetime64[us]"), bounce_start])
+    durations:np.ndarray = np.concatenate([sessions["duration_mins"].to_numpy(dtype=np.int64), np.zeros(num_bounces, dtype=np.int64)])
+    yield "interactions", pa.table({
+        "user_key": np.concatenate([sessions["user_key"].to_numpy(dtype=object), user_keys[bounce_owner]]),
+        "$session_id": session_ids,
+        "timestamp": starts,
+        "properties": properties_array(rng=rng, devices=np.concatenate([sessions["event_platform"].to_numpy(dtype=object), np.array(PLATFORMS, dtype=object)[rng.integers(low=0, high=len(PLATFORMS), size=num_bounces)]])),
+    }, schema=schemas["interactions"])
+    yield "session_data", pa.table({
+        "interaction_id": session_ids,
+        "$start_timestamp": starts,
+        "$end_timestamp": starts + durations.astype("timedelta64[m]"),
+        "$session_duration": (durations * 60).astype(np.int32),
+    }, schema=schemas["session_data"])
+
+    # Page views are written in row groups of about `log_rows_per_group` rows so a batch never
+    # materialises all of its log rows at once
+    task_counts:np.ndarray = sessions[BEHAVIOR_COLUMNS].to_numpy(dtype=np.int64)
+    mean_rows:float = max(float(task_counts.sum(axis=1).mean()) + 1.75, 1.0)
+    sessions_per_group:int = max(1, int(log_rows_per_group // mean_rows))
+    for start in range(0, len(sessions), sessions_per_group):
+        stop:int = min(start + sessions_per_group, len(sessions))
+        yield "interaction_logs", explode_interaction_logs(rng=rng, session_ids=session_ids[start:stop], starts=starts[start:stop], durations=durations[start:stop], task_counts=task_counts[start:stop])
+
+# Stream every upstream table for `total_users` users to <output_dir>/<table>/<part_name>.parquet,
+# one Parquet writer per table, so memory is bounded by `batch_users` and `log_rows_per_group`.
+# With write_sessions=True the flattened sessions the SQL should reproduce go to sessions/.
+def write_event_log_stream(output_dir:str, part_name:str="part-00000", bounce_rate:float=0.05, log_rows_per_group:int=4_000_000, write_sessions:bool=False, spawn_key:Tuple[int, ...]=(), seed:int=123, **chunk_kwargs)->Dict[str, int]:
+    import pyarrow.parquet as pq
+    schemas:Dict = event_log_schemas()
+    tables:List[str] = EVENT_LOG_TABLES + (["sessions"] if write_sessions else [])
+    writers:Dict = {}
+    rows:Dict[str, int] = {table: 0 for table in tables}
+    try:
+        for table in tables:
+            os.makedirs(os.path.join(output_dir, table), exist_ok=True)
+        chunks:Iterator[pd.DataFrame] = iter_fake_dataset_chunks(seed=seed, spawn_key=spawn_key, **chunk_kwargs)
+        for batch_index, sessions in enumerate(chunks):
+            rng:np.random.Generator = np.random.default_rng(np.random.SeedSequence(entropy=seed, spawn_key=(*spawn_key, batch_index, 0)))
+            batch = build_event_log_batch(rng=rng, sessions=sessions, bounce_rate=bounce_rate, log_rows_per_group=log_rows_per_group)
+            if write_sessions:
+                batch = chain([("sessions", to_columnar_table(df=sessions, max_cohort_groups=chunk_kwargs.get("max_cohort_groups", 20)))], batch)
+            for table, arrow_table in batch:
+                if table not in writers:
+                    writers[table] = pq.ParquetWriter(where=os.path.join(output_dir, table, f"{part_name}.parquet"), schema=schemas.get(table, arrow_table.schema), compression="zstd")
+                writers[table].write_table(arrow_table)
+                rows[table] += arrow_table.num_rows
+    finally:
+        for writer in writers.values():
+            writer.close()
+    return rows
+
+# Worker entry point: one shard of users, seeded like the sharded session generator
+def write_event_log_shard(shard_index:int, num_shards:int, output_dir:str, **stream_kwargs)->Dict[str, int]:
+    return write_event_log_stream(output_dir=output_dir, part_name=f"part-{shard_index:05d}-of-{num_shards:05d}", spawn_key=(shard_index,), **stream_kwargs)
+
+# Generate raw event logs for the SQL transform. Shards write their own part files in parallel and
+# contents depend only on (seed, num_shards, batch_users). The output directory can be passed
+# straight to local_sql_engine.run_session_sql or `user_journey_cli.py report`.
+def generate_event_logs(total_users:int=3_000, max_cohort_groups:int=20, maximum_session_per_user:int=30, output_dir:str="synthetic_event_logs", seed:int=123, batch_users:int=100_000, num_shards:Optional[int]=None, max_workers:Optional[int]=None, bounce_rate:float=0.05, log_rows_per_group:int=4_000_000, write_sessions:bool=False)->Dict[str, int]:
+    started:float = time.perf_counter()
+    stream_kwargs:Dict = {"max_cohort_groups": max_cohort_groups, "maximum_session_per_user": maximum_session_per_user, "batch_users": batch_users, "seed": seed, "bounce_rate": bounce_rate, "log_rows_per_group": log_rows_per_group, "write_sessions": write_sessions}
+    if num_shards is None:
+        shard_rows:List[Dict[str, int]] = [write_event_log_stream(output_dir=output_dir, total_users=total_users, **stream_kwargs)]
+    else:
+        shard_sizes:List[int] = shard_user_counts(total_users=total_users, num_shards=num_shards)
+        with ProcessPoolExecutor(max_workers=max_workers or min(num_shards, os.cpu_count() or 1)) as executor:
+            futures = [executor.submit(write_event_log_shard, shard_index=shard_index, num_shards=num_shards, output_dir=output_dir, total_users=shard_users, **stream_kwargs) for shard_index, shard_users in enumerate(shard_sizes)]
+            shard_rows = [future.result() for future in futures]
+    rows:Dict[str, int] = {table: sum(shard.get(table, 0) for shard in shard_rows) for table in shard_rows[0]}
+    for table, count in rows.items():
+        print(f'[INFO] {time.ctime()} | {table}: {count:,} rows')
+    print(f'[INFO] {time.ctime()} | Event logs written to {output_dir} in {time.perf_counter() - started:.1f}s')
+    return rows
+
+
+if __name__ == "__main__":
+
+    generate_event_logs(
+        total_users=50,
+        max_cohort_groups=3,
+        maximum_session_per_user=10,
+        output_dir="synthetic_event_logs",
+        write_sessions=True,
+    )
@@ -1,22 +1,49 @@
-# pip3 install pandas numpy datetime faker
+# pip3 install pandas numpy datetime faker pyarrow
 
+import os
 import time
+import shutil
 import pandas as pd
 import numpy as np
 import random
-from faker import Faker
 from datetime import datetime, timedelta
-from typing import List, Dict
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Iterator, Optional, Tuple
 
-fake = Faker()
+fake = None
 random.seed(123)
 np.random.seed(123)
 
+PLATFORMS:List[str] = ["Desktop", "Mobile", "Tablet"]
+BEHAVIOR_COLUMNS:List[str] = [
+    "plans_count", "accounts_count", "banking_usage", "budgets_created", "budgeting_usage",
+    "library_views", "library_banking_views", "library_budgeting_views", "library_investing_views",
+    "credit_usage", "dashboard_visits", "goals_created", "goal_module_usage", "internship_submissions",
+    "investing_usage", "logins", "onboarding_info_completed", "onboarding_avatar_done",
+    "onboarding_hobbies_set", "onboarding_questions_answered", "qa_interactions",
+    "saving_entries", "settings_visits", "signups", "summerjob_usage", "tax_module_usage",
+    "tuition_fees_recorded",
+]
+ARRANGED_COLUMNS:List[str] = ["session_key","user_key","group_code","registration_date","user_platform","event_platform","session_start_time","session_day","session_end_time","duration_mins",*BEHAVIOR_COLUMNS]
+COLUMNAR_FORMATS:Dict[str, str] = {".parquet": "parquet", ".pq": "parquet", ".arrow": "arrow", ".feather": "arrow"}
+TIMESTAMP_COLUMNS:List[str] = ["registration_date", "session_start_time", "session_end_time"]
+SIMULATION_START:datetime = datetime(2123, 1, 1)
+SIMULATION_END:datetime = datetime(2127, 12, 31)
+
+# Shared Faker instance, created on first use so the NumPy engine and the CLI never import Faker
+def get_faker():
+    global fake
+    if fake is None:
+        from faker import Faker
+        fake = Faker()
+    return fake
+
 # Create User Base (3K unique users)
 def create_users(num_users:int=3_000, max_groups:int=20)->pd.DataFrame:
+    fake = get_faker()
     user_data:List[Dict] = []
-    start_date = datetime(2123, 1, 1)
-    end_date = datetime(2127, 12, 31)
+    start_date = SIMULATION_START
+    end_date = SIMULATION_END
     for _ in range(num_users):
         user_id = fake.uuid4()
         created_at = fake.date_time_between(start_date=start_date, end_date=end_date)
@@ -33,12 +60,13 @@ def create_users(num_users:int=3_000, max_groups:int=20)->pd.DataFrame:
 
 # Generate User Sessions for Each User
 def create_sessions(df:pd.DataFrame, max_sessions_per_user:int=30)->pd.DataFrame:
+    fake = get_faker()
     session_data:List[Dict] = []
     for _, row in df.iterrows():
         user_id = row["user_key"]
         for _ in range(random.randint(1, max_sessions_per_user)):
             session_key = fake.uuid4()
-            session_date = fake.date_time_between(start_date=row["registration_date"], end_date=datetime(2127, 12, 31))
+            session_date = fake.date_time_between(start_date=row["registration_date"], end_date=SIMULATION_END)
             duration = random.randint(1, 120)
             session_end = session_date + timedelta(minutes=duration)
             event_platform = random.choice(["Desktop", "Mobile", "Tablet"])
@@ -54,16 +82,8 @@ def create_sessions(df:pd.DataFrame, max_sessions_per_user:int=30)->pd.DataFrame
 
 # Generate Features
 def generate_behavior_features(df:pd.DataFrame)->pd.DataFrame:
-    behaviors:List[str] = [
-        "plans_count", "accounts_count", "banking_usage", "budgets_created", "budgeting_usage",
-        "library_views", "library_banking_views", "library_budgeting_views", "library_investing_views",
-        "credit_usage", "dashboard_visits", "goals_created", "goal_module_usage", "internship_submissions",
-        "investing_usage", "logins", "onboarding_info_completed", "onboarding_avatar_done",
-        "onboarding_hobbies_set", "onboarding_questions_answered", "qa_interactions",
-        "saving_entries", "settings_visits", "signups", "summerjob_usage", "tax_module_usage",
-        "tuition_fees_recorded",
-    ]
-    
+    behaviors:List[str] = BEHAVIOR_COLUMNS
+
     feature_data:List[Dict] = []
     for _, row in df.iterrows():
         feature_row = {col: np.random.poisson(0.5) if "usage" in col else random.randint(0, 5) for col in behaviors}
@@ -74,17 +94,278 @@ def generate_behavior_features(df:pd.DataFrame)->pd.DataFrame:
     
     return pd.DataFrame(feature_data)
 
-# Generate Fake Dataset
-def generate_fake_dataset(total_users:int=3_000, max_cohort_groups:int=20, maximum_session_per_user:int=30, output_path:str="synthetic_user_sessions_data.csv")->None:
-    arranged_cols:list[str] = ["session_key","user_key","group_code","registration_date","user_platform","event_platform","session_start_time","session_day","session_end_time","duration_mins","plans_count","accounts_count","banking_usage","budgets_created","budgeting_usage","library_views","library_banking_views","library_budgeting_views","library_investing_views","credit_usage","dashboard_visits","goals_created","goal_module_usage","internship_submissions","investing_usage","logins","onboarding_info_completed","onboarding_avatar_done","onboarding_hobbies_set","onboarding_questions_answered","qa_interactions","saving_entries","settings_visits","signups","summerjob_usage","tax_module_usage","tuition_fees_recorded",]
+# Vectorized UUID4 strings drawn from a seeded generator (no per-row faker calls)
+def vectorized_uuid4(rng:np.random.Generator, size:int)->np.ndarray:
+    raw:np.ndarray = rng.integers(low=0, high=256, size=(size, 16), dtype=np.uint8)
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80
+    hex_chars:np.ndarray = np.frombuffer(raw.tobytes().hex().encode("ascii"), dtype=np.uint8).reshape(size, 32)
+    uuid_chars:np.ndarray = np.full(shape=(size, 36), fill_value=ord("-"), dtype=np.uint8)
+    uuid_chars[:, 0:8] = hex_chars[:, 0:8]
+    uuid_chars[:, 9:13] = hex_chars[:, 8:12]
+    uuid_chars[:, 14:18] = hex_chars[:, 12:16]
+    uuid_chars[:, 19:23] = hex_chars[:, 16:20]
+    uuid_chars[:, 24:36] = hex_chars[:, 20:32]
+    return uuid_chars.view("S36").ravel().astype(str)
+
+# Uniform microsecond timestamps in [start, end], vectorized equivalent of fake.date_time_between
+def vectorized_datetime_between(rng:np.random.Generator, start:np.ndarray, end:np.datetime64)->np.ndarray:
+    start = np.asarray(start, dtype="datetime64[us]")
+    span_us:np.ndarray = (np.datetime64(end, "us") - start).astype(np.int64)
+    offsets:np.ndarray = np.floor(rng.random(size=start.shape) * (span_us + 1)).astype(np.int64)
+    return start + offsets.astype("timedelta64[us]")
+
+# Create User Base with whole-array draws
+def create_users_vectorized(rng:np.random.Generator, num_users:int=3_000, max_groups:int=20)->pd.DataFrame:
+    group_labels:np.ndarray = np.array([f"group_{i}" for i in range(1, max_groups+1)], dtype=object)
+    registration_date:np.ndarray = vectorized_datetime_between(
+        rng=rng,
+        start=np.full(shape=num_users, fill_value=np.datetime64(SIMULATION_START, "us")),
+        end=np.datetime64(SIMULATION_END, "us"),
+    )
+    return pd.DataFrame({
+        "user_key": vectorized_uuid4(rng=rng, size=num_users),
+        "registration_date": registration_date,
+        "user_platform": np.array(PLATFORMS, dtype=object)[rng.integers(low=0, high=len(PLATFORMS), size=num_users)],
+        "group_code": group_labels[rng.integers(low=0, high=max_groups, size=num_users)],
+    })
+
+# Generate User Sessions already joined with their user attributes (no merge needed)
+def create_sessions_vectorized(rng:np.random.Generator, users:pd.DataFrame, max_sessions_per_user:int=30)->pd.DataFrame:
+    sessions_per_user:np.ndarray = rng.integers(low=1, high=max_sessions_per_user+1, size=len(users))
+    owner:np.ndarray = np.repeat(np.arange(len(users)), sessions_per_user)
+    num_sessions:int = len(owner)
+    registration_date:np.ndarray = users["registration_date"].to_numpy(dtype="datetime64[us]")[owner]
+    session_start:np.ndarray = vectorized_datetime_between(rng=rng, start=registration_date, end=np.datetime64(SIMULATION_END, "us"))
+    duration:np.ndarray = rng.integers(low=1, high=121, size=num_sessions)
+    return pd.DataFrame({
+        "session_key": vectorized_uuid4(rng=rng, size=num_sessions),
+        "user_key": users["user_key"].to_numpy()[owner],
+        "group_code": users["group_code"].to_numpy()[owner],
+        "registration_date": registration_date,
+        "user_platform": users["user_platform"].to_numpy()[owner],
+        "event_platform": np.array(PLATFORMS, dtype=object)[rng.integers(low=0, high=len(PLATFORMS), size=num_sessions)],
+        "session_start_time": session_start,
+        "session_day": session_start.astype("datetime64[D]").astype("datetime64[us]"),
+        "session_end_time": session_start + duration.astype("timedelta64[m]"),
+        "duration_mins": duration,
+    })
+
+# Generate Features for every session at once
+def generate_behavior_features_vectorized(rng:np.random.Generator, num_sessions:int)->pd.DataFrame:
+    return pd.DataFrame({
+        col: rng.poisson(lam=0.5, size=num_sessions) if "usage" in col else rng.integers(low=0, high=6, size=num_sessions)
+        for col in BEHAVIOR_COLUMNS
+    })
+
+# Build the Fake Dataset in memory with the per-row Faker path
+def build_fake_dataset(total_users:int=3_000, max_cohort_groups:int=20, maximum_session_per_user:int=30)->pd.DataFrame:
     users:pd.DataFrame = create_users(num_users=total_users, max_groups=max_cohort_groups)
     sessions:pd.DataFrame = create_sessions(df=users, max_sessions_per_user=maximum_session_per_user)
     features:pd.DataFrame = generate_behavior_features(df=sessions)
     df:pd.DataFrame = sessions.merge(users, on="user_key").merge(features, on="session_key")
     df["session_day"]:pd.Series = df["session_start_time"].dt.date
-    df:pd.DataFrame = df[arranged_cols]
+    return df[ARRANGED_COLUMNS]
+
+# Build one batch of the Fake Dataset with the NumPy engine
+def build_fake_batch(rng:np.random.Generator, total_users:int, max_cohort_groups:int=20, maximum_session_per_user:int=30)->pd.DataFrame:
+    users:pd.DataFrame = create_users_vectorized(rng=rng, num_users=total_users, max_groups=max_cohort_groups)
+    sessions:pd.DataFrame = create_sessions_vectorized(rng=rng, users=users, max_sessions_per_user=maximum_session_per_user)
+    features:pd.DataFrame = generate_behavior_features_vectorized(rng=rng, num_sessions=len(sessions))
+    return pd.concat([sessions, features], axis=1)[ARRANGED_COLUMNS]
+
+# Build the Fake Dataset in memory with the NumPy engine
+def build_fake_dataset_vectorized(total_users:int=3_000, max_cohort_groups:int=20, maximum_session_per_user:int=30, seed:int=123)->pd.DataFrame:
+    rng:np.random.Generator = np.random.default_rng(seed)
+    return build_fake_batch(rng=rng, total_users=total_users, max_cohort_groups=max_cohort_groups, maximum_session_per_user=maximum_session_per_user)
+
+# Yield the Fake Dataset as joined session+feature chunks of `batch_users` users each.
+# Every batch draws from its own SeedSequence child, so output is fixed by (seed, batch_users).
+def iter_fake_dataset_chunks(total_users:int=3_000, max_cohort_groups:int=20, maximum_session_per_user:int=30, batch_users:int=100_000, seed:int=123, spawn_key:Tuple[int, ...]=())->Iterator[pd.DataFrame]:
+    if batch_users <= 0:
+        raise ValueError(f"batch_users must be positive, got {batch_users}")
+    for batch_index, batch_start in enumerate(range(0, total_users, batch_users)):
+        rng:np.random.Generator = np.random.default_rng(np.random.SeedSequence(entropy=seed, spawn_key=(*spawn_key, batch_index)))
+        yield build_fake_batch(rng=rng, total_users=min(batch_users, total_users - batch_start), max_cohort_groups=max_cohort_groups, maximum_session_per_user=maximum_session_per_user)
+
+# Output format from the file extension: "parquet", "arrow" or "csv"
+def infer_output_format(output_path:str)->str:
+    return COLUMNAR_FORMATS.get(os.path.splitext(output_path)[1].lower(), "csv")
+
+# Compact Arrow schema: uint8 counters, uint16 duration, dictionary labels, timestamp[us], date32 day
+def columnar_schema()->"pa.Schema":
+    import pyarrow as pa
+    label:pa.DataType = pa.dictionary(index_type=pa.int8(), value_type=pa.string())
+    return pa.schema([
+        ("session_key", pa.string()),
+        ("user_key", pa.string()),
+        ("group_code", pa.dictionary(index_type=pa.int16(), value_type=pa.string())),
+        ("registration_date", pa.timestamp("us")),
+        ("user_platform", label),
+        ("event_platform", label),
+        ("session_start_time", pa.timestamp("us")),
+        ("session_day", pa.date32()),
+        ("session_end_time", pa.timestamp("us")),
+        ("duration_mins", pa.uint16()),
+        *[(col, pa.uint8()) for col in BEHAVIOR_COLUMNS],
+    ])
+
+# Convert a chunk to the compact columnar schema; categories are fixed so every batch shares one dictionary
+def to_columnar_table(df:pd.DataFrame, max_cohort_groups:int=20)->"pa.Table":
+    import pyarrow as pa
+    compact:pd.DataFrame = df.assign(
+        group_code=pd.Categorical(df["group_code"], categories=[f"group_{i}" for i in range(1, max_cohort_groups+1)]),
+        user_platform=pd.Categorical(df["user_platform"], categories=PLATFORMS),
+        event_platform=pd.Categorical(df["event_platform"], categories=PLATFORMS),
+        session_day=pd.to_datetime(df["session_day"]).dt.normalize(),
+        **{col: pd.to_datetime(df[col]).astype("datetime64[us]") for col in TIMESTAMP_COLUMNS},
+    )
+    return pa.Table.from_pandas(compact, preserve_index=False).cast(columnar_schema())
+
+# Stream the Fake Dataset one batch at a time; peak memory is bounded by `batch_users`.
+# Batches always come from the seeded NumPy engine; the Faker engine has no streaming mode.
+# CSV batches are appended to one handle, Parquet batches become row groups, Arrow batches record batches.
+def write_fake_dataset_stream(output_path:str, output_format:Optional[str]=None, **chunk_kwargs)->int:
+    output_format = output_format or infer_output_format(output_path=output_path)
+    max_cohort_groups:int = chunk_kwargs.get("max_cohort_groups", 20)
+    total_rows:int = 0
+    if output_format == "csv":
+        with open(output_path, mode='w', encoding='utf-8', newline='') as handle:
+            for chunk in iter_fake_dataset_chunks(**chunk_kwargs):
+                chunk.to_csv(path_or_buf=handle, sep=',', na_rep='', header=total_rows == 0, index=False)
+                total_rows += len(chunk)
+        return total_rows
+    with open_columnar_writer(output_path=output_path, output_format=output_format) as writer:
+        for chunk in iter_fake_dataset_chunks(**chunk_kwargs):
+            writer.write_table(to_columnar_table(df=chunk, max_cohort_groups=max_cohort_groups))
+            total_rows += len(chunk)
+    return total_rows
+
+# Parquet (zstd) or Arrow IPC file writer for the compact schema
+def open_columnar_writer(output_path:str, output_format:str):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    if output_format == "parquet":
+        return pq.ParquetWriter(where=output_path, schema=columnar_schema(), compression="zstd")
+    if output_format == "arrow":
+        return pa.ipc.new_file(sink=output_path, schema=columnar_schema())
+    raise ValueError(f"Unsupported columnar format: {output_format}")
+
+# Write an in-memory Fake Dataset in the format implied by `output_path`
+def write_fake_dataset_frame(df:pd.DataFrame, output_path:str, max_cohort_groups:int=20)->None:
+    output_format:str = infer_output_format(output_path=output_path)
+    if output_format == "csv":
+        df.to_csv(path_or_buf=output_path, sep=',', na_rep='', header=True, index=False, mode='w', encoding='utf-8')
+        return None
+    with open_columnar_writer(output_path=output_path, output_format=output_format) as writer:
+        writer.write_table(to_columnar_table(df=df, max_cohort_groups=max_cohort_groups))
+    return None
+
+# Split `total_users` into `num_shards` contiguous, near-equal slices
+def shard_user_counts(total_users:int, num_shards:int)->List[int]:
+    if num_shards <= 0:
+        raise ValueError(f"num_shards must be positive, got {num_shards}")
+    base, remainder = divmod(total_users, num_shards)
+    return [base + (1 if shard_index < remainder else 0) for shard_index in range(num_shards)]
+
+# File name of a single shard next to the final output
+def shard_output_path(output_path:str, shard_index:int, num_shards:int)->str:
+    return f"{output_path}.part-{shard_index:05d}-of-{num_shards:05d}"
+
+# Worker entry point: one shard, seeded from SeedSequence(seed).spawn(num_shards)[shard_index]
+def write_fake_shard(shard_index:int, num_shards:int, output_path:str, **chunk_kwargs)->Tuple[str, int]:
+    path:str = shard_output_path(output_path=output_path, shard_index=shard_index, num_shards=num_shards)
+    return path, write_fake_dataset_stream(output_path=path, output_format=infer_output_format(output_path=output_path), spawn_key=(shard_index,), **chunk_kwargs)
+
+# Concatenate shard files in shard order: CSV keeps only the first header, columnar formats copy batches
+def merge_shard_files(shard_paths:List[str], output_path:str, remove_shards:bool=True)->None:
+    output_format:str = infer_output_format(output_path=output_path)
+    if output_format == "csv":
+        with open(output_path, mode='wb') as merged:
+            for shard_index, path in enumerate(shard_paths):
+                with open(path, mode='rb') as shard:
+                    header:bytes = shard.readline()
+                    if shard_index == 0:
+                        merged.write(header)
+                    shutil.copyfileobj(shard, merged, length=16 * 1024 * 1024)
+    else:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        with open_columnar_writer(output_path=output_path, output_format=output_format) as writer:
+            for path in shard_paths:
+                if output_format == "parquet":
+                    shard_file = pq.ParquetFile(path)
+                    for row_group in range(shard_file.num_row_groups):
+                        writer.write_table(shard_file.read_row_group(row_group))
+                else:
+                    with pa.memory_map(path) as source:
+                        shard_reader = pa.ipc.open_file(source)
+                        for batch_index in range(shard_reader.num_record_batches):
+                            writer.write_batch(shard_reader.get_batch(batch_index))
+    if remove_shards:
+        for path in shard_paths:
+            os.remove(path)
+
+# Generate the Fake Dataset across worker processes. Shard contents depend only on
+# (seed, num_shards, batch_users), never on worker scheduling, so output is byte-identical.
+def generate_fake_dataset_sharded(total_users:int=3_000, max_cohort_groups:int=20, maximum_session_per_user:int=30, output_path:str="synthetic_user_sessions_data.csv", num_shards:int=4, max_workers:Optional[int]=None, batch_users:int=100_000, seed:int=123, merge_shards:bool=True)->List[str]:
+    shard_sizes:List[int] = shard_user_counts(total_users=total_users, num_shards=num_shards)
+    with ProcessPoolExecutor(max_workers=max_workers or min(num_shards, os.cpu_count() or 1)) as executor:
+        futures = [
+            executor.submit(
+                write_fake_shard,
+                shard_index=shard_index,
+                num_shards=num_shards,
+                output_path=output_path,
+                total_users=shard_users,
+                max_cohort_groups=max_cohort_groups,
+                maximum_session_per_user=maximum_session_per_user,
+                batch_users=batch_users,
+                seed=seed,
+            )
+            for shard_index, shard_users in enumerate(shard_sizes)
+        ]
+        shard_results:List[Tuple[str, int]] = [future.result() for future in futures]
+    shard_paths:List[str] = [path for path, _ in shard_results]
+    print(f'[INFO] {time.ctime()} | Fake Data Shape: {(sum(rows for _, rows in shard_results), len(ARRANGED_COLUMNS))} across {num_shards} shards')
+    if not merge_shards:
+        return shard_paths
+    merge_shard_files(shard_paths=shard_paths, output_path=output_path)
+    return [output_path]
+
+# Generate Fake Dataset; batching and sharding are only available with the NumPy engine (vectorized=True)
+def generate_fake_dataset(total_users:int=3_000, max_cohort_groups:int=20, maximum_session_per_user:int=30, output_path:str="synthetic_user_sessions_data.csv", vectorized:bool=False, seed:int=123, batch_users:Optional[int]=None, num_shards:Optional[int]=None, max_workers:Optional[int]=None)->None:
+    if not vectorized and (batch_users is not None or num_shards is not None):
+        raise ValueError("batch_users and num_shards need the NumPy engine (vectorized=True); the Faker engine builds the whole dataset in memory")
+    if num_shards is not None:
+        generate_fake_dataset_sharded(
+            total_users=total_users,
+            max_cohort_groups=max_cohort_groups,
+            maximum_session_per_user=maximum_session_per_user,
+            output_path=output_path,
+            num_shards=num_shards,
+            max_workers=max_workers,
+            batch_users=batch_users or 100_000,
+            seed=seed,
+        )
+        return None
+    if batch_users is not None:
+        total_rows:int = write_fake_dataset_stream(
+            output_path=output_path,
+            total_users=total_users,
+            max_cohort_groups=max_cohort_groups,
+            maximum_session_per_user=maximum_session_per_user,
+            batch_users=batch_users,
+            seed=seed,
+        )
+        print(f'[INFO] {time.ctime()} | Fake Data Shape: {(total_rows, len(ARRANGED_COLUMNS))}')
+        return None
+    if vectorized:
+        df:pd.DataFrame = build_fake_dataset_vectorized(total_users=total_users, max_cohort_groups=max_cohort_groups, maximum_session_per_user=maximum_session_per_user, seed=seed)
+    else:
+        df:pd.DataFrame = build_fake_dataset(total_users=total_users, max_cohort_groups=max_cohort_groups, maximum_session_per_user=maximum_session_per_user)
     print(f'[INFO] {time.ctime()} | Fake Data Shape: {df.shape}')
-    df.to_csv(path_or_buf=output_path, sep=',', na_rep='', header=True, index=False, mode='w', encoding='utf-8')
+    write_fake_dataset_frame(df=df, output_path=output_path, max_cohort_groups=max_cohort_groups)
     del df
     return None
 
@@ -0,0 +1,187 @@
+import glob
+import os
+import re
+import time
+
+from analyze_user_behavior_and_generate_report import FEATURE_COLUMNS
+from pipeline_profiler import StageProfiler
+
+RAW_TABLES = ["user_keys", "users", "group_members", "interactions", "interaction_logs", "session_data"]
+DEFAULT_SQL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "transform_user_sessions.sql")
+# Same query with pivoted_logs built from a task -> column id lookup join and one grouped count
+LOOKUP_SQL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "transform_user_sessions_lookup.sql")
+TASK_PATTERN = re.compile(r"COUNT\(IF\(task LIKE '([^']+)', 1, NULL\)\) AS (\w+)")
+HOST_PATTERN = re.compile(r"REPLACE\(current_url, '([^']+)', ''\)")
+
+# ClickHouse constructs used by transform_user_sessions.sql and their DuckDB equivalents.
+# JSONExtractString takes a key, not a path, so PostHog keys such as '$device_type' are quoted
+# into a JSONPath. formatDateTime(ts, '%D') (MM/DD/YY) becomes a DATE so the 21xx century
+# survives the trip into pandas. dateDiff and DuckDB's date_diff both count unit boundaries.
+CLICKHOUSE_TO_DUCKDB = [
+    (
+        re.compile(r"JSONExtractString\(\s*([^,()]+?)\s*,\s*'([^']*)'\s*\)"),
+        lambda match: f"json_extract_string({match[1]}, '$.\"{match[2]}\"')",
+    ),
+    (re.compile(r"formatDateTime\(\s*([^,()]+?)\s*,\s*'%D'\s*\)"), r"CAST(\1 AS DATE)"),
+    (re.compile(r"\bdateDiff\("), "date_diff("),
+    (re.compile(r"`([^`]+)`"), r'"\1"'),
+    (re.compile(r"(?<=\.)\$(\w+)"), r'"$\1"'),
+]
+UNTRANSLATED = re.compile(r"\b(JSONExtract\w*|formatDateTime|dateDiff|toStartOf\w+|arrayJoin)\s*\(")
+
+
+def translate_clickhouse_sql(sql):
+    for pattern, replacement in CLICKHOUSE_TO_DUCKDB:
+        sql = pattern.sub(replacement, sql)
+    leftover = sorted({match[1] for match in UNTRANSLATED.finditer(sql)})
+    if leftover:
+        raise ValueError(f"no DuckDB translation for ClickHouse constructs {leftover}")
+    return sql
+
+
+def raw_table_path(data_dir, table):
+    # Each raw table is <name>.parquet, <name>.csv or a <name>/ directory of Parquet parts;
+    # returns (path, format) or (None, None)
+    base = os.path.join(data_dir, table)
+    if os.path.isdir(base) and glob.glob(os.path.join(base, "*.parquet")):
+        return base, "parquet"
+    if os.path.exists(f"{base}.parquet"):
+        return f"{base}.parquet", "parquet"
+    if os.path.exists(f"{base}.csv"):
+        return f"{base}.csv", "csv"
+    return None, None
+
+
+def raw_table_sources(data_dir, tables=RAW_TABLES):
+    sources = {}
+    for table in tables:
+        path, table_format = raw_table_path(data_dir, table)
+        if table_format == "csv":
+            sources[table] = f"read_csv_auto('{path}')"
+        elif table_format == "parquet":
+            parts = os.path.join(path, "*.parquet") if os.path.isdir(path) else path
+            sources[table] = f"read_parquet('{parts}')"
+    missing = [table for table in tables if table not in sources]
+    if missing:
+        raise FileNotFoundError(f"raw tables {missing} not found in {data_dir} (.parquet, .csv or a directory of parts)")
+    return sources
+
+
+def cte_query(sql, name):
+    # The WITH clause cut after CTE `name`, selecting from it, so one intermediate step of the
+    # transformation can be run and timed on its own
+    match = re.search(rf"^\s*(WITH\s+)?{name}\s+AS\s*\(", sql, flags=re.MULTILINE)
+    if match is None:
+        raise ValueError(f"no CTE named {name!r} in the query")
+    depth = 0
+    for end in range(match.end() - 1, len(sql)):
+        depth += {"(": 1, ")": -1}.get(sql[end], 0)
+        if depth == 0:
+            return f"{sql[:end + 1]}\nSELECT * FROM {name}"
+    raise ValueError(f"unbalanced parentheses in CTE {name!r}")
+
+
+def run_session_sql(data_dir, sql_path=None, profiler=None, profile_path=None, threads=None, cte=None):
+    # Runs the ClickHouse transformation on an in-process DuckDB over local copies of the raw
+    # tables and returns the session table as a DataFrame ready for Analysis. Stage timings go
+    # to profiler (a StageProfiler); profile_path also writes DuckDB's per-operator JSON profile.
+    # cte returns that intermediate CTE (e.g. pivoted_logs) instead of the final table.
+    import duckdb
+
+    profiler = StageProfiler() if profiler is None else profiler
+    with profiler.stage("sql.translate"):
+        with open(sql_path or DEFAULT_SQL_PATH) as f:
+            query = translate_clickhouse_sql(f.read()).strip().rstrip(";")
+        if cte is not None:
+            query = cte_query(query, cte)
+        else:
+            # ClickHouse joins fill unmatched numeric columns with 0 (join_use_nulls = 0); DuckDB
+            # follows standard SQL and yields NULL, so sessions without task logs are zero-filled.
+            counts = ", ".join(f"COALESCE({col}, 0) AS {col}" for col in FEATURE_COLUMNS)
+            query = f"SELECT * REPLACE ({counts}) FROM ({query})"
+    con = duckdb.connect()
+    try:
+        if threads:
+            con.execute(f"SET threads = {int(threads)}")
+        with profiler.stage("sql.register"):
+            for table, source in raw_table_sources(data_dir).items():
+                con.execute(f"CREATE VIEW {table} AS SELECT * FROM {source}")
+        if profile_path is not None:
+            con.execute("PRAGMA enable_profiling = 'json'")
+            con.execute(f"PRAGMA profiling_output = '{profile_path}'")
+        with profiler.stage("sql.execute"):
+            result = con.execute(query).to_arrow_table()
+        if profile_path is not None:
+            con.execute("PRAGMA disable_profiling")
+    finally:
+        con.close()
+    with profiler.stage("sql.to_pandas"):
+        sessions = result.to_pandas(date_as_object=False)
+    for record in profiler.records:
+        if record["stage"].startswith("sql."):
+            print(f"[INFO] {time.ctime()} | {record['stage']}: {record['wall_seconds']:.3f}s")
+    print(f"[INFO] {time.ctime()} | Session SQL returned {len(sessions):,} rows from {data_dir}")
+    return sessions
+
+
+def pivot_interaction_logs(data_dir, sql_path=None, batch_rows=4_000_000):
+    # NumPy counterpart of the pivoted_logs CTE for local runs. Task patterns and the URL host are
+    # read from the query so both stay in step. Each distinct URL is mapped to a column id once,
+    # every log row then costs one array lookup, and the counts come from a single np.bincount
+    # over interaction_code * n_tasks + column_id. Interactions without a task view are left out;
+    # the session join zero-fills them exactly as it does for the SQL pivot.
+    import numpy as np
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    with open(sql_path or DEFAULT_SQL_PATH) as f:
+        sql = f.read()
+    host = HOST_PATTERN.search(sql)
+    tasks = TASK_PATTERN.findall(sql)
+    if host is None or not tasks:
+        raise ValueError(f"{sql_path or DEFAULT_SQL_PATH} has no LIKE-pattern pivoted_logs to mirror")
+    host = host[1]
+    column_ids = {task: column_id for column_id, (task, _) in enumerate(tasks)}
+    columns = [column for _, column in tasks]
+    path, table_format = raw_table_path(data_dir, "interaction_logs")
+    if path is None:
+        raise FileNotFoundError(f"interaction_logs not found in {data_dir} (.parquet, .csv or a directory of parts)")
+
+    id_parts, count_parts = [], []
+    dataset = ds.dataset(path, format=table_format)
+    # Readahead would buffer many batches at once for no gain on a single consumer
+    batches = dataset.to_batches(columns=["interaction_id", "current_url"], batch_size=batch_rows, batch_readahead=1, fragment_readahead=1)
+    for batch in batches:
+        urls = batch.column("current_url")
+        urls = urls if pa.types.is_dictionary(urls.type) else urls.dictionary_encode()
+        # Same task derivation as logs_filtered, applied per distinct URL; the extra last slot
+        # catches null URLs
+        url_columns = np.array(
+            [
+                column_ids.get(url.replace(host, "").strip(" "), -1) if url.startswith(host) else -1
+                for url in urls.dictionary.to_pylist()
+            ]
+            + [-1],
+            dtype=np.int64,
+        )
+        task = url_columns[urls.indices.fill_null(len(urls.dictionary)).to_numpy(zero_copy_only=False)]
+        ids = batch.column("interaction_id")
+        ids = ids if pa.types.is_dictionary(ids.type) else ids.dictionary_encode()
+        keep = (task >= 0) & ids.is_valid().to_numpy(zero_copy_only=False)
+        codes = ids.indices.to_numpy(zero_copy_only=False)[keep].astype(np.int64)
+        counts = np.bincount(codes * len(columns) + task[keep], minlength=len(ids.dictionary) * len(columns))
+        counts = counts.reshape(len(ids.dictionary), len(columns))
+        present = counts.any(axis=1)
+        id_parts.append(ids.dictionary.filter(pa.array(present)))
+        count_parts.append(counts[present].astype(np.int32))
+
+    counts = np.concatenate(count_parts) if count_parts else np.zeros((0, len(columns)), dtype=np.int32)
+    pivot = pd.DataFrame(counts, columns=columns)
+    pivot.insert(0, "interaction_id", pa.chunked_array(id_parts, type=pa.string()).to_pandas() if id_parts else pd.Series([], dtype=object))
+    split = pivot["interaction_id"].duplicated(keep=False)
+    if split.any():
+        # Interactions cut by a batch or part-file boundary; only those rows are regrouped
+        merged = pivot[split].groupby("interaction_id", sort=False, as_index=False).sum()
+        pivot = pd.concat([pivot[~split], merged], ignore_index=True)
+    return pivot
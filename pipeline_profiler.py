@@ -0,0 +1,100 @@
+import cProfile
+import csv
+import io
+import json
+import os
+import pstats
+import sys
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def current_rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024**2
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024**2 if sys.platform == "darwin" else peak / 1024
+
+
+class StageProfiler():
+    # Wall time, CPU time and memory per named stage. RSS is sampled when a stage ends; the
+    # process peak RSS is a high-water mark, so peak_rss_growth_mb is how far a stage raised it.
+    FIELDS = ["stage", "wall_seconds", "cpu_seconds", "rss_mb", "peak_rss_mb", "peak_rss_growth_mb", "pid"]
+
+    def __init__(self):
+        self.records = []
+
+    def start(self):
+        return time.perf_counter(), time.process_time(), peak_rss_mb()
+
+    def stop(self, stage, probe):
+        wall_started, cpu_started, peak_started = probe
+        peak = peak_rss_mb()
+        record = {
+            "stage": stage,
+            "wall_seconds": time.perf_counter() - wall_started,
+            "cpu_seconds": time.process_time() - cpu_started,
+            "rss_mb": current_rss_mb(),
+            "peak_rss_mb": peak,
+            "peak_rss_growth_mb": None if peak is None else peak - peak_started,
+            "pid": os.getpid(),
+        }
+        self.records.append(record)
+        return record
+
+    @contextmanager
+    def stage(self, name):
+        probe = self.start()
+        try:
+            yield
+        finally:
+            self.stop(name, probe)
+
+    def write(self, path_stem):
+        json_path, csv_path = f"{path_stem}.json", f"{path_stem}.csv"
+        with open(json_path, "w") as f:
+            json.dump({"pid": os.getpid(), "records": self.records}, f, indent=2)
+        with open(csv_path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=self.FIELDS)
+            writer.writeheader()
+            writer.writerows(self.records)
+        return json_path, csv_path
+
+    def appendix_html(self):
+        def cell(value, fmt):
+            return "" if value is None else format(value, fmt)
+
+        rows = "".join(
+            f"<tr><td>{record['stage']}</td><td>{cell(record['wall_seconds'], '.3f')}</td>"
+            f"<td>{cell(record['cpu_seconds'], '.3f')}</td><td>{cell(record['rss_mb'], ',.1f')}</td>"
+            f"<td>{cell(record['peak_rss_mb'], ',.1f')}</td><td>{cell(record['peak_rss_growth_mb'], ',.1f')}</td></tr>"
+            for record in self.records
+        )
+        return (
+            "<table class='profile'><tr><th>Stage</th><th>Wall (s)</th><th>CPU (s)</th>"
+            f"<th>RSS (MB)</th><th>Peak RSS (MB)</th><th>Peak growth (MB)</th></tr>{rows}</table>"
+        )
+
+
+def profile_call(func, stats_path, top=20):
+    # Runs func under cProfile, dumps the raw stats for pstats/snakeviz and returns the result
+    # together with the top entries by cumulative time as text.
+    profiler = cProfile.Profile()
+    result = profiler.runcall(func)
+    profiler.dump_stats(stats_path)
+    summary = io.StringIO()
+    pstats.Stats(profiler, stream=summary).sort_stats("cumulative").print_stats(top)
+    return result, summary.getvalue()
@@ -0,0 +1,69 @@
+import hashlib
+import json
+import os
+import pickle
+import numpy as np
+import pandas as pd
+
+
+def params_fingerprint(**params):
+    payload = json.dumps(params, sort_keys=True, default=str).encode("UTF-8")
+    return hashlib.sha256(payload).hexdigest()[:32]
+
+
+def row_hashes(df):
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+
+def rows_digest(hashes):
+    return hashlib.sha256(np.ascontiguousarray(hashes).tobytes()).hexdigest()
+
+
+class ReportCache():
+    # One pickled entry per parameter fingerprint: the data fingerprint it was built from
+    # (row count + digest of per-row hashes), mergeable aggregates and rendered fragments.
+    # Entries are evicted least-recently-used first once the directory exceeds max_bytes.
+    def __init__(self, cache_dir, max_bytes=512 * 1024**2):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def entry_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+
+    def load(self, key):
+        path = self.entry_path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "rb") as f:
+                entry = pickle.load(f)
+        except Exception:
+            # Truncated, corrupt or written by an incompatible version: rebuild it
+            os.remove(path)
+            return None
+        os.utime(path)
+        return entry
+
+    def store(self, key, entry):
+        path = self.entry_path(key)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        self.evict(keep=key)
+
+    def evict(self, keep=None):
+        entries = []
+        for file_name in os.listdir(self.cache_dir):
+            if file_name.endswith(".pkl"):
+                stat = os.stat(os.path.join(self.cache_dir, file_name))
+                entries.append((stat.st_mtime, stat.st_size, file_name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, file_name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if keep is not None and file_name == f"{keep}.pkl":
+                continue
+            os.remove(os.path.join(self.cache_dir, file_name))
+            total -= size
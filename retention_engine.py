@@ -0,0 +1,251 @@
+import numpy as np
+import pandas as pd
+
+
+def user_retention_table(user_lifetimes, observation_end=None):
+    # One row per user: lifetime in days from signup to last session, and days of inactivity
+    # between the last session and the end of the observation window.
+    observation_end = (
+        user_lifetimes["last_session_day"].max() if observation_end is None else observation_end
+    )
+    lifetime = user_lifetimes["last_session_day"] - user_lifetimes["registration_date"]
+    table = user_lifetimes.assign(
+        duration=lifetime.dt.days,
+        inactive_days=(observation_end - user_lifetimes["last_session_day"]).dt.days,
+    )
+    return table[lifetime > pd.Timedelta(0)]
+
+
+def kaplan_meier_curves(durations, inactive_days, thresholds, strata=None):
+    # Survival curves for every churn threshold in one pass per stratum. A user is an observed
+    # churn event for threshold t when inactive_days >= t, otherwise censored at their duration.
+    # At-risk counts are shared by all thresholds; events per threshold come from one bincount
+    # over (unique duration, number of thresholds the user churned under).
+    durations = np.asarray(durations, dtype=np.int64)
+    inactive_days = np.asarray(inactive_days, dtype=np.int64)
+    thresholds = list(dict.fromkeys(thresholds))
+    sorted_thresholds = np.sort(np.asarray(thresholds, dtype=np.int64))
+    churned_under = np.searchsorted(sorted_thresholds, inactive_days, side="right")
+    if strata is None:
+        strata_codes, strata_labels = np.zeros(len(durations), dtype=np.int64), np.array([None])
+    else:
+        strata_codes, strata_labels = pd.factorize(np.asarray(strata), sort=True)
+    curves = []
+    for stratum_code, stratum in enumerate(strata_labels):
+        in_stratum = strata_codes == stratum_code
+        if not in_stratum.any():
+            continue
+        timeline, duration_index = np.unique(durations[in_stratum], return_inverse=True)
+        counts = np.bincount(
+            duration_index * (len(thresholds) + 1) + churned_under[in_stratum],
+            minlength=len(timeline) * (len(thresholds) + 1),
+        ).reshape(len(timeline), len(thresholds) + 1)
+        at_risk = counts.sum(axis=1)[::-1].cumsum()[::-1]
+        events = counts[:, ::-1].cumsum(axis=1)[:, ::-1][:, 1:]
+        survival = np.cumprod(1.0 - events / at_risk[:, None], axis=0)
+        if timeline[0] > 0:
+            timeline = np.r_[0, timeline]
+            at_risk = np.r_[at_risk[0], at_risk]
+            events = np.vstack([np.zeros((1, len(thresholds)), dtype=events.dtype), events])
+            survival = np.vstack([np.ones((1, len(thresholds))), survival])
+        for column, threshold in enumerate(sorted_thresholds):
+            curves.append(
+                pd.DataFrame(
+                    {
+                        "stratum": stratum,
+                        "threshold": threshold,
+                        "timeline": timeline,
+                        "at_risk": at_risk,
+                        "events": events[:, column],
+                        "survival": survival[:, column],
+                    }
+                )
+            )
+    if not curves:
+        return pd.DataFrame(columns=["stratum", "threshold", "timeline", "at_risk", "events", "survival"])
+    curves = pd.concat(curves, ignore_index=True)
+    curves["threshold"] = pd.Categorical(curves["threshold"], categories=thresholds)
+    return curves.sort_values(["stratum", "threshold"], kind="stable", ignore_index=True)
+
+
+PERIOD_DAYS = {"day": 1, "week": 7}
+# Five years of periods by default, so one user's daily activity packs into 229 bytes
+DEFAULT_MAX_PERIODS = {"day": 1827, "week": 261, "month": 60}
+# BYTE_BITS[v, i] is bit i (most significant first, as np.packbits lays them out) of byte value v
+BYTE_BITS = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).astype(np.int64)
+
+
+def period_offsets(later, earlier, period="week"):
+    # Whole days, weeks or calendar months from earlier to later
+    later = np.asarray(later, dtype="datetime64[ns]")
+    earlier = np.asarray(earlier, dtype="datetime64[ns]")
+    if period == "month":
+        return (later.astype("datetime64[M]") - earlier.astype("datetime64[M]")).astype(np.int64)
+    if period not in PERIOD_DAYS:
+        raise ValueError(f"period must be one of {list(PERIOD_DAYS) + ['month']}, not {period!r}")
+    days = (later.astype("datetime64[D]") - earlier.astype("datetime64[D]")).astype(np.int64)
+    return days // PERIOD_DAYS[period]
+
+
+class ActivityBitsets():
+    # Each user's activity since signup as one packed bit row: bit k is set when the user had a
+    # session k periods after registration (np.packbits layout, most significant bit first).
+    # A user costs max_periods / 8 bytes however many sessions they have, so five years of
+    # daily activity for 10M users is 2.3 GB. Rows live in segments that are never copied:
+    # merging a chunk ORs its returning users into their rows in place and appends its new
+    # users as one more segment, so a merge costs the chunk's size, not the table's. Peak
+    # memory is the table, a user_key -> row map (about 130 bytes per user) and one chunk.
+    def __init__(self, period="week", max_periods=None):
+        period_offsets([], [], period)
+        self.period = period
+        self.max_periods = DEFAULT_MAX_PERIODS[period] if max_periods is None else int(max_periods)
+        self.n_bytes = (self.max_periods + 7) // 8
+        # (user_keys, group_code, registration_date, bits) per segment, and each segment's first row
+        self.segments = []
+        self.segment_starts = np.zeros(1, dtype=np.int64)
+        # user_key -> row, built on the first merge and kept up to date after that
+        self.rows = None
+        self.observation_end = None
+
+    @classmethod
+    def from_sessions(cls, user_key, group_code, registration_date, session_day, period="week", max_periods=None):
+        # One row per distinct user_key; group and registration date come from their first row
+        bitsets = cls(period=period, max_periods=max_periods)
+        # Series keep categorical columns as codes until only one row per user is left
+        rows, user_keys = pd.factorize(pd.Series(user_key))
+        _, first_row = np.unique(rows, return_index=True)
+        registration_date = np.asarray(registration_date, dtype="datetime64[ns]")
+        session_day = np.asarray(session_day, dtype="datetime64[ns]")
+        first_registration = registration_date[first_row]
+        bits = np.zeros((len(user_keys), bitsets.n_bytes), dtype=np.uint8)
+        offsets = period_offsets(session_day, first_registration[rows], period)
+        in_range = (offsets >= 0) & (offsets < bitsets.max_periods)
+        rows, offsets = rows[in_range], offsets[in_range]
+        # Repeated (user, period) pairs set the same bit, so OR needs no de-duplication
+        np.bitwise_or.at(bits.reshape(-1), rows * bitsets.n_bytes + (offsets >> 3), (128 >> (offsets & 7)).astype(np.uint8))
+        bitsets.append_segment(
+            np.asarray(user_keys, dtype=object),
+            pd.Series(group_code).take(first_row).to_numpy(dtype=object),
+            first_registration,
+            bits,
+        )
+        bitsets.observation_end = session_day.max() if len(session_day) else None
+        return bitsets
+
+    def __len__(self):
+        return int(self.segment_starts[-1])
+
+    def __getstate__(self):
+        # The key-to-row map is rebuilt on the next merge rather than pickled
+        return {**self.__dict__, "rows": None}
+
+    @property
+    def user_keys(self):
+        return pd.Index(np.concatenate([segment[0] for segment in self.segments] or [np.array([], dtype=object)]))
+
+    @property
+    def group_code(self):
+        return np.concatenate([segment[1] for segment in self.segments] or [np.array([], dtype=object)])
+
+    @property
+    def registration_date(self):
+        return np.concatenate([segment[2] for segment in self.segments] or [np.array([], dtype="datetime64[ns]")])
+
+    @property
+    def bits(self):
+        # A copy of the whole table; counting and merging work segment by segment instead
+        return np.concatenate([segment[3] for segment in self.segments] or [np.zeros((0, self.n_bytes), dtype=np.uint8)])
+
+    def append_segment(self, user_keys, group_code, registration_date, bits):
+        if self.rows is not None:
+            self.rows.update(zip(user_keys, range(len(self), len(self) + len(user_keys))))
+        self.segments.append((user_keys, group_code, registration_date, bits))
+        self.segment_starts = np.append(self.segment_starts, len(self) + len(user_keys))
+
+    def or_rows(self, rows, bits):
+        # OR bits into the given table rows, one segment at a time
+        segment = np.searchsorted(self.segment_starts, rows, side="right") - 1
+        order = np.argsort(segment, kind="stable")
+        segment, rows, bits = segment[order], rows[order], bits[order]
+        bounds = np.flatnonzero(np.r_[True, segment[1:] != segment[:-1], True])
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            index = segment[start]
+            self.segments[index][3][rows[start:end] - self.segment_starts[index]] |= bits[start:end]
+
+    def merge(self, other):
+        # Folds other into this table in place and returns it: rows of users present on both
+        # sides are OR-ed, other's new users are appended. Only other's keys are looked up.
+        if (other.period, other.max_periods) != (self.period, self.max_periods):
+            raise ValueError("cannot merge activity bitsets with different periods")
+        if self.rows is None:
+            self.rows = {key: row for row, key in enumerate(self.user_keys)}
+        for user_keys, group_code, registration_date, bits in other.segments:
+            rows = np.fromiter((self.rows.get(key, -1) for key in user_keys), dtype=np.int64, count=len(user_keys))
+            returning = rows >= 0
+            if returning.any():
+                self.or_rows(rows[returning], bits[returning])
+            new = ~returning
+            if new.any():
+                self.append_segment(user_keys[new], group_code[new], registration_date[new], bits[new])
+        ends = [end for end in [self.observation_end, other.observation_end] if end is not None]
+        self.observation_end = max(ends) if ends else None
+        return self
+
+    def cohort_labels(self, cohort="group_code"):
+        if cohort == "group_code":
+            return self.group_code.astype(str)
+        if cohort == "registration_month":
+            return np.datetime_as_string(self.registration_date.astype("datetime64[M]"))
+        raise ValueError(f"cohort must be 'group_code' or 'registration_month', not {cohort!r}")
+
+    def retention_counts(self, cohort="group_code", observation_end=None, block_bytes=1 << 22):
+        # Per cohort and period k: users active at k (a per-bit popcount) and users whose k-th
+        # period had started by observation_end. The counts add up across disjoint sets of
+        # users, so populations too large for one bitset table can be counted block by block.
+        # Per-bit popcounts come from byte-value histograms: one bincount over (byte column,
+        # cohort, byte value) per block of about block_bytes packed bytes, times the 256 x 8
+        # BYTE_BITS table.
+        codes, labels = pd.factorize(self.cohort_labels(cohort), sort=True)
+        n_cohorts, n_bytes = len(labels), self.n_bytes
+        byte_counts = np.zeros(n_bytes * n_cohorts * 256, dtype=np.int64)
+        key_type = np.int32 if len(byte_counts) <= np.iinfo(np.int32).max else np.int64
+        columns = np.arange(n_bytes, dtype=key_type) * (n_cohorts * 256)
+        cohort_keys = codes.astype(key_type) * 256
+        block_users = max(1, block_bytes // max(n_bytes, 1))
+        for (_, _, _, bits), first_row in zip(self.segments, self.segment_starts):
+            for start in range(0, len(bits), block_users):
+                keys = bits[start:start + block_users].astype(key_type)
+                keys += cohort_keys[first_row + start:first_row + start + len(keys), None]
+                keys += columns
+                byte_counts += np.bincount(keys.reshape(-1), minlength=len(byte_counts))
+        active = (byte_counts.reshape(n_bytes, n_cohorts, 256) @ BYTE_BITS).transpose(1, 0, 2)
+        active = active.reshape(n_cohorts, n_bytes * 8)[:, : self.max_periods]
+        observation_end = self.observation_end if observation_end is None else observation_end
+        observable = period_offsets(
+            np.full(len(self), np.datetime64(observation_end, "ns")), self.registration_date, self.period
+        )
+        observed = observable >= 0
+        last_period = np.minimum(observable[observed], self.max_periods - 1)
+        eligible = np.bincount(
+            codes[observed] * self.max_periods + last_period, minlength=n_cohorts * self.max_periods
+        ).reshape(n_cohorts, self.max_periods)
+        eligible = eligible[:, ::-1].cumsum(axis=1)[:, ::-1]
+        index = pd.Index(labels, name="cohort")
+        periods = pd.RangeIndex(self.max_periods, name=self.period)
+        return pd.DataFrame(active, index=index, columns=periods), pd.DataFrame(eligible, index=index, columns=periods)
+
+    def retention_matrix(self, cohort="group_code", observation_end=None):
+        # Share of each cohort's users active k periods after signup, among users observed that
+        # long; periods no user has reached yet are dropped
+        active, eligible = self.retention_counts(cohort, observation_end)
+        return retention_rates(active, eligible)
+
+
+def retention_rates(active, eligible):
+    rates = (active / eligible.where(eligible > 0)).astype(float)
+    return rates.loc[:, eligible.gt(0).any(axis=0)]
+
+
+def merge_activity_bitsets(left, right):
+    # In place: left is the running table
+    return left.merge(right)
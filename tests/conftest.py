@@ -0,0 +1,15 @@
+import os
+import sys
+
+import pytest
+
+# The modules are flat scripts in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def sessions():
+    # A small fixed-seed session table shared by the tests; copy it before mutating
+    from generate_synthetic_user_data import build_fake_dataset_vectorized
+
+    return build_fake_dataset_vectorized(total_users=400, max_cohort_groups=5, maximum_session_per_user=30, seed=7)
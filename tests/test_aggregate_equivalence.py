@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from analyze_user_behavior_and_generate_report import FEATURE_COLUMNS, FIGURE_SPECS, Analysis
+from report_cache import ReportCache
+
+# Figures built only from mergeable aggregates, the ones chunked and cache-append runs can draw
+MERGEABLE_FIGURES = [name for name, spec in FIGURE_SPECS.items() if spec.aggregates is not None]
+
+
+def assert_payload_equal(actual, expected, path="payload"):
+    # Payloads are frames, series, arrays, histograms or tuples/dicts of those
+    if isinstance(expected, pd.DataFrame):
+        pd.testing.assert_frame_equal(actual, expected, check_dtype=False, check_categorical=False, obj=path)
+    elif isinstance(expected, pd.Series):
+        pd.testing.assert_series_equal(actual, expected, check_dtype=False, check_categorical=False, obj=path)
+    elif isinstance(expected, dict):
+        assert list(actual) == list(expected), path
+        for key in expected:
+            assert_payload_equal(actual[key], expected[key], f"{path}[{key!r}]")
+    elif isinstance(expected, (tuple, list)):
+        assert len(actual) == len(expected), path
+        for i, (left, right) in enumerate(zip(actual, expected)):
+            assert_payload_equal(left, right, f"{path}[{i}]")
+    elif isinstance(expected, np.ndarray):
+        assert np.array_equal(actual, expected) or np.allclose(actual, expected), path
+    elif hasattr(expected, "__dict__"):
+        assert type(actual) is type(expected), path
+        assert_payload_equal(vars(actual), vars(expected), path)
+    else:
+        assert actual == expected or np.isclose(actual, expected), path
+
+
+@pytest.fixture(scope="module")
+def in_memory_payloads(sessions):
+    analysis = Analysis(sessions.copy())
+    analysis.verbose = False
+    analysis.preprocess()
+    return {name: analysis.figure_payload(name) for name in MERGEABLE_FIGURES}
+
+
+@pytest.mark.parametrize("name", MERGEABLE_FIGURES)
+def test_out_of_core_payload_equals_in_memory(sessions, in_memory_payloads, tmp_path_factory, name):
+    path = tmp_path_factory.getbasetemp() / "sessions.parquet"
+    if not path.exists():
+        sessions.to_parquet(path, index=False)
+    analysis = Analysis(str(path), chunk_rows=1000)
+    analysis.verbose = False
+    analysis.aggregate_chunks([name])
+    assert_payload_equal(analysis.figure_payload(name), in_memory_payloads[name], name)
+
+
+def test_cache_append_payloads_equal_in_memory(sessions, in_memory_payloads, tmp_path, capsys):
+    cache = ReportCache(str(tmp_path / "cache"))
+    head = Analysis(sessions.iloc[: len(sessions) // 2].copy())
+    head.verbose = False
+    head.render_figures_cached(MERGEABLE_FIGURES, cache)
+    capsys.readouterr()
+    analysis = Analysis(sessions.copy())
+    analysis.verbose = False
+    analysis.render_figures_cached(MERGEABLE_FIGURES, cache)
+    # The second run merged the cached head aggregates with the tail instead of a full rebuild
+    assert "Report cache append" in capsys.readouterr().out
+    for name in MERGEABLE_FIGURES:
+        assert_payload_equal(analysis.figure_payload(name), in_memory_payloads[name], name)
+
+
+def test_sessions_are_ranked_only_for_figures_that_read_session_rank(sessions, in_memory_payloads):
+    unranked = Analysis(sessions.copy(), figures=["hourly_activity", "session_duration_over_time"])
+    unranked.verbose = False
+    unranked.preprocess()
+    assert "session_rank" not in unranked.df
+    assert "preprocess.session_rank" not in unranked.timings
+    ranked = Analysis(sessions.copy(), figures=["first_vs_later_session_duration"])
+    ranked.verbose = False
+    ranked.preprocess()
+    assert "session_rank" in ranked.df
+    name = "first_vs_later_session_duration"
+    assert_payload_equal(ranked.figure_payload(name), in_memory_payloads[name], name)
+    # Asked for later anyway, first_sessions ranks on demand
+    assert_payload_equal(unranked.aggregate("first_sessions"), ranked.aggregate("first_sessions"), "first_sessions")
+
+
+def test_tied_features_keep_column_order(sessions):
+    # Every feature used equally often: the orders must not depend on the sort algorithm
+    tied = sessions.copy()
+    tied[FEATURE_COLUMNS] = 1
+    analysis = Analysis(tied)
+    analysis.verbose = False
+    analysis.preprocess()
+    names = [col.replace("_count", "") for col in analysis.feature_columns]
+    _, feature_order = analysis.figure_payload("feature_engagement")
+    assert feature_order == sorted(names)
+    assert analysis.figure_payload("repeat_feature_usage").index.tolist() == names
+    assert analysis.figure_payload("feature_usage_distribution")["index"].tolist() == names
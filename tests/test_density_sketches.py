@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from density_sketches import BinnedHistogram, binned_kde, merge_histograms
+
+
+def direct_gaussian_kde(values, grid, bw_adjust=1.0):
+    # Gaussian KDE over raw values with Scott's bandwidth, one kernel per value
+    values = np.asarray(values, dtype=float)
+    bandwidth = values.std(ddof=1) * len(values) ** -0.2 * bw_adjust
+    z = (grid[:, None] - values[None, :]) / bandwidth
+    return np.exp(-0.5 * z * z).sum(axis=1) / (len(values) * bandwidth * np.sqrt(2 * np.pi))
+
+
+@pytest.mark.parametrize("bin_width", [1, 5])
+def test_histogram_merge_equals_single_pass(bin_width):
+    rng = np.random.default_rng(0)
+    values = rng.integers(-20, 260, size=5000)
+    weights = rng.integers(1, 4, size=5000)
+    whole = BinnedHistogram(0, 240, bin_width).update(values, weights)
+    merged = None
+    for start in range(0, len(values), 700):
+        part = BinnedHistogram(0, 240, bin_width).update(values[start:start + 700], weights[start:start + 700])
+        merged = part if merged is None else merge_histograms(merged, part)
+    assert np.array_equal(merged.counts, whole.counts)
+    assert (merged.underflow, merged.overflow) == (whole.underflow, whole.overflow)
+    assert merged.total + merged.underflow + merged.overflow == weights.sum()
+
+
+def test_histogram_merge_rejects_different_bins():
+    with pytest.raises(ValueError):
+        BinnedHistogram(0, 100).merge(BinnedHistogram(0, 100, bin_width=2))
+
+
+@pytest.mark.parametrize("bw_adjust", [0.5, 1.0, 2.0])
+def test_binned_kde_matches_direct_kde(bw_adjust):
+    # Integer-valued sample in unit bins: the binned KDE is exact, so it matches the direct one
+    rng = np.random.default_rng(1)
+    values = np.concatenate([rng.poisson(12, size=3000), rng.poisson(60, size=1000)])
+    histogram = BinnedHistogram(0, values.max()).update(values)
+    grid, density = binned_kde(histogram.bin_values, histogram.counts, bw_adjust=bw_adjust)
+    assert len(grid) >= 200
+    assert grid[0] < values.min() and grid[-1] > values.max()
+    expected = direct_gaussian_kde(values, grid, bw_adjust=bw_adjust)
+    assert np.allclose(density, expected, rtol=1e-6, atol=1e-9)
+    assert np.isclose(density.sum() * (grid[1] - grid[0]), 1.0, atol=1e-3)
+
+
+def test_binned_kde_of_empty_or_constant_counts_is_empty():
+    assert len(binned_kde([0, 1, 2], [0, 0, 0])[0]) == 0
+    assert len(binned_kde([0, 1, 2], [0, 7, 0])[0]) == 0
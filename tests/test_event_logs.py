@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from analyze_user_behavior_and_generate_report import Analysis
+from generate_synthetic_event_logs import generate_event_logs
+
+pytest.importorskip("duckdb")
+
+
+@pytest.fixture(scope="module")
+def raw_logs(tmp_path_factory):
+    output_dir = str(tmp_path_factory.mktemp("raw_logs"))
+    generate_event_logs(total_users=300, max_cohort_groups=5, output_dir=output_dir, seed=11, batch_users=120, write_sessions=True)
+    return output_dir
+
+
+def test_raw_logs_round_trip_keeps_sessions(raw_logs):
+    reference = pd.read_parquet(f"{raw_logs}/sessions")
+    analysis = Analysis.from_raw_logs(raw_logs)
+    assert len(analysis.df) == len(reference)
+    assert set(analysis.df["session_key"].astype(str)) == set(reference["session_key"].astype(str))
+
+
+def test_raw_logs_session_counts_match_reference(raw_logs):
+    expected = Analysis(pd.read_parquet(f"{raw_logs}/sessions"))
+    actual = Analysis.from_raw_logs(raw_logs)
+    for analysis in (expected, actual):
+        analysis.verbose = False
+        analysis.preprocess()
+    expected_counts = expected.aggregate("user_session_counts")
+    actual_counts = actual.aggregate("user_session_counts")
+    expected_counts.index = expected_counts.index.astype(str)
+    actual_counts.index = actual_counts.index.astype(str)
+    assert actual_counts.sort_index().to_dict() == expected_counts.sort_index().to_dict()
+    assert np.array_equal(
+        actual.figure_payload("session_frequency").counts, expected.figure_payload("session_frequency").counts
+    )
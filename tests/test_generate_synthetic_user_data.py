@@ -0,0 +1,11 @@
+import pytest
+
+from generate_synthetic_user_data import generate_fake_dataset
+
+
+@pytest.mark.parametrize("options", [{"batch_users": 10}, {"num_shards": 2}, {"batch_users": 10, "num_shards": 2}])
+def test_faker_engine_rejects_batching_and_sharding(tmp_path, options):
+    output_path = tmp_path / "sessions.csv"
+    with pytest.raises(ValueError, match="NumPy engine"):
+        generate_fake_dataset(total_users=20, output_path=str(output_path), vectorized=False, **options)
+    assert not output_path.exists()
@@ -0,0 +1,31 @@
+import pickle
+
+import pytest
+
+from report_cache import ReportCache
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [
+        b"",
+        b"not a pickle",
+        pickle.dumps({"rows": 1})[:-3],
+        # Entries naming a module or class that no longer exists
+        b"cgone_module\nEntry\n.",
+        b"cbuiltins\nMissing\n.",
+    ],
+)
+def test_unreadable_entry_is_a_miss_and_removed(tmp_path, payload):
+    cache = ReportCache(str(tmp_path))
+    path = cache.entry_path("key")
+    with open(path, "wb") as f:
+        f.write(payload)
+    assert cache.load("key") is None
+    assert not (tmp_path / "key.pkl").exists()
+
+
+def test_stored_entry_round_trips(tmp_path):
+    cache = ReportCache(str(tmp_path))
+    cache.store("key", {"rows": 3, "fragments": {"a": "<div/>"}})
+    assert cache.load("key") == {"rows": 3, "fragments": {"a": "<div/>"}}
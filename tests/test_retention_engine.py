@@ -0,0 +1,146 @@
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from retention_engine import PERIOD_DAYS, ActivityBitsets, kaplan_meier_curves, merge_activity_bitsets
+
+
+def brute_force_kaplan_meier(durations, inactive_days, threshold):
+    # Product-limit estimate evaluated at every distinct duration, one user at a time
+    rows, survival = [], 1.0
+    timeline = sorted(set(durations))
+    if timeline[0] > 0:
+        rows.append((0, len(durations), 0, 1.0))
+    for t in timeline:
+        at_risk = sum(1 for d in durations if d >= t)
+        events = sum(1 for d, idle in zip(durations, inactive_days) if d == t and idle >= threshold)
+        survival *= 1.0 - events / at_risk
+        rows.append((t, at_risk, events, survival))
+    return pd.DataFrame(rows, columns=["timeline", "at_risk", "events", "survival"])
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_kaplan_meier_matches_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    # Few distinct durations so ties are common; inactive days straddle the thresholds so
+    # every curve mixes events and censored users
+    durations = rng.integers(1, 25, size=300)
+    inactive_days = rng.integers(0, 100, size=300)
+    strata = rng.choice(["a", "b", "c"], size=300)
+    thresholds = [30, 15, 60, 90]
+    curves = kaplan_meier_curves(durations, inactive_days, thresholds, strata=strata)
+    assert list(curves["threshold"].cat.categories) == thresholds
+    for stratum in ["a", "b", "c"]:
+        in_stratum = strata == stratum
+        for threshold in thresholds:
+            actual = curves[(curves["stratum"] == stratum) & (curves["threshold"] == threshold)]
+            expected = brute_force_kaplan_meier(
+                list(durations[in_stratum]), list(inactive_days[in_stratum]), threshold
+            )
+            assert actual["timeline"].tolist() == expected["timeline"].tolist()
+            assert actual["at_risk"].tolist() == expected["at_risk"].tolist()
+            assert actual["events"].tolist() == expected["events"].tolist()
+            assert np.allclose(actual["survival"].to_numpy(), expected["survival"].to_numpy())
+
+
+def test_kaplan_meier_censoring_and_ties_by_hand():
+    # Two users churn at day 5 (a tie), one is censored at day 5, one churns at day 10
+    curves = kaplan_meier_curves([5, 5, 5, 10, 12], [40, 31, 2, 50, 0], [30])
+    assert curves["timeline"].tolist() == [0, 5, 10, 12]
+    assert curves["at_risk"].tolist() == [5, 5, 2, 1]
+    assert curves["events"].tolist() == [0, 2, 1, 0]
+    assert np.allclose(curves["survival"].to_numpy(), [1.0, 0.6, 0.3, 0.3])
+
+
+def test_kaplan_meier_without_strata_has_one_curve_per_threshold():
+    curves = kaplan_meier_curves([0, 3, 3], [20, 0, 45], [15, 45])
+    assert curves["stratum"].isna().all()
+    assert curves.groupby("threshold", observed=True).size().tolist() == [2, 2]
+    expected = brute_force_kaplan_meier([0, 3, 3], [20, 0, 45], 45)
+    assert np.allclose(curves[curves["threshold"] == 45]["survival"].to_numpy(), expected["survival"].to_numpy())
+
+
+def brute_force_retention_counts(sessions, period, cohort, max_periods):
+    # Per-user sets of active periods from calendar arithmetic, counted cohort by cohort
+    def offset(later, earlier):
+        if period == "month":
+            return (later.year - earlier.year) * 12 + later.month - earlier.month
+        return (later.date() - earlier.date()).days // PERIOD_DAYS[period]
+
+    users = {}
+    for user_key, group_code, registered, day in sessions[
+        ["user_key", "group_code", "registration_date", "session_day"]
+    ].itertuples(index=False):
+        label = str(group_code) if cohort == "group_code" else f"{registered.year:04d}-{registered.month:02d}"
+        users.setdefault(user_key, (label, registered, set()))[2].add(offset(day, registered))
+    observation_end = sessions["session_day"].max()
+    labels = sorted({label for label, _, _ in users.values()})
+    active = {label: [0] * max_periods for label in labels}
+    eligible = {label: [0] * max_periods for label in labels}
+    for label, registered, periods in users.values():
+        for k in periods:
+            if 0 <= k < max_periods:
+                active[label][k] += 1
+        for k in range(min(offset(observation_end, registered) + 1, max_periods)):
+            eligible[label][k] += 1
+    active = pd.DataFrame.from_dict(active, orient="index")
+    eligible = pd.DataFrame.from_dict(eligible, orient="index")
+    return active, eligible
+
+
+@pytest.mark.parametrize("period,max_periods", [("day", 500), ("week", 80), ("month", 20)])
+@pytest.mark.parametrize("cohort", ["group_code", "registration_month"])
+def test_activity_bitsets_counts_match_brute_force(sessions, period, max_periods, cohort):
+    bitsets = ActivityBitsets.from_sessions(
+        sessions["user_key"],
+        sessions["group_code"],
+        sessions["registration_date"],
+        sessions["session_day"],
+        period=period,
+        max_periods=max_periods,
+    )
+    # A small block size so the popcount runs over several blocks of users
+    active, eligible = bitsets.retention_counts(cohort, block_bytes=997)
+    expected_active, expected_eligible = brute_force_retention_counts(sessions, period, cohort, max_periods)
+    assert active.index.tolist() == expected_active.index.tolist()
+    assert np.array_equal(active.to_numpy(), expected_active.to_numpy())
+    assert np.array_equal(eligible.to_numpy(), expected_eligible.to_numpy())
+
+
+@pytest.mark.parametrize("period", ["day", "week", "month"])
+def test_activity_bitsets_merge_of_chunks_equals_single_pass(sessions, period):
+    columns = ["user_key", "group_code", "registration_date", "session_day"]
+    whole = ActivityBitsets.from_sessions(*(sessions[col] for col in columns), period=period)
+    # Row chunks in shuffled order, so most users span several chunks
+    shuffled = sessions.sample(frac=1.0, random_state=5)
+    merged = None
+    for start in range(0, len(shuffled), 1600):
+        chunk = shuffled.iloc[start:start + 1600]
+        part = ActivityBitsets.from_sessions(*(chunk[col] for col in columns), period=period)
+        merged = part if merged is None else merge_activity_bitsets(merged, part)
+    assert len(merged) == len(whole)
+    assert merged.observation_end == whole.observation_end
+    order = merged.user_keys.get_indexer(whole.user_keys)
+    assert np.array_equal(merged.bits[order], whole.bits)
+    assert np.array_equal(merged.registration_date[order], whole.registration_date)
+    for expected, actual in zip(whole.retention_counts(), merged.retention_counts()):
+        pd.testing.assert_frame_equal(actual, expected)
+
+
+def test_activity_bitsets_merge_grows_in_place(sessions):
+    columns = ["user_key", "group_code", "registration_date", "session_day"]
+    halves = [sessions.iloc[: len(sessions) // 2], sessions.iloc[len(sessions) // 2 - 100 :]]
+    running = ActivityBitsets.from_sessions(*(halves[0][col] for col in columns))
+    # A pickled table (as in the report cache) rebuilds its key index on the next merge
+    running = pickle.loads(pickle.dumps(running))
+    assert running.rows is None
+    first_segment = running.segments[0][3]
+    merged = merge_activity_bitsets(running, ActivityBitsets.from_sessions(*(halves[1][col] for col in columns)))
+    # Returning users are OR-ed into the existing segment, new users become one more segment
+    assert merged is running
+    assert merged.segments[0][3] is first_segment
+    assert len(merged.segments) == 2
+    whole = ActivityBitsets.from_sessions(*(sessions[col] for col in columns))
+    assert np.array_equal(merged.bits[merged.user_keys.get_indexer(whole.user_keys)], whole.bits)
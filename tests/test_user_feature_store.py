@@ -0,0 +1,70 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analyze_user_behavior_and_generate_report import Analysis
+from user_feature_store import UserFeatureStore, summarize_sessions
+
+pytest.importorskip("pyarrow")
+
+
+@pytest.fixture(scope="module")
+def expected(sessions):
+    analysis = Analysis(sessions.copy())
+    analysis.verbose = False
+    analysis.normalize_schema()
+    return analysis.df["session_key"].nunique(), summarize_sessions(analysis.df, analysis.feature_columns), analysis.feature_columns
+
+
+def update(path, batch):
+    # One daily run: a fresh Analysis over the batch as loaded
+    analysis = Analysis(batch.copy())
+    analysis.verbose = False
+    return analysis.update_feature_store(path)
+
+
+def test_upsert_of_separate_batches_matches_single_summary(sessions, expected, tmp_path):
+    path = str(tmp_path / "user_features.parquet")
+    # Arrival order unrelated to start time, as with late-arriving sessions
+    shuffled = sessions.sample(frac=1.0, random_state=3)
+    first, second = shuffled.iloc[: len(shuffled) // 2], shuffled.iloc[len(shuffled) // 2 :]
+    update(path, first)
+    update(path, second)
+    # Replaying a batch leaves the totals unchanged
+    update(path, first)
+    features, metadata = UserFeatureStore(path).load()
+    n_sessions, summary, feature_columns = expected
+    assert metadata["applied_sessions"] == n_sessions
+    features = features.loc[summary.index]
+    for col in ["session_count", "duration_sum", "first_session_duration", "lifetime_days"] + feature_columns:
+        assert np.array_equal(features[col].to_numpy(np.int64), summary[col].to_numpy(np.int64)), col
+    for col in ["first_session_start", "last_session_start", "last_session_day", "registration_date"]:
+        assert (pd.to_datetime(features[col]) == pd.to_datetime(summary[col])).all(), col
+
+
+def test_update_after_preprocess_is_rejected(sessions, tmp_path):
+    analysis = Analysis(sessions.copy())
+    analysis.verbose = False
+    analysis.preprocess()
+    with pytest.raises(ValueError, match="before preprocess"):
+        analysis.update_feature_store(str(tmp_path / "user_features.parquet"))
+
+
+def test_upsert_rewrites_only_the_days_in_the_batch(sessions, tmp_path):
+    path = str(tmp_path / "user_features.parquet")
+    day = sessions["session_start_time"].dt.normalize()
+    last_day = day.max()
+    update(path, sessions[day < last_day])
+    store = UserFeatureStore(path)
+    partitions = {name: os.stat(os.path.join(store.sessions_dir, name)).st_mtime_ns for name in os.listdir(store.sessions_dir)}
+    assert len(partitions) == day[day < last_day].nunique()
+    update(path, sessions[day == last_day])
+    touched = {
+        name
+        for name in os.listdir(store.sessions_dir)
+        if partitions.get(name) != os.stat(os.path.join(store.sessions_dir, name)).st_mtime_ns
+    }
+    assert touched == {f"{last_day:%Y-%m-%d}.parquet"}
+    assert store.load()[1]["applied_sessions"] == len(sessions)
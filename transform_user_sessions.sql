@@ -36,7 +36,7 @@ logs_filtered AS (
     FROM
         interaction_logs
     WHERE 
-        urrent_url LIKE 'https://simulation.Banksyde.io/%'
+        current_url LIKE 'https://simulation.Banksyde.io/%'
     AND
         current_url != 'https://simulation.Banksyde.io/'
 ),
@@ -0,0 +1,187 @@
+WITH user_summary AS (
+    SELECT DISTINCT
+        user_keys.session_key AS session_key,
+        user_keys.user_key AS user_key,
+        group_members.group_code AS group_code,
+        users.created_at AS registration_timestamp,
+        JSONExtractString(users.properties, '$device_type') AS user_platform
+    FROM
+        user_keys
+    FULL OUTER JOIN
+        users
+    ON
+        user_keys.user_key = users.id
+    FULL OUTER JOIN
+        group_members
+    ON
+        user_keys.user_key = group_members.user_key
+    WHERE
+        group_code IS NOT NULL
+    ORDER BY
+        registration_timestamp ASC
+),
+
+filtered_interactions AS (
+    SELECT DISTINCT
+        interactions.user_key AS user_key,
+        interactions.`$session_id` AS interaction_id,
+        JSONExtractString(interactions.properties, '$device_type') AS event_platform
+    FROM interactions
+),
+
+task_lookup AS (
+    SELECT 'after-school-plans' AS task, 1 AS column_id
+    UNION ALL SELECT 'bank-accounts', 2
+    UNION ALL SELECT 'banking-module', 3
+    UNION ALL SELECT 'budget', 4
+    UNION ALL SELECT 'budgeting-module', 5
+    UNION ALL SELECT 'content-library', 6
+    UNION ALL SELECT 'content-library/banking', 7
+    UNION ALL SELECT 'content-library/budgeting', 8
+    UNION ALL SELECT 'content-library/investing', 9
+    UNION ALL SELECT 'credit-module', 10
+    UNION ALL SELECT 'dashboard', 11
+    UNION ALL SELECT 'goals', 12
+    UNION ALL SELECT 'goals-module', 13
+    UNION ALL SELECT 'internship-application', 14
+    UNION ALL SELECT 'investing-module', 15
+    UNION ALL SELECT 'login', 16
+    UNION ALL SELECT 'onboarding-basic-info', 17
+    UNION ALL SELECT 'onboarding-create-avatar', 18
+    UNION ALL SELECT 'onboarding-hobbies', 19
+    UNION ALL SELECT 'onboarding-questions', 20
+    UNION ALL SELECT 'q-and-a', 21
+    UNION ALL SELECT 'saving-habits', 22
+    UNION ALL SELECT 'settings', 23
+    UNION ALL SELECT 'signup', 24
+    UNION ALL SELECT 'summer-job-module', 25
+    UNION ALL SELECT 'taxes-module', 26
+    UNION ALL SELECT 'tuition-and-fees', 27
+),
+
+logs_filtered AS (
+    SELECT
+        interaction_id,
+        TRIM(REPLACE(current_url, 'https://simulation.Banksyde.io/', '')) AS task
+    FROM
+        interaction_logs
+    WHERE 
+        current_url LIKE 'https://simulation.Banksyde.io/%'
+    AND
+        current_url != 'https://simulation.Banksyde.io/'
+),
+
+pivoted_logs AS (
+    SELECT
+        logs_filtered.interaction_id AS interaction_id,
+        COUNT(IF(column_id = 1, 1, NULL)) AS plans_count,
+        COUNT(IF(column_id = 2, 1, NULL)) AS accounts_count,
+        COUNT(IF(column_id = 3, 1, NULL)) AS banking_usage,
+        COUNT(IF(column_id = 4, 1, NULL)) AS budgets_created,
+        COUNT(IF(column_id = 5, 1, NULL)) AS budgeting_usage,
+        COUNT(IF(column_id = 6, 1, NULL)) AS library_views,
+        COUNT(IF(column_id = 7, 1, NULL)) AS library_banking_views,
+        COUNT(IF(column_id = 8, 1, NULL)) AS library_budgeting_views,
+        COUNT(IF(column_id = 9, 1, NULL)) AS library_investing_views,
+        COUNT(IF(column_id = 10, 1, NULL)) AS credit_usage,
+        COUNT(IF(column_id = 11, 1, NULL)) AS dashboard_visits,
+        COUNT(IF(column_id = 12, 1, NULL)) AS goals_created,
+        COUNT(IF(column_id = 13, 1, NULL)) AS goal_module_usage,
+        COUNT(IF(column_id = 14, 1, NULL)) AS internship_submissions,
+        COUNT(IF(column_id = 15, 1, NULL)) AS investing_usage,
+        COUNT(IF(column_id = 16, 1, NULL)) AS logins,
+        COUNT(IF(column_id = 17, 1, NULL)) AS onboarding_info_completed,
+        COUNT(IF(column_id = 18, 1, NULL)) AS onboarding_avatar_done,
+        COUNT(IF(column_id = 19, 1, NULL)) AS onboarding_hobbies_set,
+        COUNT(IF(column_id = 20, 1, NULL)) AS onboarding_questions_answered,
+        COUNT(IF(column_id = 21, 1, NULL)) AS qa_interactions,
+        COUNT(IF(column_id = 22, 1, NULL)) AS saving_entries,
+        COUNT(IF(column_id = 23, 1, NULL)) AS settings_visits,
+        COUNT(IF(column_id = 24, 1, NULL)) AS signups,
+        COUNT(IF(column_id = 25, 1, NULL)) AS summerjob_usage,
+        COUNT(IF(column_id = 26, 1, NULL)) AS tax_module_usage,
+        COUNT(IF(column_id = 27, 1, NULL)) AS tuition_fees_recorded
+    FROM
+        logs_filtered
+    INNER JOIN
+        task_lookup
+    ON
+        logs_filtered.task = task_lookup.task
+    GROUP BY
+        logs_filtered.interaction_id
+),
+
+session_times AS (
+    SELECT DISTINCT
+        session_data.interaction_id AS interaction_id,
+        session_data.$start_timestamp AS session_start_time,
+        session_data.$end_timestamp AS session_end_time
+    FROM
+        session_data
+    WHERE
+        session_data.$session_duration > 0
+    ORDER BY
+        session_start_time ASC
+),
+
+final_user_details AS (
+    SELECT DISTINCT
+        user_summary.session_key AS session_key,
+        user_summary.user_key AS user_key,
+        user_summary.group_code AS group_code,
+        filtered_interactions.interaction_id AS interaction_id,
+        user_summary.user_platform AS user_platform,
+        filtered_interactions.event_platform AS event_platform,
+        formatDateTime(user_summary.registration_timestamp, '%D') AS registration_date,
+        session_times.session_start_time AS session_start_time,
+        session_times.session_end_time AS session_end_time,
+        formatDateTime(session_start_time, '%D') AS session_day,
+        dateDiff('minute', session_start_time, session_times.session_end_time) AS duration_mins,
+        pivoted_logs.plans_count,
+        pivoted_logs.accounts_count,
+        pivoted_logs.banking_usage,
+        pivoted_logs.budgets_created,
+        pivoted_logs.budgeting_usage,
+        pivoted_logs.library_views,
+        pivoted_logs.library_banking_views,
+        pivoted_logs.library_budgeting_views,
+        pivoted_logs.library_investing_views,
+        pivoted_logs.credit_usage,
+        pivoted_logs.dashboard_visits,
+        pivoted_logs.goals_created,
+        pivoted_logs.goal_module_usage,
+        pivoted_logs.internship_submissions,
+        pivoted_logs.investing_usage,
+        pivoted_logs.logins,
+        pivoted_logs.onboarding_info_completed,
+        pivoted_logs.onboarding_avatar_done,
+        pivoted_logs.onboarding_hobbies_set,
+        pivoted_logs.onboarding_questions_answered,
+        pivoted_logs.qa_interactions,
+        pivoted_logs.saving_entries,
+        pivoted_logs.settings_visits,
+        pivoted_logs.signups,
+        pivoted_logs.summerjob_usage,
+        pivoted_logs.tax_module_usage,
+        pivoted_logs.tuition_fees_recorded
+    FROM
+        filtered_interactions
+    LEFT JOIN
+        user_summary
+    ON
+        filtered_interactions.user_key = user_summary.user_key
+    FULL OUTER JOIN
+        pivoted_logs
+    ON
+        pivoted_logs.interaction_id = filtered_interactions.interaction_id
+    INNER JOIN
+        session_times
+    ON
+        session_times.interaction_id = filtered_interactions.interaction_id
+    WHERE
+        dateDiff('day', user_summary.registration_timestamp, session_times.session_start_time) >= 0
+)
+
+
+SELECT * FROM final_user_details
+
@@ -0,0 +1,212 @@
+import json
+import os
+import time
+import numpy as np
+import pandas as pd
+
+STORE_METADATA_KEY = b"user_feature_store"
+# Session columns a summary is built from, besides the feature counters
+SESSION_COLUMNS = [
+    "user_key",
+    "group_code",
+    "session_key",
+    "registration_date",
+    "session_day",
+    "session_start_time",
+    "duration_mins",
+]
+# Analysis base aggregates that can be read off the feature table instead of session rows
+USER_FEATURE_AGGREGATES = ["cohort_users", "user_session_counts", "first_sessions", "user_lifetimes"]
+
+
+def summarize_sessions(sessions, feature_columns):
+    # One row per user_key from normalized session rows (Analysis.normalize_schema output):
+    # first and last session, session count, duration sum, the first session's duration for
+    # first-vs-later splits, lifetime in days for churn, and per-feature totals.
+    missing = [col for col in SESSION_COLUMNS + list(feature_columns) if col not in sessions]
+    if missing:
+        raise ValueError(f"session rows are missing columns {missing}")
+    grouped = sessions.groupby("user_key", observed=True, sort=False)
+    summary = grouped.agg(
+        group_code=("group_code", "first"),
+        registration_date=("registration_date", "min"),
+        first_session_start=("session_start_time", "min"),
+        last_session_start=("session_start_time", "max"),
+        last_session_day=("session_day", "max"),
+        session_count=("session_key", "nunique"),
+        duration_sum=("duration_mins", "sum"),
+    )
+    first_sessions = (
+        sessions[["user_key", "session_start_time", "duration_mins"]]
+        .sort_values("session_start_time", kind="stable")
+        .drop_duplicates(subset="user_key")
+        .set_index("user_key")
+    )
+    summary["first_session_duration"] = first_sessions["duration_mins"].reindex(summary.index)
+    summary = summary.join(grouped[list(feature_columns)].sum())
+    summary.index = summary.index.astype(str)
+    return compact_user_features(summary, feature_columns)
+
+
+def compact_user_features(features, feature_columns):
+    # Counters and sums as uint32 (int64 where they outgrow it), group_code as a category
+    features["group_code"] = features["group_code"].astype(str).astype("category")
+    for col in ["session_count", "duration_sum", "first_session_duration"] + list(feature_columns):
+        values = features[col].to_numpy()
+        fits = len(values) == 0 or (values.min() >= 0 and values.max() <= np.iinfo(np.uint32).max)
+        features[col] = values.astype(np.uint32 if fits else np.int64)
+    features["lifetime_days"] = (
+        (features["last_session_day"] - features["registration_date"]).dt.days.astype(np.int32)
+    )
+    return features.rename_axis("user_key")
+
+
+def merge_user_features(stored, new, feature_columns):
+    # Upsert of per-user summaries for the same users (rows aligned on user_key): totals add up,
+    # first/last session take the earlier/later side and the first session's duration follows
+    # whichever side holds the earlier first session.
+    new = new.reindex(stored.index)
+    merged = stored.copy()
+    earlier = new["first_session_start"] < stored["first_session_start"]
+    merged["first_session_start"] = stored["first_session_start"].where(~earlier, new["first_session_start"])
+    merged["first_session_duration"] = stored["first_session_duration"].where(~earlier, new["first_session_duration"])
+    merged["registration_date"] = np.minimum(stored["registration_date"], new["registration_date"])
+    merged["last_session_start"] = np.maximum(stored["last_session_start"], new["last_session_start"])
+    merged["last_session_day"] = np.maximum(stored["last_session_day"], new["last_session_day"])
+    for col in ["session_count", "duration_sum"] + list(feature_columns):
+        merged[col] = stored[col].astype(np.int64) + new[col].astype(np.int64)
+    return merged
+
+
+def user_feature_aggregates(features):
+    # The per-user base aggregates Analysis would build from session rows, in the same shapes
+    user_key = features.index.to_series().astype("category")
+    return {
+        "cohort_users": pd.DataFrame(
+            {"group_code": features["group_code"].to_numpy(), "user_key": user_key.to_numpy()}
+        ),
+        "user_session_counts": features["session_count"].rename("session_key"),
+        "first_sessions": pd.DataFrame(
+            {
+                "user_key": user_key.to_numpy(),
+                "session_start_time": features["first_session_start"].to_numpy(),
+                "duration_mins": features["first_session_duration"].to_numpy(),
+            }
+        ),
+        "user_lifetimes": features[["group_code", "registration_date", "last_session_day"]],
+    }
+
+
+class UserFeatureStore():
+    # A user-keyed summary table in one Parquet file. upsert folds newly arrived session rows
+    # into it: returning users are merged in place, new users are appended. Applied session
+    # keys are kept in a <store>.sessions/ folder with one Parquet file per session start
+    # day, and rows already applied are skipped, so replaying a batch does not double count
+    # whatever order batches arrive in. An upsert reads and rewrites only the days its batch
+    # covers, so a daily update does not touch the rest of the session history.
+    def __init__(self, path):
+        self.path = path
+        self.sessions_dir = f"{os.path.splitext(path)[0]}.sessions"
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def load(self):
+        # Returns (features, metadata); no table and no feature columns if nothing is stored yet
+        import pyarrow.parquet as pq
+
+        if not self.exists():
+            return None, {"feature_columns": None, "applied_sessions": 0}
+        table = pq.read_table(self.path)
+        metadata = json.loads((table.schema.metadata or {}).get(STORE_METADATA_KEY, b"{}"))
+        features = table.to_pandas()
+        if "user_key" in features:
+            features = features.set_index("user_key")
+        return features, metadata
+
+    def day_path(self, day):
+        return os.path.join(self.sessions_dir, f"{day}.parquet")
+
+    def applied_session_keys(self, day):
+        # session_key values already applied for sessions that started on day (YYYY-MM-DD)
+        import pyarrow.parquet as pq
+
+        path = self.day_path(day)
+        if not os.path.exists(path):
+            return pd.Index([], dtype=object)
+        return pd.Index(pq.read_table(path).column("session_key").to_pandas())
+
+    def write(self, features, metadata, day_keys):
+        # day_keys maps each touched start day to all of its applied session keys
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.Table.from_pandas(features, preserve_index=True)
+        table = table.replace_schema_metadata(
+            {**(table.schema.metadata or {}), STORE_METADATA_KEY: json.dumps(metadata).encode("UTF-8")}
+        )
+        # Every file is written aside first, then swapped in
+        os.makedirs(self.sessions_dir, exist_ok=True)
+        pq.write_table(table, f"{self.path}.tmp")
+        for day, keys in day_keys.items():
+            pq.write_table(pa.table({"session_key": pa.array(keys, type=pa.string())}), f"{self.day_path(day)}.tmp")
+        os.replace(f"{self.path}.tmp", self.path)
+        for day in day_keys:
+            os.replace(f"{self.day_path(day)}.tmp", self.day_path(day))
+
+    def upsert(self, sessions, feature_columns, session_keys=None):
+        # session_keys identify the rows across batches (sessions["session_key"] by default);
+        # pass the original keys when session_key holds per-batch ids
+        started = time.perf_counter()
+        stored, metadata = self.load()
+        feature_columns = list(feature_columns)
+        if metadata["feature_columns"] is not None and metadata["feature_columns"] != feature_columns:
+            raise ValueError(
+                f"{self.path} holds totals for {metadata['feature_columns']}, not {feature_columns}"
+            )
+        keys = sessions["session_key"] if session_keys is None else session_keys
+        session_keys = pd.Series(np.asarray(keys), index=sessions.index).astype(str)
+        days = pd.Series(
+            np.datetime_as_string(sessions["session_start_time"].to_numpy().astype("datetime64[D]")),
+            index=sessions.index,
+        )
+        # A session's start day never changes, so its key can only have been applied that day
+        applied = {
+            day: self.applied_session_keys(day) if stored is not None else pd.Index([], dtype=object)
+            for day in days.unique()
+        }
+        replayed = np.zeros(len(sessions), dtype=bool)
+        for day, rows in days.groupby(days, sort=False).indices.items():
+            replayed[rows] = session_keys.iloc[rows].isin(applied[day]).to_numpy()
+        if replayed.any():
+            sessions = sessions[~replayed]
+            session_keys = session_keys[~replayed]
+            days = days[~replayed]
+            print(f"[INFO] {time.ctime()} | Skipped {int(replayed.sum()):,} sessions already applied to {self.path}")
+        if sessions.empty:
+            return stored
+        new = summarize_sessions(sessions, feature_columns)
+        if stored is None:
+            features = new
+            returning = 0
+        else:
+            is_returning = new.index.isin(stored.index)
+            returning = int(is_returning.sum())
+            if returning:
+                merged = merge_user_features(stored.loc[new.index[is_returning]], new[is_returning], feature_columns)
+                stored = stored.drop(index=merged.index)
+                features = pd.concat([stored, merged, new[~is_returning]])
+            else:
+                features = pd.concat([stored, new])
+            features = compact_user_features(features, feature_columns)
+        day_keys = {
+            day: applied[day].append(pd.Index(keys.unique())).to_numpy()
+            for day, keys in session_keys.groupby(days, sort=False)
+        }
+        new_sessions = sum(len(keys) - len(applied[day]) for day, keys in day_keys.items())
+        metadata = {"feature_columns": feature_columns, "applied_sessions": metadata.get("applied_sessions", 0) + new_sessions}
+        self.write(features, metadata, day_keys)
+        print(
+            f"[INFO] {time.ctime()} | User feature store {self.path}: {len(sessions):,} sessions -> {returning:,} returning and {len(new) - returning:,} new users ({len(features):,} total) in {time.perf_counter() - started:.2f}s"
+        )
+        return features
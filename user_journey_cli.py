@@ -0,0 +1,265 @@
+# pip3 install pandas numpy pyarrow
+
+import os
+import sys
+import time
+import argparse
+from typing import Dict, List, Optional
+
+# Heavy modules (Faker, seaborn, matplotlib, plotly) are imported by the commands that need
+# them; the analysis module itself only pulls in a plotting library when a figure using it renders.
+
+# Column names of a CSV header, Parquet schema or Arrow file without reading any rows
+def input_columns(path:str)->List[str]:
+    from analyze_user_behavior_and_generate_report import COLUMNAR_FORMATS
+    input_format:str = COLUMNAR_FORMATS.get(os.path.splitext(path)[1].lower(), "csv")
+    if input_format == "csv":
+        import pandas as pd
+        return list(pd.read_csv(path, nrows=0).columns)
+    if input_format == "parquet":
+        import pyarrow.parquet as pq
+        return list(pq.read_schema(path).names)
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+    return list(ipc.open_file(pa.memory_map(path)).schema.names)
+
+# Generate a synthetic session dataset
+def command_generate(args:argparse.Namespace)->int:
+    from generate_synthetic_user_data import generate_fake_dataset
+    try:
+        generate_fake_dataset(
+            total_users=args.users,
+            max_cohort_groups=args.groups,
+            maximum_session_per_user=args.max_sessions,
+            output_path=args.output,
+            vectorized=args.engine == "numpy",
+            seed=args.seed,
+            batch_users=args.batch_users,
+            num_shards=args.shards,
+            max_workers=args.workers,
+        )
+    except ValueError as error:
+        print(f"[ERROR] {time.ctime()} | {error}", file=sys.stderr)
+        return 2
+    return 0
+
+# Generate the raw upstream tables that transform_user_sessions.sql reads
+def command_generate_logs(args:argparse.Namespace)->int:
+    from generate_synthetic_event_logs import generate_event_logs
+    generate_event_logs(
+        total_users=args.users,
+        max_cohort_groups=args.groups,
+        maximum_session_per_user=args.max_sessions,
+        output_dir=args.output_dir,
+        seed=args.seed,
+        batch_users=args.batch_users,
+        num_shards=args.shards,
+        max_workers=args.workers,
+        bounce_rate=args.bounce_rate,
+        write_sessions=args.with_sessions,
+    )
+    return 0
+
+# List the figures that --figures accepts
+def command_figures(args:argparse.Namespace)->int:
+    from analyze_user_behavior_and_generate_report import FIGURE_SPECS
+    for spec in FIGURE_SPECS.values():
+        print(f"{spec.name:<35} {spec.title}")
+    return 0
+
+# Run the session SQL on DuckDB over raw tables, print stage timings and optionally save the result
+def command_sql(args:argparse.Namespace)->int:
+    from local_sql_engine import run_session_sql
+    sessions = run_session_sql(args.raw_dir, sql_path=args.sql, profile_path=args.duckdb_profile, threads=args.threads)
+    if args.output:
+        if args.output.endswith((".parquet", ".pq")):
+            sessions.to_parquet(args.output, index=False)
+        else:
+            sessions.to_csv(args.output, index=False)
+        print(f"[INFO] {time.ctime()} | Session table written to {args.output}")
+    return 0
+
+# Upsert a batch of newly arrived sessions into the user-keyed feature store
+def command_update_features(args:argparse.Namespace)->int:
+    from analyze_user_behavior_and_generate_report import Analysis
+    if not os.path.exists(args.input):
+        print(f"[ERROR] {time.ctime()} | input not found: {args.input}", file=sys.stderr)
+        return 2
+    analysis = Analysis(args.input)
+    analysis.verbose = False
+    try:
+        analysis.update_feature_store(args.store)
+    except ValueError as error:
+        print(f"[ERROR] {time.ctime()} | {error}", file=sys.stderr)
+        return 2
+    return 0
+
+# Build the HTML report, or with --dry-run only validate the input and print the plan
+def command_report(args:argparse.Namespace)->int:
+    from analyze_user_behavior_and_generate_report import Analysis, FIGURE_SPECS
+    if not os.path.exists(args.input):
+        print(f"[ERROR] {time.ctime()} | input not found: {args.input}", file=sys.stderr)
+        return 2
+    figures:Optional[List[str]] = args.figures
+    unknown:List[str] = sorted(set(figures or []) - set(FIGURE_SPECS))
+    if unknown:
+        print(f"[ERROR] {time.ctime()} | unknown figures {unknown}; run the figures command for the list", file=sys.stderr)
+        return 2
+    if args.feature_store:
+        return report_from_feature_store(args, figures)
+    if os.path.isdir(args.input):
+        return report_from_raw_logs(args, figures)
+    if args.dry_run:
+        # A path plus chunk_rows only records the source, so no rows are read here
+        probe = Analysis(args.input, churn_thresholds=args.thresholds, chunk_rows=args.chunk_rows or 1, figures=figures)
+        missing:List[str] = sorted(set(probe.columns) - set(input_columns(args.input)))
+        if missing:
+            print(f"[ERROR] {time.ctime()} | {args.input} is missing columns: {missing}", file=sys.stderr)
+            return 2
+        selected:List[str] = [name for name in FIGURE_SPECS if figures is None or name in figures]
+        mode:str = f"out-of-core, {args.chunk_rows:,} rows per chunk" if args.chunk_rows else "in memory"
+        print(f"[INFO] {time.ctime()} | dry run: {args.input} ({mode}), {len(selected)} figures from {len(probe.columns)} columns -> {args.output or 'Report_<timestamp>.html'}")
+        for name in selected:
+            print(f"[INFO] {time.ctime()} |   {name}")
+        return 0
+    analysis = Analysis(args.input, churn_thresholds=args.thresholds, chunk_rows=args.chunk_rows, figures=figures)
+    return run_report(analysis, args)
+
+# Input directory of raw event tables: run transform_user_sessions.sql on DuckDB and hand the
+# session table to Analysis in memory
+def report_from_raw_logs(args:argparse.Namespace, figures:Optional[List[str]])->int:
+    from analyze_user_behavior_and_generate_report import Analysis
+    from local_sql_engine import raw_table_sources
+    if args.chunk_rows:
+        print(f"[ERROR] {time.ctime()} | --chunk-rows needs a session file, not a raw table directory", file=sys.stderr)
+        return 2
+    try:
+        sources:Dict[str, str] = raw_table_sources(args.input)
+    except FileNotFoundError as error:
+        print(f"[ERROR] {time.ctime()} | {error}", file=sys.stderr)
+        return 2
+    if args.dry_run:
+        print(f"[INFO] {time.ctime()} | dry run: raw tables in {args.input} -> transform_user_sessions.sql on DuckDB -> {args.output or 'Report_<timestamp>.html'}")
+        for table, source in sources.items():
+            print(f"[INFO] {time.ctime()} |   {table}: {source}")
+        return 0
+    report_path:str = args.output or f"Report_{time.strftime('%Y%m%d_%H%M%S')}.html"
+    profile_path:Optional[str] = f"{os.path.splitext(report_path)[0]}_duckdb_profile.json" if args.profile else None
+    analysis = Analysis.from_raw_logs(args.input, churn_thresholds=args.thresholds, figures=figures, profile_path=profile_path)
+    args.output = report_path
+    return run_report(analysis, args)
+
+# Input is a user feature store: draw the per-user figures from its compact rows
+def report_from_feature_store(args:argparse.Namespace, figures:Optional[List[str]])->int:
+    from analyze_user_behavior_and_generate_report import Analysis
+    if args.chunk_rows or args.cache_dir:
+        print(f"[ERROR] {time.ctime()} | --chunk-rows and --cache-dir need session rows, not a feature store", file=sys.stderr)
+        return 2
+    try:
+        analysis = Analysis.from_feature_store(args.input, churn_thresholds=args.thresholds, figures=figures)
+    except (ValueError, FileNotFoundError) as error:
+        print(f"[ERROR] {time.ctime()} | {error}", file=sys.stderr)
+        return 2
+    if args.dry_run:
+        print(f"[INFO] {time.ctime()} | dry run: feature store {args.input} ({len(analysis.user_features):,} users) -> {args.output or 'Report_<timestamp>.html'}")
+        for name in analysis.figures:
+            print(f"[INFO] {time.ctime()} |   {name}")
+        return 0
+    return run_report(analysis, args)
+
+# Apply the report options to an Analysis and build the report
+def run_report(analysis, args:argparse.Namespace)->int:
+    analysis.retention_period = args.retention_period
+    analysis.retention_cohort = args.retention_cohort
+    analysis.image_format = args.image_format
+    analysis.image_dpi = args.dpi
+    analysis.embed_images = not args.sidecar_images
+    analysis.plotlyjs = "inline" if args.inline_plotlyjs else "cdn"
+    analysis.lazy_figures = args.lazy
+    analysis.profile = args.profile
+    analysis.profile_appendix = args.profile
+    analysis.run(
+        parallel=args.workers > 1,
+        max_workers=args.workers,
+        cache_dir=args.cache_dir,
+        report_path=args.output,
+    )
+    print(f"[INFO] {time.ctime()} | Report written to {analysis.report_path}")
+    return 0
+
+# Argument parser for every subcommand
+def build_parser()->argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="user_journey_cli", description="Generate synthetic user journeys and build the EDA report")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate = commands.add_parser("generate", help="write a synthetic session dataset")
+    generate.add_argument("--output", default="synthetic_user_sessions.csv", help="output path; .parquet/.arrow write columnar files")
+    generate.add_argument("--users", type=int, default=3_000)
+    generate.add_argument("--groups", type=int, default=20)
+    generate.add_argument("--max-sessions", type=int, default=30)
+    generate.add_argument("--engine", choices=["numpy", "faker"], default="numpy")
+    generate.add_argument("--seed", type=int, default=123)
+    generate.add_argument("--batch-users", type=int, default=None, help="stream batches of this many users to disk (numpy engine only)")
+    generate.add_argument("--shards", type=int, default=None, help="split users across this many shard files (numpy engine only)")
+    generate.add_argument("--workers", type=int, default=None, help="processes for sharded generation")
+    generate.set_defaults(handler=command_generate)
+
+    logs = commands.add_parser("generate-logs", help="write raw event-log tables for the SQL transform")
+    logs.add_argument("output_dir", help="one folder of Parquet parts per table is written here")
+    logs.add_argument("--users", type=int, default=3_000)
+    logs.add_argument("--groups", type=int, default=20)
+    logs.add_argument("--max-sessions", type=int, default=30)
+    logs.add_argument("--seed", type=int, default=123)
+    logs.add_argument("--batch-users", type=int, default=100_000, help="users per streamed batch")
+    logs.add_argument("--shards", type=int, default=None, help="split users across this many part files")
+    logs.add_argument("--workers", type=int, default=None, help="processes for sharded generation")
+    logs.add_argument("--bounce-rate", type=float, default=0.05, help="share of extra zero-length sessions the SQL filters out")
+    logs.add_argument("--with-sessions", action="store_true", help="also write the flattened sessions the SQL should return")
+    logs.set_defaults(handler=command_generate_logs)
+
+    features = commands.add_parser("update-features", help="upsert newly arrived sessions into the user feature store")
+    features.add_argument("input", help="session data (.csv, .parquet or .arrow) with the new sessions")
+    features.add_argument("--store", default="user_features.parquet", help="feature store file, created on first use")
+    features.set_defaults(handler=command_update_features)
+
+    figures = commands.add_parser("figures", help="list the figure names accepted by report --figures")
+    figures.set_defaults(handler=command_figures)
+
+    sql = commands.add_parser("sql", help="run transform_user_sessions.sql locally on DuckDB and time it")
+    sql.add_argument("raw_dir", help="directory with user_keys, users, group_members, interactions, interaction_logs and session_data (.parquet, .csv or part directories)")
+    sql.add_argument("--sql", default=None, help="query to run instead of transform_user_sessions.sql (ClickHouse dialect)")
+    sql.add_argument("--output", default=None, help="save the session table (.parquet or .csv)")
+    sql.add_argument("--duckdb-profile", default=None, help="write DuckDB's per-operator JSON profile here")
+    sql.add_argument("--threads", type=int, default=None)
+    sql.set_defaults(handler=command_sql)
+
+    report = commands.add_parser("report", help="build the HTML report from a session dataset")
+    report.add_argument("input", help="session data (.csv, .parquet or .arrow) or a directory of raw event tables")
+    report.add_argument("--output", default=None, help="report path (default Report_<timestamp>.html)")
+    report.add_argument("--figures", nargs="+", default=None, help="render only these figures (see the figures command)")
+    report.add_argument("--thresholds", nargs="+", type=int, default=[15, 30, 45, 60, 90], help="churn thresholds in days")
+    report.add_argument("--retention-period", choices=["day", "week", "month"], default="week", help="column width of the cohort retention matrix")
+    report.add_argument("--retention-cohort", choices=["group_code", "registration_month"], default="group_code", help="rows of the cohort retention matrix")
+    report.add_argument("--chunk-rows", type=int, default=None, help="out-of-core mode: rows per chunk")
+    report.add_argument("--workers", type=int, default=1, help="render figures in this many processes")
+    report.add_argument("--cache-dir", default=None)
+    report.add_argument("--image-format", choices=["png", "svg"], default="png")
+    report.add_argument("--dpi", type=int, default=100)
+    report.add_argument("--sidecar-images", action="store_true", help="write images next to the report instead of base64")
+    report.add_argument("--inline-plotlyjs", action="store_true", help="embed plotly.js once so the report opens offline")
+    report.add_argument("--lazy", action="store_true", help="render figures only when scrolled into view")
+    report.add_argument("--profile", action="store_true", help="write a run profile and add it as an appendix page")
+    report.add_argument("--feature-store", action="store_true", help="input is a user feature store; only per-user figures are drawn")
+    report.add_argument("--dry-run", action="store_true", help="validate the input and print the plan without rendering")
+    report.set_defaults(handler=command_report)
+    return parser
+
+# Entry point; returns the process exit code
+def main(argv:Optional[List[str]]=None)->int:
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+
+    sys.exit(main())